@@ -1,8 +1,10 @@
 import os
 import re
+import time
 import urllib
 from datetime import datetime, timedelta
-from threading import Event as ThreadEvent, RLock
+from pathlib import Path
+from threading import Event as ThreadEvent
 from typing import Any, List, Dict, Tuple, Optional, Set, Union
 from urllib.parse import urlparse
 
@@ -22,8 +24,9 @@ from app.log import logger
 from app.modules.qbittorrent.qbittorrent import Qbittorrent
 from app.modules.transmission.transmission import Transmission
 from app.plugins import _PluginBase
-from app.plugins.downloaderhelper.module import TaskContext, TaskResult, TorrentField, TorrentFieldMap, DownloaderTransferInfo, EventDeleteTorrentStrategy
-from app.schemas import NotificationType, DownloaderConf, ServiceInfo
+from app.plugins.downloaderhelper.module import TaskContext, TaskResult, TaskJournal, TaskJournalAction, TorrentField, TorrentFieldMap, DownloaderTransferInfo, EventDeleteTorrentStrategy, TorrentRegistry, TorrentRegistryEntry, TaskLane, TaskLaneLock
+from app.plugins.downloaderhelper.trace import TraceRecorder, TraceRecordType, ReplayOperations, ReplayQbittorrent, ReplayTransmission, ReplayStep, load_trace
+from app.schemas import NotificationType, DownloaderConf, ServiceInfo, Response
 from app.schemas.types import EventType
 from app.utils.string import StringUtils
 
@@ -36,7 +39,7 @@ class DownloaderHelper(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/hotlcc/MoviePilot-Plugins-Third/main/icons/DownloaderHelper.png"
     # 插件版本
-    plugin_version = "4.0.7"
+    plugin_version = "4.0.12"
     # 插件作者
     plugin_author = "hotlcc"
     # 作者主页
@@ -72,18 +75,28 @@ class DownloaderHelper(_PluginBase):
     __dashboard_widget_key_prefix_active_torrent = "active_torrent_"
     # 实时速率组件
     __dashboard_widget_key_prefix_speed = "speed_"
+    # 重复种子组件key
+    __dashboard_widget_key_duplicate_torrent = "duplicate_torrent"
 
     # 私有组件
     # 调度器
     __scheduler: Optional[BackgroundScheduler] = None
     # 退出事件
     __exit_event: ThreadEvent = ThreadEvent()
-    # 任务锁
-    __task_lock: RLock = RLock()
+    # 任务锁：事件任务优先，全量任务在分片之间让出
+    __task_lock: TaskLaneLock = TaskLaneLock()
     # 缓存
     __ttl_cache = TTLCache(maxsize=128, ttl=1800)
     # 系统下载器服务帮助类
     __downloader_helper = SystemDownloaderHelper()
+    # 最近一次任务日志
+    __last_task_journal: Optional[TaskJournal] = None
+    # 轨迹记录器
+    __trace_recorder: Optional[TraceRecorder] = None
+    # 配置代数，每次初始化插件时递增，用于使表单和仪表板元信息缓存失效
+    __config_generation: int = 0
+    # 跨下载器种子注册表
+    __torrent_registry: TorrentRegistry = TorrentRegistry()
 
     # 配置相关
     # 插件缺省配置
@@ -136,15 +149,16 @@ class DownloaderHelper(_PluginBase):
         # 修正配置
         config = self.__fix_config(config=config)
         # 加载插件配置
-        self.__config = config
-        # 解析tracker映射
-        tracker_mappings = self.__get_config_item(config_key='tracker_mappings')
-        self.__tracker_mappings = self.__parse_tracker_mappings(tracker_mappings=tracker_mappings)
-        # 解析排除种子标签
-        exclude_tags = self.__get_config_item(config_key='exclude_tags')
-        self.__exclude_tags = self.__split_tags(tags=exclude_tags)
+        self.__load_config(config=config)
         logger.debug(f"插件配置加载完成：{config}")
 
+        # 开启轨迹记录
+        if self.__get_config_item(config_key='trace_record'):
+            try:
+                self.__trace_recorder = TraceRecorder(trace_dir=self.__get_trace_dir(), config=self.__config)
+            except Exception as e:
+                logger.error(f"轨迹记录开启异常: {str(e)}", exc_info=True)
+
         # 如果需要立即运行一次
         if self.__get_config_item(config_key='run_once'):
             try:
@@ -158,6 +172,19 @@ class DownloaderHelper(_PluginBase):
                 self.__config['run_once'] = False
                 self.update_config(self.__config)
 
+    def __load_config(self, config: dict):
+        """
+        加载插件配置
+        """
+        self.__config = config
+        self.__config_generation += 1
+        # 解析tracker映射
+        tracker_mappings = self.__get_config_item(config_key='tracker_mappings')
+        self.__tracker_mappings = self.__parse_tracker_mappings(tracker_mappings=tracker_mappings)
+        # 解析排除种子标签
+        exclude_tags = self.__get_config_item(config_key='exclude_tags')
+        self.__exclude_tags = self.__split_tags(tags=exclude_tags)
+
     def get_state(self) -> bool:
         """
         获取插件状态
@@ -172,6 +199,7 @@ class DownloaderHelper(_PluginBase):
                 )
                 or self.__check_enable_dashboard_active_torrent_widget()
                 or self.__check_enable_dashboard_speed_widget()
+                or self.__check_enable_dashboard_duplicate_torrent_widget()
         ) else False
         return state
 
@@ -187,7 +215,25 @@ class DownloaderHelper(_PluginBase):
         """
         获取插件API
         """
-        pass
+        return [{
+            "path": "/task_journal",
+            "endpoint": self.__get_task_journal,
+            "methods": ["GET"],
+            "summary": "获取最近一次任务日志",
+            "description": "获取最近一次任务执行的逐种子变更详情"
+        }, {
+            "path": "/traces",
+            "endpoint": self.__get_traces,
+            "methods": ["GET"],
+            "summary": "获取轨迹文件列表",
+            "description": "获取已记录的运行轨迹文件列表"
+        }, {
+            "path": "/trace_replay",
+            "endpoint": self.__trace_replay,
+            "methods": ["GET"],
+            "summary": "回放轨迹文件",
+            "description": "基于假下载器离线回放运行轨迹，并返回各阶段耗时"
+        }]
 
     def get_service(self) -> List[Dict[str, Any]]:
         """
@@ -211,6 +257,19 @@ class DownloaderHelper(_PluginBase):
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
         拼装插件配置页面，需要返回两块数据：1、页面配置；2、数据结构
+        按（配置代数, 下载器配置指纹）缓存，配置或下载器变化时重新构造
+        """
+        cache_key = ('form', self.__config_generation, self.__get_downloader_configs_fingerprint())
+        form = self.__ttl_cache.get(cache_key)
+        if not form:
+            form = self.__build_form()
+            self.__ttl_cache[cache_key] = form
+        elements, config_suggest = form
+        return elements, config_suggest.copy()
+
+    def __build_form(self) -> Tuple[List[dict], Dict[str, Any]]:
+        """
+        构造插件配置页面
         """
         # 建议的配置
         config_suggest = {
@@ -423,6 +482,20 @@ class DownloaderHelper(_PluginBase):
                             'hint': f'事件触发删种时以何种策略删种，缺省时为【延迟删种】。{event_delete_torrent_strategy_hint}'
                         }
                     }]
+                }, {
+                    'component': 'VCol',
+                    'props': {
+                        'cols': 12,
+                        'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                    },
+                    'content': [{
+                        'component': 'VSwitch',
+                        'props': {
+                            'model': 'trace_record',
+                            'label': '记录运行轨迹',
+                            'hint': f'记录匿名化的种子快照和事件序列，用于离线回放排查问题；最多保留最近{TraceRecorder.max_trace_files}个轨迹文件，会占用额外的磁盘空间，排查完毕后请关闭。'
+                        }
+                    }]
                 }]
             }, {
                 'component': 'VRow',
@@ -468,6 +541,20 @@ class DownloaderHelper(_PluginBase):
                             'hint': '点击展开仪表板实时速率组件配置窗口。'
                         }
                     }]
+                }, {
+                    'component': 'VCol',
+                    'props': {
+                        'cols': 12,
+                        'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                    },
+                    'content': [{
+                        'component': 'VSwitch',
+                        'props': {
+                            'model': 'enable_dashboard_duplicate_torrent_widget',
+                            'label': '启用仪表板重复种子组件',
+                            'hint': '在仪表板展示同时存在于多个下载器中的种子（根据最近一次任务获取的种子统计）。'
+                        }
+                    }]
                 }]
             }, {
                 'component': 'VDialog',
@@ -913,13 +1000,29 @@ class DownloaderHelper(_PluginBase):
                 "key": "dashboard2",
                 "name": "仪表盘2"
             }]
+        按（配置代数, 下载器配置指纹, 下载器服务指纹）缓存，配置或下载器服务变化时重新构造
+        """
+        cache_key = ('dashboard_meta',
+                     self.__config_generation,
+                     self.__get_downloader_configs_fingerprint(),
+                     self.__get_downloader_services_fingerprint())
+        dashboard_meta = self.__ttl_cache.get(cache_key)
+        if dashboard_meta is None:
+            dashboard_meta = self.__build_dashboard_meta()
+            self.__ttl_cache[cache_key] = dashboard_meta
+        return [meta.copy() for meta in dashboard_meta]
+
+    def __build_dashboard_meta(self) -> List[Dict[str, str]]:
+        """
+        构造插件仪表盘元信息
         """
         dashboard_meta = []
         if not self.get_state():
             return dashboard_meta
         enable_dashboard_active_torrent_widget = self.__check_enable_dashboard_active_torrent_widget()
         enable_dashboard_speed_widget = self.__check_enable_dashboard_speed_widget()
-        if not enable_dashboard_active_torrent_widget and not enable_dashboard_speed_widget:
+        enable_dashboard_duplicate_torrent_widget = self.__check_enable_dashboard_duplicate_torrent_widget()
+        if not enable_dashboard_active_torrent_widget and not enable_dashboard_speed_widget and not enable_dashboard_duplicate_torrent_widget:
             return dashboard_meta
         # 所有有效的下载器服务信息
         downloader_services = self.__get_downloader_services()
@@ -941,6 +1044,12 @@ class DownloaderHelper(_PluginBase):
                         "key": f"{self.__dashboard_widget_key_prefix_speed}{downloader_name}",
                         "name": f"实时速率 #{downloader_name}",
                     })
+        # 重复种子
+        if enable_dashboard_duplicate_torrent_widget:
+            dashboard_meta.append({
+                "key": self.__dashboard_widget_key_duplicate_torrent,
+                "name": "跨下载器重复种子",
+            })
         return dashboard_meta
 
     def get_dashboard(self, key: str = None, **kwargs) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], List[dict]]]:
@@ -964,8 +1073,12 @@ class DownloaderHelper(_PluginBase):
             return None
         enable_dashboard_active_torrent_widget = self.__check_enable_dashboard_active_torrent_widget()
         enable_dashboard_speed_widget = self.__check_enable_dashboard_speed_widget()
-        if not enable_dashboard_active_torrent_widget and not enable_dashboard_speed_widget:
+        enable_dashboard_duplicate_torrent_widget = self.__check_enable_dashboard_duplicate_torrent_widget()
+        if not enable_dashboard_active_torrent_widget and not enable_dashboard_speed_widget and not enable_dashboard_duplicate_torrent_widget:
             return None
+        # 重复种子
+        if enable_dashboard_duplicate_torrent_widget and key == self.__dashboard_widget_key_duplicate_torrent:
+            return self.__get_dashboard_duplicate_torrent_widget()
         # 活动种子
         if enable_dashboard_active_torrent_widget and key.startswith(self.__dashboard_widget_key_prefix_active_torrent):
             downloader_name = key.removeprefix(self.__dashboard_widget_key_prefix_active_torrent)
@@ -1060,6 +1173,93 @@ class DownloaderHelper(_PluginBase):
 
         return cols, attrs, elements
 
+    def __get_dashboard_duplicate_torrent_widget(self) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], List[dict]]]:
+        """
+        获取仪表板重复种子组件
+        """
+        # 列配置
+        cols = {
+            'cols': 12,
+            'xxl': 6,
+            'xl': 6,
+            'lg': 6,
+            'md': 12,
+            'sm': 12,
+            'xs': 12
+        }
+
+        # 全局配置
+        attrs = {
+            'title': '跨下载器重复种子'
+        }
+
+        # 表格数据：按大小倒序
+        duplicates = sorted(self.__torrent_registry.get_duplicates(),
+                            key=lambda entries: entries[0].size or 0,
+                            reverse=True)
+        rows = [[
+            entries[0].name,
+            TorrentField.TOTAL_SIZE.convertor.convert(entries[0].size),
+            ', '.join(sorted(entry.downloader_name for entry in entries)),
+        ] for entries in duplicates if entries]
+        if rows:
+            body_content = [{
+                'component': 'tr',
+                'props': {
+                    'class': 'text-sm'
+                },
+                'content': [{
+                    'component': 'td',
+                    'props': {
+                        'class': 'whitespace-nowrap'
+                    },
+                    'text': col
+                } for col in row]
+            } for row in rows]
+        else:
+            body_content = [{
+                'component': 'tr',
+                'props': {
+                    'class': 'text-sm'
+                },
+                'content': [{
+                    'component': 'td',
+                    'props': {
+                        'colspan': 3,
+                        'class': 'text-center'
+                    },
+                    'text': '暂无数据'
+                }]
+            }]
+
+        # 页面元素
+        elements = [{
+            'component': 'VTable',
+            'props': {
+                'hover': True,
+                'fixed-header': True,
+                'density': 'compact',
+                'style': {
+                    'height': '242px'
+                }
+            },
+            'content': [{
+                'component': 'thead',
+                'content': [{
+                    'component': 'th',
+                    'props': {
+                        'class': 'text-start ps-4'
+                    },
+                    'text': text
+                } for text in ['名称', '大小', '下载器']]
+            }, {
+                'component': 'tbody',
+                'content': body_content
+            }]
+        }]
+
+        return cols, attrs, elements
+
     def stop_service(self):
         """
         退出插件
@@ -1069,6 +1269,7 @@ class DownloaderHelper(_PluginBase):
             self.__exit_event.set()
             self.__stop_scheduler()
             self.__clear_cache()
+            self.__close_trace_recorder()
             logger.info('插件服务停止完成')
         except Exception as e:
             logger.error(f"插件服务停止异常: {str(e)}", exc_info=True)
@@ -1190,6 +1391,18 @@ class DownloaderHelper(_PluginBase):
         except Exception as e:
             logger.error(f"插件缓存清除异常: {str(e)}", exc_info=True)
 
+    def __close_trace_recorder(self):
+        """
+        关闭轨迹记录器
+        """
+        try:
+            trace_recorder = self.__trace_recorder
+            if trace_recorder:
+                trace_recorder.close()
+                self.__trace_recorder = None
+        except Exception as e:
+            logger.error(f"轨迹记录器关闭异常: {str(e)}", exc_info=True)
+
     def __fix_config(self, config: dict) -> dict:
         """
         修正配置
@@ -1337,6 +1550,13 @@ class DownloaderHelper(_PluginBase):
         """
         return True if self.__get_config_item('enable_dashboard_speed_widget') else False
 
+    def __check_enable_dashboard_duplicate_torrent_widget(self) -> bool:
+        """
+        判断是否启用了仪表板重复种子组件
+        :return: 是否启用了仪表板重复种子组件
+        """
+        return True if self.__get_config_item('enable_dashboard_duplicate_torrent_widget') else False
+
     @classmethod
     def __parse_tracker_for_qbittorrent(cls, torrent: TorrentDictionary) -> Optional[str]:
         """
@@ -1756,18 +1976,52 @@ class DownloaderHelper(_PluginBase):
             text += '\n————————————\n'
         return text
 
+    @staticmethod
+    def __get_task_lane(context: TaskContext = None) -> TaskLane:
+        """
+        获取任务道：定向的事件任务走高优先级道，全量任务走低优先级道
+        """
+        return TaskLane.HIGH if context and context.is_targeted() else TaskLane.LOW
+
+    def __yield_task(self, downloader_name: str, hash_str: Optional[str], context: TaskContext) -> bool:
+        """
+        全量任务的让出点：存在等待中的事件任务时让出任务锁，待其执行完毕后继续
+        让出期间事件任务可能已删除种子，恢复后跳过注册表中该下载器已不存在的种子
+        :return: 是否继续处理该种子
+        """
+        # 回放在独立的插件实例上执行，不持有任务锁，无须让出
+        if not context or context.is_replay():
+            return True
+        if self.__task_lock.yield_point():
+            logger.info(f'下载器[{downloader_name}] - 全量任务已让出给事件任务，继续执行')
+            context.record_yield()
+        if not hash_str or not context.is_preempted():
+            return True
+        entries = self.__get_torrent_registry(context=context).get(hash_str=hash_str)
+        return any(entry.downloader_name == downloader_name for entry in entries)
+
     def __try_run(self, context: TaskContext = None):
         """
         尝试运行插件任务
         """
-        if not self.__task_lock.acquire(blocking=False):
+        if not self.__task_lock.acquire(lane=self.__get_task_lane(context=context), blocking=False):
             logger.info('已有进行中的任务，本次不执行')
             return
         try:
+            self.__record_trace_run(context=context)
             self.__run_for_all(context=context)
         finally:
             self.__task_lock.release()
 
+    def __record_trace_run(self, context: TaskContext = None):
+        """
+        记录全量运行的轨迹标记，事件任务在监听事件时已记录事件标记
+        """
+        trace_recorder = self.__trace_recorder
+        if not trace_recorder or (context and (context.is_targeted() or context.is_replay())):
+            return
+        trace_recorder.record_run()
+
     def __async_try_run(self, context: TaskContext = None):
         """
         异步Try运行
@@ -1785,8 +2039,9 @@ class DownloaderHelper(_PluginBase):
         """
         阻塞运行插件任务
         """
-        self.__task_lock.acquire()
+        self.__task_lock.acquire(lane=self.__get_task_lane(context=context))
         try:
+            self.__record_trace_run(context=context)
             self.__run_for_all(context=context)
         finally:
             self.__task_lock.release()
@@ -1804,6 +2059,46 @@ class DownloaderHelper(_PluginBase):
                           run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(seconds=3),
                           name='异步阻塞运行')
 
+    @staticmethod
+    def __flush_task_journal(downloader_name: str, action: TaskJournalAction, context: TaskContext):
+        """
+        输出子任务日志汇总，逐种子详情仅在DEBUG级别输出
+        :param downloader_name: 下载器名称
+        :param action: 动作
+        :param context: 任务上下文
+        """
+        if not context:
+            return
+        journal = context.get_journal()
+        count = journal.count(downloader_name=downloader_name, action=action)
+        logger.info(f'下载器[{downloader_name}] - 批量{action.name_}结束: 变更数 = {count}')
+        if count and str(settings.LOG_LEVEL).upper() == 'DEBUG':
+            lines = journal.format_records(downloader_name=downloader_name, action=action)
+            logger.debug(f'下载器[{downloader_name}] - 批量{action.name_}详情:\n' + '\n'.join(lines))
+
+    def __get_task_journal(self, apikey: str = None, downloader: str = None, action: str = None):
+        """
+        获取最近一次任务日志
+        :param apikey: API密钥
+        :param downloader: 下载器名称过滤
+        :param action: 动作过滤：SEEDING/TAGGING/DELETE
+        """
+        if apikey != settings.API_TOKEN:
+            return Response(success=False, message="API密钥错误")
+        journal_action = TaskJournalAction.__members__.get(action) if action else None
+        if action and not journal_action:
+            return Response(success=False, message=f"动作无效: {action}")
+        journal = self.__last_task_journal
+        if not journal:
+            return Response(success=True, data=None)
+        if not downloader and not journal_action:
+            return Response(success=True, data=journal.to_dict())
+        return Response(success=True, data={
+            'create_time': journal.get_create_time().strftime('%Y-%m-%d %H:%M:%S'),
+            'total': journal.count(downloader_name=downloader, action=journal_action),
+            'records': journal.get_records(downloader_name=downloader, action=journal_action),
+        })
+
     def __run_for_all(self, context: TaskContext = None) -> TaskContext:
         """
         针对所有下载器运行插件任务
@@ -1817,14 +2112,20 @@ class DownloaderHelper(_PluginBase):
             logger.warn('插件服务正在退出，任务终止')
             return context
 
-        # 全部下载器配置
-        downloader_configs: Dict[str, DownloaderConf] = self.__get_downloader_configs()
-        if not downloader_configs:
+        # 全部有效的下载器服务，回放时使用上下文指定的下载器服务
+        downloader_services = context.get_downloader_services()
+        if downloader_services is None:
+            downloader_services = self.__get_downloader_services()
+        if not downloader_services:
             return context
-        for downloader_name, downloader_config in downloader_configs.items():
-            if not downloader_name or not self.__check_downloader_config(downloader_config=downloader_config):
+        if not context.is_replay():
+            self.__torrent_registry.retain_downloaders(downloader_names=set(downloader_services.keys()))
+        # 根据种子注册表缩小事件任务的范围
+        self.__narrow_context_by_torrent_registry(context=context, downloader_names=set(downloader_services.keys()))
+        for downloader_name, service_info in downloader_services.items():
+            if not downloader_name or not service_info:
                 continue
-            service_info = self.__get_downloader_service(name=downloader_name)
+            self.__yield_task(downloader_name=downloader_name, hash_str=None, context=context)
             if service_info.type == "qbittorrent":
                 self.__run_for_qbittorrent(service_info=service_info, context=context)
             elif service_info.type == "transmission":
@@ -1833,11 +2134,50 @@ class DownloaderHelper(_PluginBase):
                 logger.warn('插件服务正在退出，任务终止')
                 return context
 
+        # 回放时不保存任务日志、不发送通知
+        if context.is_replay():
+            return context
+
+        # 保存任务日志
+        self.__last_task_journal = context.get_journal()
+
         # 发送通知
         self.__send_notify(context=context)
 
         return context
 
+    def __get_torrent_registry(self, context: TaskContext) -> TorrentRegistry:
+        """
+        获取种子注册表，回放时使用上下文指定的种子注册表
+        """
+        torrent_registry = context.get_torrent_registry() if context else None
+        return torrent_registry if torrent_registry else self.__torrent_registry
+
+    def __narrow_context_by_torrent_registry(self, context: TaskContext, downloader_names: Set[str]):
+        """
+        根据种子注册表缩小删种事件任务的范围：只处理持有相关种子的下载器和种子
+        注册表未覆盖全部下载器或已过期、或未查到相关种子时不缩小范围
+        """
+        if not context or not downloader_names:
+            return
+        download_deleted_event_data = context.get_download_deleted_event_data()
+        download_file_deleted_event_data = context.get_download_file_deleted_event_data()
+        if not download_deleted_event_data and not download_file_deleted_event_data:
+            return
+        torrent_registry = self.__get_torrent_registry(context=context)
+        if not torrent_registry.is_fresh(downloader_names=downloader_names):
+            return
+        if download_deleted_event_data:
+            entries = torrent_registry.find_by_name(name=download_deleted_event_data.get('title'),
+                                                    size=download_deleted_event_data.get('size'))
+        else:
+            entries = torrent_registry.find_by_file_path(file_path=download_file_deleted_event_data.get('src'))
+        if not entries:
+            return
+        context.select_downloaders(downloader_names=[entry.downloader_name for entry in entries]) \
+            .select_torrents(torrents=[entry.hash for entry in entries])
+        logger.info(f'根据种子注册表缩小任务范围: 下载器 = {sorted(set(entry.downloader_name for entry in entries))}, 种子数 = {len(entries)}')
+
     def __run_for_qbittorrent(self, service_info: ServiceInfo, context: TaskContext = None) -> TaskContext:
         """
         针对qb下载器运行插件任务
@@ -1880,7 +2220,9 @@ class DownloaderHelper(_PluginBase):
                 return context
 
             # 获取全部种子
+            start_time = time.perf_counter()
             torrents, error = self.__get_torrents_for_qbittorrent(qbittorrent=qbittorrent, with_cache=context.get_use_torrents_cache())
+            context.add_stage_time(f'{downloader_name}:fetch', time.perf_counter() - start_time)
             if error:
                 logger.warn(f'下载器[{downloader_name}] - 获取种子失败，任务终止')
                 return context
@@ -1888,6 +2230,19 @@ class DownloaderHelper(_PluginBase):
                 logger.warn(f'下载器[{downloader_name}] - 没有种子，任务终止')
                 return context
             result.set_total(len(torrents))
+            # 记录轨迹
+            trace_recorder = self.__get_trace_recorder(context=context)
+            if trace_recorder:
+                trace_recorder.record_snapshot_for_qbittorrent(downloader_name=downloader_name, torrents=torrents)
+            # 刷新种子注册表
+            self.__get_torrent_registry(context=context).refresh(downloader_name=downloader_name, entries=[
+                TorrentRegistryEntry(downloader_name=downloader_name,
+                                     hash_str=torrent.get('hash'),
+                                     name=torrent.get(TorrentField.NAME.qb),
+                                     size=torrent.get(TorrentField.TOTAL_SIZE.qb),
+                                     save_path=torrent.get(TorrentField.SAVE_PATH.qb))
+                for torrent in torrents if torrent
+            ])
 
             # 根据上下文过滤种子
             selected_torrents = context.get_selected_torrents()
@@ -1901,19 +2256,25 @@ class DownloaderHelper(_PluginBase):
 
             # 自动标签
             if enable_tagging:
-                result.set_tagging(self.__tagging_batch_for_qbittorrent(downloader_name=downloader_name, qbittorrent=qbittorrent, torrents=torrents))
+                start_time = time.perf_counter()
+                result.set_tagging(self.__tagging_batch_for_qbittorrent(downloader_name=downloader_name, qbittorrent=qbittorrent, torrents=torrents, context=context))
+                context.add_stage_time(f'{downloader_name}:tagging', time.perf_counter() - start_time)
                 if self.__exit_event.is_set():
                     logger.warn(f'插件服务正在退出，任务终止[{downloader_name}]')
                     return context
             # 自动做种
             if enable_seeding:
-                result.set_seeding(self.__seeding_batch_for_qbittorrent(downloader_name=downloader_name, torrents=torrents))
+                start_time = time.perf_counter()
+                result.set_seeding(self.__seeding_batch_for_qbittorrent(downloader_name=downloader_name, torrents=torrents, context=context))
+                context.add_stage_time(f'{downloader_name}:seeding', time.perf_counter() - start_time)
                 if self.__exit_event.is_set():
                     logger.warn(f'插件服务正在退出，任务终止[{downloader_name}]')
                     return context
             # 自动删种
             if enable_delete:
+                start_time = time.perf_counter()
                 result.set_delete(self.__delete_batch_for_qbittorrent(downloader_name=downloader_name, qbittorrent=qbittorrent, torrents=torrents, context=context))
+                context.add_stage_time(f'{downloader_name}:delete', time.perf_counter() - start_time)
                 if self.__exit_event.is_set():
                     logger.warn(f'插件服务正在退出，任务终止[{downloader_name}]')
                     return context
@@ -1941,7 +2302,7 @@ class DownloaderHelper(_PluginBase):
             return None, False
         return qbittorrent.get_torrents()
 
-    def __seeding_batch_for_qbittorrent(self, downloader_name: str, torrents: List[TorrentDictionary]) -> int:
+    def __seeding_batch_for_qbittorrent(self, downloader_name: str, torrents: List[TorrentDictionary], context: TaskContext) -> int:
         """
         qb批量自动做种
         :return: 做种数
@@ -1954,12 +2315,14 @@ class DownloaderHelper(_PluginBase):
             if self.__exit_event.is_set():
                 logger.warn('插件服务正在退出，子任务终止')
                 return count
-            if self.__seeding_single_for_qbittorrent(downloader_name=downloader_name, torrent=torrent):
+            if not self.__yield_task(downloader_name=downloader_name, hash_str=torrent.get('hash') if torrent else None, context=context):
+                continue
+            if self.__seeding_single_for_qbittorrent(downloader_name=downloader_name, torrent=torrent, context=context):
                 count += 1
-        logger.info(f'下载器[{downloader_name}] - 批量自动做种结束')
+        self.__flush_task_journal(downloader_name=downloader_name, action=TaskJournalAction.SEEDING, context=context)
         return count
 
-    def __seeding_single_for_qbittorrent(self, downloader_name: str, torrent: TorrentDictionary) -> bool:
+    def __seeding_single_for_qbittorrent(self, downloader_name: str, torrent: TorrentDictionary, context: TaskContext) -> bool:
         """
         qb单个自动做种
         :return: 是否执行
@@ -1977,15 +2340,18 @@ class DownloaderHelper(_PluginBase):
             return False
         torrent.resume()
         # 日志
-        name = self.__extract_torrent_value_for_qbittorrent(torrent=torrent, field=TorrentField.NAME)
-        total_size = self.__extract_torrent_value_for_qbittorrent(torrent=torrent, field=TorrentField.TOTAL_SIZE)
-        logger.info(f"下载器[{downloader_name}] - 单个自动做种完成: hash = {hash_str}, name = {name}, size = {total_size}")
+        context.get_journal().record(downloader_name=downloader_name,
+                                     action=TaskJournalAction.SEEDING,
+                                     hash_str=hash_str,
+                                     name=torrent.get(TorrentField.NAME.qb),
+                                     size=torrent.get(TorrentField.TOTAL_SIZE.qb))
         return True
 
     def __tagging_batch_for_qbittorrent(self,
                                         downloader_name: str,
                                         qbittorrent: Qbittorrent,
-                                        torrents: List[TorrentDictionary]) -> int:
+                                        torrents: List[TorrentDictionary],
+                                        context: TaskContext) -> int:
         """
         qb批量自动标签
         :return: 打标数
@@ -1998,15 +2364,18 @@ class DownloaderHelper(_PluginBase):
             if self.__exit_event.is_set():
                 logger.warn('插件服务正在退出，子任务终止')
                 return count
-            if self.__tagging_single_for_qbittorrent(downloader_name=downloader_name, qbittorrent=qbittorrent, torrent=torrent):
+            if not self.__yield_task(downloader_name=downloader_name, hash_str=torrent.get('hash') if torrent else None, context=context):
+                continue
+            if self.__tagging_single_for_qbittorrent(downloader_name=downloader_name, qbittorrent=qbittorrent, torrent=torrent, context=context):
                 count += 1
-        logger.info(f'下载器[{downloader_name}] - 批量自动标签结束')
+        self.__flush_task_journal(downloader_name=downloader_name, action=TaskJournalAction.TAGGING, context=context)
         return count
 
     def __tagging_single_for_qbittorrent(self,
                                          downloader_name: str,
                                          qbittorrent: Qbittorrent,
-                                         torrent: TorrentDictionary) -> bool:
+                                         torrent: TorrentDictionary,
+                                         context: TaskContext) -> bool:
         """
         qb单个自动标签
         :return: 是否执行
@@ -2063,10 +2432,12 @@ class DownloaderHelper(_PluginBase):
         # Flush 标签
         self.__flush_torrent_tags_for_qbittorrent(torrent=torrent, remove_tags=remove_tags, add_tags=add_tags)
         # 日志
-        name = self.__extract_torrent_value_for_qbittorrent(torrent=torrent, field=TorrentField.NAME)
-        total_size = self.__extract_torrent_value_for_qbittorrent(torrent=torrent, field=TorrentField.TOTAL_SIZE)
-        after = torrent.get('tags')
-        logger.info(f"下载器[{downloader_name}] - 单个自动标签成功: hash = {hash_str}, name = {name}, size = {total_size}, before = {tags}, after = {after}")
+        context.get_journal().record(downloader_name=downloader_name,
+                                     action=TaskJournalAction.TAGGING,
+                                     hash_str=hash_str,
+                                     name=torrent.get(TorrentField.NAME.qb),
+                                     size=torrent.get(TorrentField.TOTAL_SIZE.qb),
+                                     detail={'before': tags, 'after': torrent.get('tags')})
         return True
 
     def __flush_torrent_tags_for_qbittorrent(self, torrent: TorrentDictionary, remove_tags: List[str], add_tags: List[str]):
@@ -2138,13 +2509,15 @@ class DownloaderHelper(_PluginBase):
             if self.__exit_event.is_set():
                 logger.warn('插件服务正在退出，子任务终止')
                 return count
+            if not self.__yield_task(downloader_name=downloader_name, hash_str=torrent.get('hash') if torrent else None, context=context):
+                continue
             if (self.__delete_single_for_qbittorrent(downloader_name=downloader_name, qbittorrent=qbittorrent, torrent=torrent, context=context)):
                 count += 1
                 torrents_delete.append(torrent)
         if torrents_delete:
             for torrent in torrents_delete:
                 torrents.remove(torrent)
-        logger.info(f'下载器[{downloader_name}] - 批量自动删种结束')
+        self.__flush_task_journal(downloader_name=downloader_name, action=TaskJournalAction.DELETE, context=context)
         return count
 
     def __delete_single_for_qbittorrent(self, downloader_name: str, qbittorrent: Qbittorrent, torrent: TorrentDictionary, context: TaskContext) -> bool:
@@ -2164,10 +2537,14 @@ class DownloaderHelper(_PluginBase):
         if not need_delete:
             return False
         qbittorrent.delete_torrents(delete_file=delete_file, ids=hash_str)
+        self.__get_torrent_registry(context=context).remove(downloader_name=downloader_name, hash_str=hash_str)
         # 日志
-        name = self.__extract_torrent_value_for_qbittorrent(torrent=torrent, field=TorrentField.NAME)
-        total_size = self.__extract_torrent_value_for_qbittorrent(torrent=torrent, field=TorrentField.TOTAL_SIZE)
-        logger.info(f"下载器[{downloader_name}] - 单个自动删种完成: hash = {hash_str}, name = {name}, size = {total_size}, reason = {reason}")
+        context.get_journal().record(downloader_name=downloader_name,
+                                     action=TaskJournalAction.DELETE,
+                                     hash_str=hash_str,
+                                     name=torrent.get(TorrentField.NAME.qb),
+                                     size=torrent.get(TorrentField.TOTAL_SIZE.qb),
+                                     detail={'reason': reason})
         return True
 
     def __run_for_transmission(self, service_info: ServiceInfo, context: TaskContext = None) -> TaskContext:
@@ -2213,7 +2590,9 @@ class DownloaderHelper(_PluginBase):
 
             # 获取全部种子
             try:
+                start_time = time.perf_counter()
                 torrents = self.__get_torrents_for_transmission(transmission=transmission, with_cache=context.get_use_torrents_cache())
+                context.add_stage_time(f'{downloader_name}:fetch', time.perf_counter() - start_time)
             except Exception as e:
                 logger.warn(f'下载器[{downloader_name}] - 获取种子失败，任务终止')
                 return context
@@ -2221,6 +2600,19 @@ class DownloaderHelper(_PluginBase):
                 logger.warn(f'下载器[{downloader_name}] - 没有种子，任务终止')
                 return context
             result.set_total(len(torrents))
+            # 记录轨迹
+            trace_recorder = self.__get_trace_recorder(context=context)
+            if trace_recorder:
+                trace_recorder.record_snapshot_for_transmission(downloader_name=downloader_name, torrents=torrents)
+            # 刷新种子注册表
+            self.__get_torrent_registry(context=context).refresh(downloader_name=downloader_name, entries=[
+                TorrentRegistryEntry(downloader_name=downloader_name,
+                                     hash_str=torrent.hashString,
+                                     name=torrent.get(TorrentField.NAME.tr),
+                                     size=torrent.get(TorrentField.TOTAL_SIZE.tr),
+                                     save_path=torrent.get(TorrentField.SAVE_PATH.tr))
+                for torrent in torrents if torrent
+            ])
 
             # 根据上下文过滤种子
             selected_torrents = context.get_selected_torrents()
@@ -2234,19 +2626,25 @@ class DownloaderHelper(_PluginBase):
 
             # 自动标签
             if enable_tagging:
-                result.set_tagging(self.__tagging_batch_for_transmission(downloader_name=downloader_name, transmission=transmission, torrents=torrents))
+                start_time = time.perf_counter()
+                result.set_tagging(self.__tagging_batch_for_transmission(downloader_name=downloader_name, transmission=transmission, torrents=torrents, context=context))
+                context.add_stage_time(f'{downloader_name}:tagging', time.perf_counter() - start_time)
                 if self.__exit_event.is_set():
                     logger.warn(f'插件服务正在退出，任务终止[{downloader_name}]')
                     return context
             # 自动做种
             if enable_seeding:
-                result.set_seeding(self.__seeding_batch_for_transmission(downloader_name=downloader_name, transmission=transmission, torrents=torrents))
+                start_time = time.perf_counter()
+                result.set_seeding(self.__seeding_batch_for_transmission(downloader_name=downloader_name, transmission=transmission, torrents=torrents, context=context))
+                context.add_stage_time(f'{downloader_name}:seeding', time.perf_counter() - start_time)
                 if self.__exit_event.is_set():
                     logger.warn(f'插件服务正在退出，任务终止[{downloader_name}]')
                     return context
             # 自动删种
             if enable_delete:
+                start_time = time.perf_counter()
                 result.set_delete(self.__delete_batch_for_transmission(downloader_name=downloader_name, transmission=transmission, torrents=torrents, context=context))
+                context.add_stage_time(f'{downloader_name}:delete', time.perf_counter() - start_time)
                 if self.__exit_event.is_set():
                     logger.warn(f'插件服务正在退出，任务终止[{downloader_name}]')
                     return context
@@ -2290,7 +2688,7 @@ class DownloaderHelper(_PluginBase):
             arguments.append(TorrentField.SELECT_SIZE.tr)
         return transmission.trc.get_torrents(arguments=arguments)
 
-    def __seeding_batch_for_transmission(self, downloader_name: str, transmission: Transmission, torrents: List[Torrent]) -> int:
+    def __seeding_batch_for_transmission(self, downloader_name: str, transmission: Transmission, torrents: List[Torrent], context: TaskContext) -> int:
         """
         tr批量自动做种
         :return: 做种数
@@ -2303,12 +2701,14 @@ class DownloaderHelper(_PluginBase):
             if self.__exit_event.is_set():
                 logger.warn('插件服务正在退出，子任务终止')
                 return count
-            if self.__seeding_single_for_transmission(downloader_name=downloader_name, transmission=transmission, torrent=torrent):
+            if not self.__yield_task(downloader_name=downloader_name, hash_str=torrent.hashString if torrent else None, context=context):
+                continue
+            if self.__seeding_single_for_transmission(downloader_name=downloader_name, transmission=transmission, torrent=torrent, context=context):
                 count += 1
-        logger.info(f'下载器[{downloader_name}] - 批量自动做种结束')
+        self.__flush_task_journal(downloader_name=downloader_name, action=TaskJournalAction.SEEDING, context=context)
         return count
 
-    def __seeding_single_for_transmission(self, downloader_name: str, transmission: Transmission, torrent: Torrent) -> bool:
+    def __seeding_single_for_transmission(self, downloader_name: str, transmission: Transmission, torrent: Torrent, context: TaskContext) -> bool:
         """
         tr单个自动做种
         :return: 是否执行
@@ -2326,12 +2726,14 @@ class DownloaderHelper(_PluginBase):
             return False
         transmission.start_torrents(ids=hash_str)
         # 日志
-        name = self.__extract_torrent_value_for_transmission(torrent=torrent, field=TorrentField.NAME)
-        total_size = self.__extract_torrent_value_for_transmission(torrent=torrent, field=TorrentField.TOTAL_SIZE)
-        logger.info(f"下载器[{downloader_name}] - 单个自动做种完成: hash = {hash_str}, name = {name}, size = {total_size}")
+        context.get_journal().record(downloader_name=downloader_name,
+                                     action=TaskJournalAction.SEEDING,
+                                     hash_str=hash_str,
+                                     name=torrent.get(TorrentField.NAME.tr),
+                                     size=torrent.get(TorrentField.TOTAL_SIZE.tr))
         return True
 
-    def __tagging_batch_for_transmission(self, downloader_name: str, transmission: Transmission, torrents: List[Torrent]) -> int:
+    def __tagging_batch_for_transmission(self, downloader_name: str, transmission: Transmission, torrents: List[Torrent], context: TaskContext) -> int:
         """
         tr批量自动标签
         :return: 打标数
@@ -2340,16 +2742,27 @@ class DownloaderHelper(_PluginBase):
         count = 0
         if not torrents:
             return count
-        for torrent in torrents:
+        yield_count = context.get_yield_count()
+        # 标签是否可能已过期
+        tags_stale = False
+        for index, torrent in enumerate(torrents):
             if self.__exit_event.is_set():
                 logger.warn('插件服务正在退出，子任务终止')
                 return count
-            if self.__tagging_single_for_transmission(downloader_name=downloader_name, transmission=transmission, torrent=torrent):
+            if not self.__yield_task(downloader_name=downloader_name, hash_str=torrent.hashString if torrent else None, context=context):
+                continue
+            # 让出期间事件任务可能已修改标签，而tr保存标签时会覆盖全部标签，故重新获取剩余种子的标签
+            if context.get_yield_count() != yield_count:
+                yield_count = context.get_yield_count()
+                tags_stale = not self.__refresh_torrent_tags_for_transmission(downloader_name=downloader_name, transmission=transmission, torrents=torrents[index:])
+            if tags_stale:
+                continue
+            if self.__tagging_single_for_transmission(downloader_name=downloader_name, transmission=transmission, torrent=torrent, context=context):
                 count += 1
-        logger.info(f'下载器[{downloader_name}] - 批量自动标签结束')
+        self.__flush_task_journal(downloader_name=downloader_name, action=TaskJournalAction.TAGGING, context=context)
         return count
 
-    def __tagging_single_for_transmission(self, downloader_name: str, transmission: Transmission, torrent: Torrent) -> bool:
+    def __tagging_single_for_transmission(self, downloader_name: str, transmission: Transmission, torrent: Torrent, context: TaskContext) -> bool:
         """
         tr单个自动标签
         :return: 是否执行
@@ -2409,15 +2822,35 @@ class DownloaderHelper(_PluginBase):
         torrent_tags_copy = sorted(torrent_tags_copy)
         transmission.set_torrent_tag(hash_str, torrent_tags_copy)
         # 日志
-        name = self.__extract_torrent_value_for_transmission(torrent=torrent, field=TorrentField.NAME)
-        total_size = self.__extract_torrent_value_for_transmission(torrent=torrent, field=TorrentField.TOTAL_SIZE)
-        before = TorrentField.TAGS.convertor.convert(data=torrent_tags)
-        after = TorrentField.TAGS.convertor.convert(data=torrent_tags_copy)
-        logger.info(f"下载器[{downloader_name}] - 单个自动标签成功: hash = {hash_str}, name = {name}, size = {total_size}, before = {before}, after = {after}")
+        context.get_journal().record(downloader_name=downloader_name,
+                                     action=TaskJournalAction.TAGGING,
+                                     hash_str=hash_str,
+                                     name=torrent.get(TorrentField.NAME.tr),
+                                     size=torrent.get(TorrentField.TOTAL_SIZE.tr),
+                                     detail={'before': torrent_tags, 'after': torrent_tags_copy})
         # Flush 标签
         self.__flush_torrent_tags_for_transmission(torrent=torrent, tags=torrent_tags_copy)
         return True
 
+    def __refresh_torrent_tags_for_transmission(self, downloader_name: str, transmission: Transmission, torrents: List[Torrent]) -> bool:
+        """
+        tr重新获取种子标签并更新到种子信息中
+        :return: 是否成功
+        """
+        hash_strs = [torrent.hashString for torrent in torrents if torrent]
+        if not hash_strs:
+            return True
+        try:
+            latest_torrents = transmission.trc.get_torrents(ids=hash_strs, arguments=['hashString', 'labels'])
+        except Exception as e:
+            logger.warn(f'下载器[{downloader_name}] - 重新获取种子标签失败，跳过剩余种子的自动标签: {str(e)}')
+            return False
+        latest_tags = {latest_torrent.hashString: latest_torrent.get('labels') or [] for latest_torrent in latest_torrents or []}
+        for torrent in torrents:
+            if torrent and torrent.hashString in latest_tags:
+                self.__flush_torrent_tags_for_transmission(torrent=torrent, tags=latest_tags.get(torrent.hashString))
+        return True
+
     def __flush_torrent_tags_for_transmission(self, torrent: Torrent, tags: List[str]):
         """
         tr Flush 标签到种子信息中（即更新内存数据）
@@ -2463,13 +2896,15 @@ class DownloaderHelper(_PluginBase):
             if self.__exit_event.is_set():
                 logger.warn('插件服务正在退出，子任务终止')
                 return count
+            if not self.__yield_task(downloader_name=downloader_name, hash_str=torrent.hashString if torrent else None, context=context):
+                continue
             if (self.__delete_single_for_transmission(downloader_name=downloader_name, transmission=transmission, torrent=torrent, context=context)):
                 count += 1
                 torrents_delete.append(torrent)
         if torrents_delete:
             for torrent in torrents_delete:
                 torrents.remove(torrent)
-        logger.info(f'下载器[{downloader_name}] - 批量自动删种结束')
+        self.__flush_task_journal(downloader_name=downloader_name, action=TaskJournalAction.DELETE, context=context)
         return count
 
     def __delete_single_for_transmission(self, downloader_name: str, transmission: Transmission, torrent: Torrent, context: TaskContext) -> bool:
@@ -2489,10 +2924,14 @@ class DownloaderHelper(_PluginBase):
         if not need_delete:
             return False
         transmission.delete_torrents(delete_file=delete_file, ids=hash_str)
+        self.__get_torrent_registry(context=context).remove(downloader_name=downloader_name, hash_str=hash_str)
         # 日志
-        name = self.__extract_torrent_value_for_transmission(torrent=torrent, field=TorrentField.NAME)
-        total_size = self.__extract_torrent_value_for_transmission(torrent=torrent, field=TorrentField.TOTAL_SIZE)
-        logger.info(f"下载器[{downloader_name}] - 单个自动删种完成: hash = {hash_str}, name = {name}, size = {total_size}, reason = {reason}")
+        context.get_journal().record(downloader_name=downloader_name,
+                                     action=TaskJournalAction.DELETE,
+                                     hash_str=hash_str,
+                                     name=torrent.get(TorrentField.NAME.tr),
+                                     size=torrent.get(TorrentField.TOTAL_SIZE.tr),
+                                     detail={'reason': reason})
         return True
 
     @staticmethod
@@ -3168,6 +3607,22 @@ class DownloaderHelper(_PluginBase):
         downloader_configs: Dict[str, DownloaderConf] = self.__downloader_helper.get_configs(include_disabled=include_disabled)
         return downloader_configs or {}
 
+    def __get_downloader_configs_fingerprint(self) -> tuple:
+        """
+        获取下载器配置指纹，用于判断下载器配置是否变化
+        """
+        downloader_configs = self.__get_downloader_configs(include_disabled=True)
+        return tuple((downloader_name, downloader_config.type, downloader_config.enabled, downloader_config.default)
+                     for downloader_name, downloader_config in downloader_configs.items() if downloader_config)
+
+    def __get_downloader_services_fingerprint(self) -> tuple:
+        """
+        获取下载器服务指纹，用于判断下载器服务是否变化（服务重载后实例会变化）
+        """
+        downloader_services = self.__downloader_helper.get_services() or {}
+        return tuple((downloader_name, id(downloader_service.instance) if downloader_service else None)
+                     for downloader_name, downloader_service in downloader_services.items())
+
     def __get_default_downloader_config(self) -> DownloaderConf:
         """
         获取默认下载器配置
@@ -3252,16 +3707,9 @@ class DownloaderHelper(_PluginBase):
             return
         # 执行
         logger.info('下载添加事件监听任务执行开始...')
-        # enable_seeding=True是针对辅种添加种子并跳过校验的场景
-        context = TaskContext().enable_seeding(True) \
-            .enable_tagging(True) \
-            .enable_delete(False)
-        _hash = event.event_data.get('hash')
-        if _hash:
-            context.select_torrent(torrent=_hash)
-        username = event.event_data.get('username')
-        if username:
-            context.set_username(username=username)
+        if self.__trace_recorder:
+            self.__trace_recorder.record_event(event_type=EventType.DownloadAdded.name, event_data=event.event_data)
+        context = self.__build_download_added_event_context(event_data=event.event_data)
         self.__block_run(context=context)
         logger.info('下载添加事件监听任务执行结束')
 
@@ -3282,12 +3730,9 @@ class DownloaderHelper(_PluginBase):
             return
         # 执行
         logger.info('源文件删除事件监听任务执行开始...')
-        # 针对源文件监听事件只需要处理删种
-        context = TaskContext().enable_seeding(False) \
-            .enable_tagging(False) \
-            .enable_delete(True) \
-            .set_download_file_deleted_event_data(event.event_data) \
-            .set_use_torrents_cache(True)
+        if self.__trace_recorder:
+            self.__trace_recorder.record_event(event_type=EventType.DownloadFileDeleted.name, event_data=event.event_data)
+        context = self.__build_download_file_deleted_event_context(event_data=event.event_data)
         self.__async_block_run(context=context)
         logger.info('源文件删除事件监听任务执行结束')
 
@@ -3316,12 +3761,204 @@ class DownloaderHelper(_PluginBase):
             return
         # 执行
         logger.info('下载任务删除事件监听任务执行开始...')
-        # 针对下载任务删除事件只需要处理删种
         # 删除的种子信息
         torrent_info = torrents[0]
-        context = TaskContext().enable_seeding(False) \
-            .enable_tagging(False) \
-            .enable_delete(True) \
-            .set_download_deleted_event_data(torrent_info)
+        if self.__trace_recorder:
+            self.__trace_recorder.record_event(event_type=EventType.DownloadDeleted.name, event_data=torrent_info)
+        context = self.__build_download_deleted_event_context(event_data=torrent_info)
         self.__async_block_run(context=context)
         logger.info('下载任务删除事件监听任务执行结束')
+
+    @staticmethod
+    def __build_download_added_event_context(event_data: dict) -> TaskContext:
+        """
+        构造下载添加事件任务上下文
+        """
+        # enable_seeding=True是针对辅种添加种子并跳过校验的场景
+        context = TaskContext().enable_seeding(True) \
+            .enable_tagging(True) \
+            .enable_delete(False)
+        _hash = event_data.get('hash')
+        if _hash:
+            context.select_torrent(torrent=_hash)
+        # 事件中指明了下载器时只处理该下载器
+        downloader = event_data.get('downloader')
+        if downloader:
+            context.select_downloader(downloader_name=downloader)
+        username = event_data.get('username')
+        if username:
+            context.set_username(username=username)
+        return context
+
+    @staticmethod
+    def __build_download_file_deleted_event_context(event_data: dict) -> TaskContext:
+        """
+        构造源文件删除事件任务上下文
+        """
+        # 针对源文件监听事件只需要处理删种
+        return TaskContext().enable_seeding(False) \
+            .enable_tagging(False) \
+            .enable_delete(True) \
+            .set_download_file_deleted_event_data(event_data) \
+            .set_use_torrents_cache(True)
+
+    @staticmethod
+    def __build_download_deleted_event_context(event_data: dict) -> TaskContext:
+        """
+        构造下载任务删除事件任务上下文
+        :param event_data: 删除的种子信息
+        """
+        # 针对下载任务删除事件只需要处理删种
+        return TaskContext().enable_seeding(False) \
+            .enable_tagging(False) \
+            .enable_delete(True) \
+            .set_download_deleted_event_data(event_data)
+
+    def __get_trace_dir(self) -> Path:
+        """
+        获取轨迹文件目录
+        """
+        return self.get_data_path() / 'traces'
+
+    def __get_trace_recorder(self, context: TaskContext) -> Optional[TraceRecorder]:
+        """
+        获取轨迹记录器，回放时不记录
+        """
+        if not context or context.is_replay():
+            return None
+        return self.__trace_recorder
+
+    def __get_traces(self, apikey: str = None):
+        """
+        获取轨迹文件列表
+        """
+        if apikey != settings.API_TOKEN:
+            return Response(success=False, message="API密钥错误")
+        trace_dir = self.__get_trace_dir()
+        if not trace_dir.exists():
+            return Response(success=True, data=[])
+        return Response(success=True, data=[{
+            'file': trace_file.name,
+            'size': StringUtils.str_filesize(trace_file.stat().st_size),
+        } for trace_file in sorted(trace_dir.glob('trace_*.jsonl.gz'), reverse=True)])
+
+    def __trace_replay(self, apikey: str = None, file: str = None):
+        """
+        回放轨迹文件
+        :param apikey: API密钥
+        :param file: 轨迹文件名
+        """
+        if apikey != settings.API_TOKEN:
+            return Response(success=False, message="API密钥错误")
+        if not file:
+            return Response(success=False, message="未指定轨迹文件")
+        trace_file = self.__get_trace_dir() / Path(file).name
+        if not trace_file.exists():
+            return Response(success=False, message="轨迹文件不存在")
+        try:
+            return Response(success=True, data=self.__replay_trace(trace_file=trace_file))
+        except Exception as e:
+            logger.error(f"轨迹回放异常: {str(e)}", exc_info=True)
+            return Response(success=False, message=f"轨迹回放异常: {str(e)}")
+
+    def __replay_trace(self, trace_file: Path) -> Dict[str, Any]:
+        """
+        回放轨迹：在独立的插件实例上加载轨迹中记录的插件配置后执行回放，不影响当前实例的配置和任务锁
+        :param trace_file: 轨迹文件
+        :return: 回放报告
+        """
+        header, steps = load_trace(file_path=trace_file)
+        replay_plugin = DownloaderHelper()
+        replay_plugin.__load_config(config=header.get('config') or self.__config)
+        return replay_plugin.__do_replay_trace(trace_file=trace_file, header=header, steps=steps)
+
+    def __do_replay_trace(self, trace_file: Path, header: dict, steps: List[ReplayStep]) -> Dict[str, Any]:
+        """
+        执行回放：按顺序将快照加载到假下载器，并以与线上一致的任务上下文执行任务流水线
+        只应在回放专用的插件实例上调用
+        :param trace_file: 轨迹文件
+        :param header: 轨迹头信息
+        :param steps: 回放步骤
+        :return: 回放报告
+        """
+        operations = ReplayOperations()
+        # 各阶段累计耗时
+        stage_times: Dict[str, float] = {}
+        # 各触发类型统计
+        triggers: Dict[str, Dict[str, Any]] = {}
+        # 各步骤耗时
+        step_times: List[Tuple[int, str, float]] = []
+        changes: Dict[str, int] = {}
+        downloader_services: Dict[str, ServiceInfo] = {}
+        torrent_registry = TorrentRegistry()
+        replay_start_time = time.perf_counter()
+        for index, step in enumerate(steps):
+            if self.__exit_event.is_set():
+                logger.warn('插件服务正在退出，回放终止')
+                break
+            # 加载快照
+            for snapshot in step.snapshots:
+                service_info = self.__build_replay_downloader_service(header=header, snapshot=snapshot, operations=operations)
+                if service_info:
+                    downloader_services[service_info.name] = service_info
+            # 构造任务上下文
+            trigger = step.trigger
+            if trigger.get('type') == TraceRecordType.EVENT:
+                trigger_name = trigger.get('event')
+                event_data = trigger.get('data') or {}
+                if trigger_name == EventType.DownloadAdded.name:
+                    context = self.__build_download_added_event_context(event_data=event_data)
+                elif trigger_name == EventType.DownloadFileDeleted.name:
+                    context = self.__build_download_file_deleted_event_context(event_data=event_data)
+                elif trigger_name == EventType.DownloadDeleted.name:
+                    context = self.__build_download_deleted_event_context(event_data=event_data)
+                else:
+                    continue
+            else:
+                trigger_name = TraceRecordType.RUN
+                context = TaskContext()
+            context.set_replay(True).set_downloader_services(downloader_services).set_torrent_registry(torrent_registry)
+            # 执行
+            step_start_time = time.perf_counter()
+            self.__run_for_all(context=context)
+            step_time = time.perf_counter() - step_start_time
+            # 统计
+            step_times.append((index, trigger_name, step_time))
+            trigger_stat = triggers.setdefault(trigger_name, {'count': 0, 'time': 0})
+            trigger_stat['count'] += 1
+            trigger_stat['time'] += step_time
+            for stage, seconds in context.get_stage_times().items():
+                stage_times[stage] = stage_times.get(stage, 0) + seconds
+            journal = context.get_journal()
+            for action in TaskJournalAction:
+                changes[action.name] = changes.get(action.name, 0) + journal.count(action=action)
+        slowest_steps = sorted(step_times, key=lambda step_time: step_time[2], reverse=True)[:10]
+        return {
+            'file': trace_file.name,
+            'steps': len(step_times),
+            'total_time': round(time.perf_counter() - replay_start_time, 4),
+            'stages': {stage: round(seconds, 4) for stage, seconds in stage_times.items()},
+            'triggers': {name: {'count': stat['count'], 'time': round(stat['time'], 4)} for name, stat in triggers.items()},
+            'slowest_steps': [{'index': index, 'trigger': name, 'time': round(seconds, 4)} for index, name, seconds in slowest_steps],
+            'changes': changes,
+            'operations': operations.counts,
+        }
+
+    @staticmethod
+    def __build_replay_downloader_service(header: dict, snapshot: dict, operations: ReplayOperations) -> Optional[ServiceInfo]:
+        """
+        根据快照构造回放用的下载器服务信息
+        """
+        downloader_name = snapshot.get('downloader')
+        downloader_type = snapshot.get('downloader_type')
+        rows = snapshot.get('rows') or []
+        if not downloader_name:
+            return None
+        if downloader_type == 'qbittorrent':
+            instance = ReplayQbittorrent(fields=header.get('qb_fields') or [], rows=rows, operations=operations)
+        elif downloader_type == 'transmission':
+            instance = ReplayTransmission(fields=header.get('tr_fields') or [], rows=rows, operations=operations)
+        else:
+            return None
+        config = DownloaderConf(name=downloader_name, type=downloader_type, default=False, enabled=True, config={'replay': True})
+        return ServiceInfo(name=downloader_name, instance=instance, module='replay', type=downloader_type, config=config)
@@ -1,5 +1,9 @@
+import os
+import time
+from datetime import datetime
 from enum import Enum
-from typing import Set, List, Optional
+from threading import RLock, Condition, Lock, get_ident
+from typing import Set, List, Optional, Dict, Tuple, Any
 
 from app.plugins.downloaderhelper.convertor import IConvertor, ByteSizeConvertor, PercentageConvertor, StateConvertor, SpeedConvertor, RatioConvertor, TimestampConvertor, LimitSpeedConvertor, LimitRatioConvertor, TimeIntervalConvertor, TagsConvertor
 
@@ -56,6 +60,264 @@ class TaskResult:
         return self.__delete
 
 
+class TaskJournalAction(Enum):
+    """
+    任务日志动作
+    """
+
+    SEEDING = ("自动做种",)
+    TAGGING = ("自动标签",)
+    DELETE = ("自动删种",)
+
+    def __init__(self, name_: str):
+        self.name_ = name_
+
+
+class TaskLane(Enum):
+    """
+    任务道
+    """
+
+    # 高优先级：定向的事件任务
+    HIGH = ("事件任务",)
+    # 低优先级：全量任务（定时/手动）
+    LOW = ("全量任务",)
+
+    def __init__(self, name_: str):
+        self.name_ = name_
+
+
+class TaskLaneLock:
+    """
+    分道任务锁：同一时刻只有一个任务持有锁，高优先级道的等待者优先获得锁；
+    低优先级道的持有者在分片之间调用 yield_point，存在等待中的高优先级任务时让出锁，待其执行完毕后再继续
+    """
+
+    def __init__(self):
+        self.__condition: Condition = Condition(Lock())
+        # 持有者线程
+        self.__owner: Optional[int] = None
+        # 持有者所在道
+        self.__owner_lane: Optional[TaskLane] = None
+        # 重入深度
+        self.__depth: int = 0
+        # 等待中的高优先级任务数
+        self.__high_waiting: int = 0
+        # 累计让出次数
+        self.__yield_count: int = 0
+
+    def __can_acquire(self, lane: TaskLane) -> bool:
+        if self.__owner is not None:
+            return False
+        return lane == TaskLane.HIGH or self.__high_waiting <= 0
+
+    def acquire(self, lane: TaskLane = TaskLane.LOW, blocking: bool = True) -> bool:
+        """
+        获取锁，同一线程可重入
+        :param lane: 任务道
+        :param blocking: 是否阻塞等待
+        :return: 是否获取成功
+        """
+        ident = get_ident()
+        with self.__condition:
+            if self.__owner == ident:
+                self.__depth += 1
+                return True
+            if lane == TaskLane.HIGH:
+                self.__high_waiting += 1
+            try:
+                while not self.__can_acquire(lane):
+                    if not blocking:
+                        return False
+                    self.__condition.wait()
+                self.__owner = ident
+                self.__owner_lane = lane
+                self.__depth = 1
+                return True
+            finally:
+                if lane == TaskLane.HIGH:
+                    self.__high_waiting -= 1
+
+    def release(self):
+        """
+        释放锁
+        """
+        with self.__condition:
+            if self.__owner != get_ident():
+                raise RuntimeError('当前线程未持有任务锁')
+            self.__depth -= 1
+            if self.__depth <= 0:
+                self.__owner = None
+                self.__owner_lane = None
+                self.__depth = 0
+                self.__condition.notify_all()
+
+    def yield_point(self) -> bool:
+        """
+        让出点：仅对低优先级道的持有者生效，存在等待中的高优先级任务时让出锁，阻塞至重新获取
+        :return: 是否发生了让出
+        """
+        # 快速路径：无等待者时不加锁
+        if self.__high_waiting <= 0:
+            return False
+        ident = get_ident()
+        with self.__condition:
+            if self.__owner != ident or self.__owner_lane != TaskLane.LOW or self.__high_waiting <= 0:
+                return False
+            depth = self.__depth
+            self.__owner = None
+            self.__owner_lane = None
+            self.__depth = 0
+            self.__yield_count += 1
+            self.__condition.notify_all()
+            while not self.__can_acquire(TaskLane.LOW):
+                self.__condition.wait()
+            self.__owner = ident
+            self.__owner_lane = TaskLane.LOW
+            self.__depth = depth
+            return True
+
+    def get_owner_lane(self) -> Optional[TaskLane]:
+        """
+        获取当前持有者所在道
+        """
+        return self.__owner_lane
+
+    def get_high_waiting(self) -> int:
+        """
+        获取等待中的高优先级任务数
+        """
+        return self.__high_waiting
+
+    def get_yield_count(self) -> int:
+        """
+        获取累计让出次数
+        """
+        return self.__yield_count
+
+
+class TaskJournal:
+    """
+    任务日志：在一次运行中累积紧凑的变更记录，按子任务汇总输出，详情按需格式化
+    """
+
+    def __init__(self, max_records: int = 10000):
+        # 创建时间
+        self.__create_time: datetime = datetime.now()
+        # 最大保留记录数，超出部分只计数不保留
+        self.__max_records: int = max_records
+        # 变更记录：(下载器名称, 动作, hash, 名称, 大小, 详情)
+        self.__records: List[Tuple[str, TaskJournalAction, str, str, Optional[int], Optional[Dict[str, Any]]]] = []
+        # 计数：(下载器名称, 动作) -> 数量
+        self.__counts: Dict[Tuple[str, TaskJournalAction], int] = {}
+        # 被丢弃的记录数
+        self.__dropped: int = 0
+
+    def record(self,
+               downloader_name: str,
+               action: TaskJournalAction,
+               hash_str: str,
+               name: str = None,
+               size: int = None,
+               detail: Dict[str, Any] = None):
+        """
+        记录一条变更
+        :param downloader_name: 下载器名称
+        :param action: 动作
+        :param hash_str: 种子hash
+        :param name: 种子名称
+        :param size: 种子大小（字节）
+        :param detail: 详情
+        """
+        if not downloader_name or not action:
+            return self
+        key = (downloader_name, action)
+        self.__counts[key] = self.__counts.get(key, 0) + 1
+        if len(self.__records) >= self.__max_records:
+            self.__dropped += 1
+            return self
+        self.__records.append((downloader_name, action, hash_str, name, size, detail))
+        return self
+
+    def count(self, downloader_name: str = None, action: TaskJournalAction = None) -> int:
+        """
+        统计变更数量
+        :param downloader_name: 下载器名称，为None时表示全部
+        :param action: 动作，为None时表示全部
+        """
+        return sum(count for (_downloader_name, _action), count in self.__counts.items()
+                   if (downloader_name is None or _downloader_name == downloader_name)
+                   and (action is None or _action == action))
+
+    def get_dropped(self) -> int:
+        """
+        获取被丢弃的记录数
+        """
+        return self.__dropped
+
+    def get_create_time(self) -> datetime:
+        """
+        获取创建时间
+        """
+        return self.__create_time
+
+    def get_records(self, downloader_name: str = None, action: TaskJournalAction = None) -> List[Dict[str, Any]]:
+        """
+        获取变更记录详情（按需格式化）
+        :param downloader_name: 下载器名称，为None时表示全部
+        :param action: 动作，为None时表示全部
+        """
+        convertor = ByteSizeConvertor()
+        records = []
+        for _downloader_name, _action, hash_str, name, size, detail in self.__records:
+            if downloader_name is not None and _downloader_name != downloader_name:
+                continue
+            if action is not None and _action != action:
+                continue
+            record = {
+                'downloader': _downloader_name,
+                'action': _action.name,
+                'action_name': _action.name_,
+                'hash': hash_str,
+                'name': name,
+                'size': convertor.convert(size),
+            }
+            if detail:
+                record.update(detail)
+            records.append(record)
+        return records
+
+    def format_records(self, downloader_name: str = None, action: TaskJournalAction = None) -> List[str]:
+        """
+        格式化变更记录为日志行
+        """
+        lines = []
+        for record in self.get_records(downloader_name=downloader_name, action=action):
+            line = f"hash = {record.get('hash')}, name = {record.get('name')}, size = {record.get('size')}"
+            for key, value in record.items():
+                if key in ('downloader', 'action', 'action_name', 'hash', 'name', 'size'):
+                    continue
+                line += f", {key} = {value}"
+            lines.append(line)
+        return lines
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为字典
+        """
+        return {
+            'create_time': self.__create_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'total': self.count(),
+            'dropped': self.__dropped,
+            'counts': [{
+                'downloader': downloader_name,
+                'action': action.name,
+                'count': count
+            } for (downloader_name, action), count in self.__counts.items()],
+            'records': self.get_records(),
+        }
+
+
 class TaskContext:
     """
     任务上下文
@@ -91,6 +353,22 @@ class TaskContext:
         # 是否使用种子缓存
         self.__use_torrents_cache: bool = False
 
+        # 任务日志
+        self.__journal: TaskJournal = TaskJournal()
+
+        # 指定的下载器服务，为None时表示使用系统下载器服务（用于回放）
+        self.__downloader_services: Optional[Dict[str, Any]] = None
+        # 是否回放
+        self.__replay: bool = False
+        # 各阶段耗时（秒）
+        self.__stage_times: Dict[str, float] = {}
+        # 指定的种子注册表，为None时表示使用插件的种子注册表（用于回放）
+        self.__torrent_registry = None
+        # 是否曾让出任务锁
+        self.__preempted: bool = False
+        # 让出任务锁的次数
+        self.__yield_count: int = 0
+
     def select_downloader(self, downloader_name: str):
         """
         选择下载器
@@ -269,6 +547,272 @@ class TaskContext:
         """
         return self.__use_torrents_cache
 
+    def get_journal(self) -> TaskJournal:
+        """
+        获取任务日志
+        """
+        return self.__journal
+
+    def set_downloader_services(self, downloader_services: Dict[str, Any]):
+        """
+        设置指定的下载器服务
+        """
+        self.__downloader_services = downloader_services
+        return self
+
+    def get_downloader_services(self) -> Optional[Dict[str, Any]]:
+        """
+        获取指定的下载器服务
+        """
+        return self.__downloader_services
+
+    def set_replay(self, replay: bool):
+        """
+        设置是否回放
+        """
+        self.__replay = replay
+        return self
+
+    def is_replay(self) -> bool:
+        """
+        是否回放
+        """
+        return self.__replay
+
+    def add_stage_time(self, stage: str, seconds: float):
+        """
+        累加阶段耗时
+        :param stage: 阶段名称
+        :param seconds: 耗时（秒）
+        """
+        if not stage:
+            return self
+        self.__stage_times[stage] = self.__stage_times.get(stage, 0) + seconds
+        return self
+
+    def get_stage_times(self) -> Dict[str, float]:
+        """
+        获取各阶段耗时
+        """
+        return self.__stage_times
+
+    def set_torrent_registry(self, torrent_registry):
+        """
+        设置指定的种子注册表
+        """
+        self.__torrent_registry = torrent_registry
+        return self
+
+    def get_torrent_registry(self):
+        """
+        获取指定的种子注册表
+        """
+        return self.__torrent_registry
+
+    def is_preempted(self) -> bool:
+        """
+        是否曾让出任务锁
+        """
+        return self.__preempted
+
+    def record_yield(self):
+        """
+        记录一次让出任务锁
+        """
+        self.__preempted = True
+        self.__yield_count += 1
+        return self
+
+    def get_yield_count(self) -> int:
+        """
+        获取让出任务锁的次数
+        """
+        return self.__yield_count
+
+    def is_targeted(self) -> bool:
+        """
+        是否定向任务：由事件触发或选择了指定的种子
+        """
+        return True if self.__selected_torrents is not None \
+            or self.__download_file_deleted_event_data \
+            or self.__download_deleted_event_data else False
+
+
+class TorrentRegistryEntry:
+    """
+    种子注册表条目
+    """
+
+    __slots__ = ('downloader_name', 'hash', 'name', 'size', 'save_path')
+
+    def __init__(self, downloader_name: str, hash_str: str, name: str, size: int, save_path: str):
+        self.downloader_name = downloader_name
+        self.hash = hash_str
+        self.name = name
+        self.size = size
+        self.save_path = save_path
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'downloader': self.downloader_name,
+            'hash': self.hash,
+            'name': self.name,
+            'size': self.size,
+            'save_path': self.save_path,
+        }
+
+
+class TorrentRegistry:
+    """
+    跨下载器种子注册表：infohash -> 各下载器中的种子信息，由任务运行时获取的全量种子刷新
+    """
+
+    def __init__(self, ttl: int = 3600):
+        self.__lock: RLock = RLock()
+        # 有效期（秒），超过有效期未刷新的下载器视为不可信
+        self.__ttl: int = ttl
+        # hash -> {下载器名称 -> 条目}
+        self.__entries: Dict[str, Dict[str, TorrentRegistryEntry]] = {}
+        # 名称 -> hashs
+        self.__name_index: Dict[str, Set[str]] = {}
+        # 下载器名称 -> hashs
+        self.__downloader_index: Dict[str, Set[str]] = {}
+        # 下载器名称 -> 刷新时间
+        self.__refresh_times: Dict[str, float] = {}
+
+    def refresh(self, downloader_name: str, entries: List[TorrentRegistryEntry]):
+        """
+        使用下载器全量种子刷新注册表
+        :param downloader_name: 下载器名称
+        :param entries: 下载器中的全部种子
+        """
+        if not downloader_name:
+            return
+        with self.__lock:
+            self.__remove_downloader(downloader_name=downloader_name)
+            hashes = set()
+            for entry in entries or []:
+                if not entry or not entry.hash:
+                    continue
+                self.__entries.setdefault(entry.hash, {})[downloader_name] = entry
+                if entry.name:
+                    self.__name_index.setdefault(entry.name, set()).add(entry.hash)
+                hashes.add(entry.hash)
+            self.__downloader_index[downloader_name] = hashes
+            self.__refresh_times[downloader_name] = time.monotonic()
+
+    def remove(self, downloader_name: str, hash_str: str):
+        """
+        移除下载器中的种子
+        """
+        if not downloader_name or not hash_str:
+            return
+        with self.__lock:
+            self.__remove_entry(downloader_name=downloader_name, hash_str=hash_str)
+            hashes = self.__downloader_index.get(downloader_name)
+            if hashes:
+                hashes.discard(hash_str)
+
+    def retain_downloaders(self, downloader_names: Set[str]):
+        """
+        只保留指定下载器的种子（用于清理已移除的下载器）
+        """
+        with self.__lock:
+            for downloader_name in list(self.__downloader_index.keys()):
+                if downloader_name not in downloader_names:
+                    self.__remove_downloader(downloader_name=downloader_name)
+
+    def __remove_downloader(self, downloader_name: str):
+        hashes = self.__downloader_index.pop(downloader_name, None)
+        self.__refresh_times.pop(downloader_name, None)
+        if not hashes:
+            return
+        for hash_str in hashes:
+            self.__remove_entry(downloader_name=downloader_name, hash_str=hash_str)
+
+    def __remove_entry(self, downloader_name: str, hash_str: str):
+        downloader_entries = self.__entries.get(hash_str)
+        if not downloader_entries:
+            return
+        entry = downloader_entries.pop(downloader_name, None)
+        if not downloader_entries:
+            del self.__entries[hash_str]
+        if not entry or not entry.name:
+            return
+        # 名称索引在该hash不再存在于任何下载器时才移除
+        if hash_str not in self.__entries:
+            hashes = self.__name_index.get(entry.name)
+            if hashes:
+                hashes.discard(hash_str)
+                if not hashes:
+                    del self.__name_index[entry.name]
+
+    def is_fresh(self, downloader_names: Set[str]) -> bool:
+        """
+        判断指定的下载器是否都已在有效期内刷新
+        """
+        if not downloader_names:
+            return False
+        now = time.monotonic()
+        with self.__lock:
+            for downloader_name in downloader_names:
+                refresh_time = self.__refresh_times.get(downloader_name)
+                if refresh_time is None or now - refresh_time > self.__ttl:
+                    return False
+        return True
+
+    def get(self, hash_str: str) -> List[TorrentRegistryEntry]:
+        """
+        根据hash获取各下载器中的种子
+        """
+        if not hash_str:
+            return []
+        with self.__lock:
+            return list((self.__entries.get(hash_str) or {}).values())
+
+    def find_by_name(self, name: str, size: int = None) -> List[TorrentRegistryEntry]:
+        """
+        根据名称（和大小）查找种子
+        """
+        if not name:
+            return []
+        with self.__lock:
+            result = []
+            for hash_str in self.__name_index.get(name) or []:
+                for entry in (self.__entries.get(hash_str) or {}).values():
+                    if size is None or entry.size == size:
+                        result.append(entry)
+            return result
+
+    def find_by_file_path(self, file_path: str) -> List[TorrentRegistryEntry]:
+        """
+        根据文件路径查找种子：路径中任意一级名称与种子名称一致即认为匹配
+        """
+        if not file_path:
+            return []
+        result = []
+        for part in set(file_path.split(os.path.sep)):
+            if part:
+                result.extend(self.find_by_name(name=part))
+        return result
+
+    def get_duplicates(self) -> List[List[TorrentRegistryEntry]]:
+        """
+        获取存在于多个下载器中的种子
+        """
+        with self.__lock:
+            return [list(downloader_entries.values()) for downloader_entries in self.__entries.values() if len(downloader_entries) > 1]
+
+    def clear(self):
+        """
+        清空注册表
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__name_index.clear()
+            self.__downloader_index.clear()
+            self.__refresh_times.clear()
+
 
 class TorrentField(Enum):
     """
@@ -0,0 +1,376 @@
+import gzip
+import hashlib
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Any, List, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from qbittorrentapi import TorrentDictionary
+from transmission_rpc.torrent import Torrent
+
+from app.log import logger
+from app.modules.qbittorrent.qbittorrent import Qbittorrent
+from app.modules.transmission.transmission import Transmission
+
+
+class TraceRecordType:
+    """
+    轨迹记录类型
+    """
+    # 头信息
+    HEADER = 'header'
+    # 全量运行（定时/手动）
+    RUN = 'run'
+    # 事件
+    EVENT = 'event'
+    # 种子快照
+    SNAPSHOT = 'snapshot'
+
+
+class TraceAnonymizer:
+    """
+    轨迹匿名器：hash、名称、路径使用加盐摘要替换，同一次记录中映射保持一致，保证匹配逻辑可复现
+    """
+
+    def __init__(self, salt: str = None):
+        self.__salt: str = salt or secrets.token_hex(8)
+
+    def __digest(self, value: str) -> str:
+        return hashlib.sha1(f'{self.__salt}{value}'.encode('utf-8')).hexdigest()
+
+    def hash(self, value: Optional[str]) -> Optional[str]:
+        """
+        匿名化种子hash，保持40位hex格式
+        """
+        if not value:
+            return value
+        return self.__digest(value.lower())
+
+    def name(self, value: Optional[str]) -> Optional[str]:
+        """
+        匿名化名称，保留扩展名
+        """
+        if not value:
+            return value
+        _, ext = os.path.splitext(value)
+        if len(ext) > 6:
+            ext = ''
+        return f'n{self.__digest(value)[:16]}{ext}'
+
+    def path(self, value: Optional[str]) -> Optional[str]:
+        """
+        匿名化路径，逐级匿名化以保留层级关系
+        """
+        if not value:
+            return value
+        parts = value.split(os.path.sep)
+        return os.path.sep.join([self.name(part) if part else part for part in parts])
+
+    @staticmethod
+    def tracker(value: Optional[str]) -> Optional[str]:
+        """
+        匿名化tracker，只保留scheme和域名，移除passkey等信息
+        """
+        if not value:
+            return value
+        try:
+            url = urlparse(value)
+            if not url.netloc:
+                return None
+            return f'{url.scheme}://{url.netloc.split("@")[-1]}/announce'
+        except Exception:
+            return None
+
+    def event_data(self, event_type: str, event_data: dict) -> dict:
+        """
+        匿名化事件数据
+        """
+        if not event_data:
+            return {}
+        if event_type == 'DownloadAdded':
+            return {
+                'hash': self.hash(event_data.get('hash')),
+            }
+        if event_type == 'DownloadFileDeleted':
+            return {
+                'src': self.path(event_data.get('src')),
+                'hash': self.hash(event_data.get('hash')),
+            }
+        if event_type == 'DownloadDeleted':
+            return {
+                'title': self.name(event_data.get('title')),
+                'size': event_data.get('size'),
+                'hash': self.hash(event_data.get('hash')),
+            }
+        return {}
+
+
+# qb快照字段
+QB_SNAPSHOT_FIELDS = ['hash', 'name', 'tags', 'state', 'size', 'total_size', 'availability', 'tracker', 'save_path', 'progress', 'added_on', 'private']
+# tr快照字段
+TR_SNAPSHOT_FIELDS = ['hashString', 'name', 'labels', 'status', 'percentDone', 'error', 'errorString', 'isPrivate', 'totalSize', 'sizeWhenDone', 'trackers', 'downloadDir', 'addedDate', 'id']
+
+
+class TraceRecorder:
+    """
+    轨迹记录器：将匿名化的种子快照和事件序列以 gzip JSON Lines 的形式追加写入文件
+    """
+
+    # 保留的轨迹文件数，超出时删除最早的
+    max_trace_files: int = 10
+
+    def __init__(self, trace_dir: Path, config: Dict[str, Any]):
+        self.__lock: Lock = Lock()
+        self.__anonymizer: TraceAnonymizer = TraceAnonymizer()
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        self.__file_path: Path = trace_dir / f'trace_{datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl.gz'
+        self.__file = gzip.open(self.__file_path, 'at', encoding='utf-8')
+        self.__write({
+            'type': TraceRecordType.HEADER,
+            'create_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'config': config or {},
+            'qb_fields': QB_SNAPSHOT_FIELDS,
+            'tr_fields': TR_SNAPSHOT_FIELDS,
+        })
+        logger.info(f'轨迹记录已开启: {self.__file_path}')
+        self.__purge_trace_files(trace_dir=trace_dir)
+
+    def __purge_trace_files(self, trace_dir: Path):
+        """
+        清理多余的轨迹文件，只保留最近的若干个
+        """
+        trace_files = sorted(trace_dir.glob('trace_*.jsonl.gz'), reverse=True)
+        for trace_file in trace_files[self.max_trace_files:]:
+            if trace_file == self.__file_path:
+                continue
+            try:
+                trace_file.unlink()
+                logger.info(f'轨迹文件已清理: {trace_file}')
+            except Exception as e:
+                logger.warn(f'轨迹文件清理失败: {trace_file}, {str(e)}')
+
+    def get_file_path(self) -> Path:
+        return self.__file_path
+
+    def __write(self, record: dict):
+        record['ts'] = round(time.time(), 3)
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str)
+        with self.__lock:
+            if not self.__file:
+                return
+            self.__file.write(line)
+            self.__file.write('\n')
+            self.__file.flush()
+
+    def record_run(self):
+        """
+        记录一次全量运行
+        """
+        self.__write({'type': TraceRecordType.RUN})
+
+    def record_event(self, event_type: str, event_data: dict):
+        """
+        记录一次事件
+        """
+        self.__write({
+            'type': TraceRecordType.EVENT,
+            'event': event_type,
+            'data': self.__anonymizer.event_data(event_type=event_type, event_data=event_data),
+        })
+
+    def record_snapshot_for_qbittorrent(self, downloader_name: str, torrents: List[TorrentDictionary]):
+        """
+        记录qb种子快照，按字段列表输出为行数组以压缩体积
+        """
+        anonymizer = self.__anonymizer
+        rows = []
+        for torrent in torrents or []:
+            if not torrent:
+                continue
+            row = [torrent.get(field) for field in QB_SNAPSHOT_FIELDS]
+            row[0] = anonymizer.hash(row[0])
+            row[1] = anonymizer.name(row[1])
+            row[7] = anonymizer.tracker(row[7])
+            row[8] = anonymizer.path(row[8])
+            rows.append(row)
+        self.__write({
+            'type': TraceRecordType.SNAPSHOT,
+            'downloader': downloader_name,
+            'downloader_type': 'qbittorrent',
+            'rows': rows,
+        })
+
+    def record_snapshot_for_transmission(self, downloader_name: str, torrents: List[Torrent]):
+        """
+        记录tr种子快照，按字段列表输出为行数组以压缩体积
+        """
+        anonymizer = self.__anonymizer
+        rows = []
+        for torrent in torrents or []:
+            if not torrent:
+                continue
+            fields = torrent.fields
+            row = [fields.get(field) for field in TR_SNAPSHOT_FIELDS]
+            row[0] = anonymizer.hash(row[0])
+            row[1] = anonymizer.name(row[1])
+            row[10] = [{'announce': anonymizer.tracker(tracker.get('announce'))} for tracker in (row[10] or []) if tracker][:1]
+            row[11] = anonymizer.path(row[11])
+            rows.append(row)
+        self.__write({
+            'type': TraceRecordType.SNAPSHOT,
+            'downloader': downloader_name,
+            'downloader_type': 'transmission',
+            'rows': rows,
+        })
+
+    def close(self):
+        """
+        关闭记录器
+        """
+        with self.__lock:
+            if self.__file:
+                self.__file.close()
+                self.__file = None
+                logger.info(f'轨迹记录已关闭: {self.__file_path}')
+
+
+class ReplayStep:
+    """
+    回放步骤：一个触发记录（全量运行或事件）以及随后采集的种子快照
+    """
+
+    def __init__(self, trigger: dict):
+        self.trigger: dict = trigger
+        self.snapshots: List[dict] = []
+
+
+def load_trace(file_path: Path) -> Tuple[dict, List[ReplayStep]]:
+    """
+    加载轨迹文件
+    :return: 头信息, 回放步骤
+    """
+    header = {}
+    steps: List[ReplayStep] = []
+    # 第一个触发之前的快照归入一个虚拟的全量运行
+    pending_snapshots: List[dict] = []
+    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except Exception:
+                # 进程异常退出可能导致最后一行不完整
+                continue
+            record_type = record.get('type')
+            if record_type == TraceRecordType.HEADER:
+                header = record
+            elif record_type in (TraceRecordType.RUN, TraceRecordType.EVENT):
+                steps.append(ReplayStep(trigger=record))
+            elif record_type == TraceRecordType.SNAPSHOT:
+                if steps:
+                    steps[-1].snapshots.append(record)
+                else:
+                    pending_snapshots.append(record)
+    if pending_snapshots:
+        step = ReplayStep(trigger={'type': TraceRecordType.RUN})
+        step.snapshots = pending_snapshots
+        steps.insert(0, step)
+    return header, steps
+
+
+class ReplayOperations:
+    """
+    回放操作记录：统计回放过程中对假下载器的写操作
+    """
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+
+    def add(self, operation: str):
+        self.counts[operation] = self.counts.get(operation, 0) + 1
+
+
+class ReplayQbittorrentClient:
+    """
+    回放用qb客户端，吞掉所有写操作
+    """
+
+    def __init__(self, operations: ReplayOperations, private_hashes: set):
+        self.__operations = operations
+        self.__private_hashes = private_hashes
+
+    def torrents_trackers(self, torrent_hash: str = None, **kwargs):
+        if torrent_hash in self.__private_hashes:
+            return [{'url': '** [DHT] **', 'status': 0}]
+        return []
+
+    def __getattr__(self, item: str):
+        def __operation(*args, **kwargs):
+            self.__operations.add(item)
+            return None
+        return __operation
+
+
+class ReplayQbittorrent(Qbittorrent):
+    """
+    回放用qb下载器，种子来自快照
+    """
+
+    # noinspection PyMissingConstructor
+    def __init__(self, fields: List[str], rows: List[list], operations: ReplayOperations):
+        # 不调用父类构造，避免连接真实下载器
+        self.__operations = operations
+        self.__torrents_data = [dict(zip(fields, row)) for row in rows]
+        private_hashes = set(data.get('hash') for data in self.__torrents_data if data.get('private'))
+        self.qbc = ReplayQbittorrentClient(operations=operations, private_hashes=private_hashes)
+
+    def get_torrents(self, ids=None, status=None, tags=None) -> Tuple[List[TorrentDictionary], bool]:
+        return [TorrentDictionary(data=data.copy(), client=self.qbc) for data in self.__torrents_data], False
+
+    def delete_torrents(self, delete_file: bool, ids=None) -> bool:
+        self.__operations.add('delete_torrents')
+        return True
+
+
+class ReplayTransmissionClient:
+    """
+    回放用tr客户端
+    """
+
+    def __init__(self, fields: List[str], rows: List[list]):
+        self.__torrents_data = [dict(zip(fields, row)) for row in rows]
+
+    def get_torrents(self, arguments=None, **kwargs) -> List[Torrent]:
+        return [Torrent(fields=data.copy()) for data in self.__torrents_data]
+
+
+class ReplayTransmission(Transmission):
+    """
+    回放用tr下载器，种子来自快照
+    """
+
+    # noinspection PyMissingConstructor
+    def __init__(self, fields: List[str], rows: List[list], operations: ReplayOperations):
+        # 不调用父类构造，避免连接真实下载器
+        self.__operations = operations
+        self._trarg = list(fields)
+        self.trc = ReplayTransmissionClient(fields=fields, rows=rows)
+
+    def start_torrents(self, ids=None) -> bool:
+        self.__operations.add('start_torrents')
+        return True
+
+    def set_torrent_tag(self, ids: str, tags: list, org_tags: list = None) -> bool:
+        self.__operations.add('set_torrent_tag')
+        return True
+
+    def delete_torrents(self, delete_file: bool, ids=None) -> bool:
+        self.__operations.add('delete_torrents')
+        return True
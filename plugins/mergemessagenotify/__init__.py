@@ -1,12 +1,34 @@
-from typing import OrderedDict, Dict, Any, List, Tuple, Type
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from threading import Thread, Condition, Lock, Event as ThreadEvent
+from types import MappingProxyType
+from typing import OrderedDict, Dict, Any, List, Tuple, Optional
 
+from fastapi.responses import PlainTextResponse
+
+from app import schemas
+from app.core.config import settings
 from app.core.event import eventmanager, Event
-from app.helper.module import ModuleHelper
 from app.log import logger
 from app.plugins import _PluginBase
 from app.plugins.mergemessagenotify.channel import Channel
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
-from app.plugins.mergemessagenotify.module import ChannelStrategy
+from app.plugins.mergemessagenotify.channel.registry import ChannelMeta, channel_metas, get_channel_meta
+from app.plugins.mergemessagenotify.chunk import MessageChunk, split_message
+from app.plugins.mergemessagenotify.dedup import DedupWindow, DedupEntry
+from app.plugins.mergemessagenotify.delivery import DeliveryQueue, DeliveryTask, DeliveryBackoff
+from app.plugins.mergemessagenotify.digest import DigestBuffer, DigestMessage
+from app.plugins.mergemessagenotify.flow import ChannelGuard
+from app.plugins.mergemessagenotify.image import image_cache
+from app.plugins.mergemessagenotify.metrics import SendMetrics, SendTrace, bind_trace, set_trace_error, trace_phase, \
+    TracePhase
+from app.plugins.mergemessagenotify.module import ChannelStrategy, OrderMode, MessagePriority, PendingMessage
+from app.plugins.mergemessagenotify.priority import PriorityDispatcher, PriorityTask
+from app.plugins.mergemessagenotify.session import http_session_pool
+from app.plugins.mergemessagenotify.smtppool import smtp_pool
+from app.plugins.mergemessagenotify.wsclient import onebot_ws_pool
+from app.plugins.mergemessagenotify.stats import ChannelStats
 from app.schemas.types import EventType, NotificationType
 
 
@@ -18,7 +40,7 @@ class MergeMessageNotify(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/hotlcc/MoviePilot-Plugins-Third/main/icons/MergeMessageNotify_121.png"
     # 插件版本
-    plugin_version = "1.18.1"
+    plugin_version = "1.38"
     # 插件作者
     plugin_author = "hotlcc"
     # 作者主页
@@ -31,30 +53,105 @@ class MergeMessageNotify(_PluginBase):
     auth_level = 1
 
     # 注册组件
-    # 注册组件对象
+    # 注册组件对象，只包含已加载的组件，按组件顺序排列
     __comp_objs: OrderedDict[str, Channel] = OrderedDict()
+    # 组件加载锁
+    __comp_lock: Lock = Lock()
+
+    # 私有组件
+    # 发送线程池最大线程数
+    __send_executor_max_workers: int = 16
+    # 发送线程池
+    __send_executor: Optional[ThreadPoolExecutor] = None
+    # 发送队列
+    __delivery_queue: Optional[DeliveryQueue] = None
+    # 发送队列唤醒条件
+    __delivery_condition: Condition = Condition()
+    # 发送队列工作线程
+    __delivery_workers: List[Thread] = []
+    # 发送队列工作线程停止事件，每次启动时新建
+    __delivery_stop_event: Optional[ThreadEvent] = None
+    # 发送队列重试退避
+    __delivery_backoff: DeliveryBackoff = DeliveryBackoff()
+    # 消息汇总缓冲
+    __digest_buffer: Optional[DigestBuffer] = None
+    # 优先级分发
+    __priority_dispatcher: Optional[PriorityDispatcher] = None
+    # 重复消息抑制窗口
+    __dedup_window: Optional[DedupWindow] = None
+    # 渠道流控：组件key -> 令牌桶 + 熔断器
+    __channel_guards: Dict[str, ChannelGuard] = {}
+    # 渠道发送统计：组件key -> 统计，跨配置重载保留
+    __channel_stats: Dict[str, ChannelStats] = {}
+    # 渠道发送指标，跨配置重载保留
+    __send_metrics: SendMetrics = SendMetrics()
+    # 发送指标API路径
+    __metrics_endpoint: str = "/metrics"
 
     # 配置相关
     # 插件缺省配置
     __config_default: Dict[str, Any] = {
-        "channel_strategy": "ALL_SELECTED"
+        "channel_strategy": "ALL_SELECTED",
+        "order_mode": "FIXED",
+        "dedup_window": 0,
+        "channel_timeout": 30,
+        "total_timeout": 60,
+        "queue_workers": 4,
+        "queue_max_attempts": 8,
+        "http_pool_maxsize": 10,
+        "http_timeout": 20,
+        "breaker_threshold": 5,
+        "breaker_cooldown": 60,
+        "slow_send_threshold": 3,
+        "high_priority_types": ["Manual"],
+        "high_priority_keywords": "失败,错误,异常",
+        "normal_queue_limit": 200,
+        "low_queue_limit": 50,
+        "image_cache_size": 100,
+        "image_max_dimension": 0
     }
     # 插件用户配置
     __config: Dict[str, Any] = {}
+    # 组件配置索引：组件key -> 组件配置（只读），仅在插件初始化和更新组件配置时重建
+    __comp_configs: Dict[str, MappingProxyType] = {}
+    # 空的组件配置
+    __empty_comp_config: MappingProxyType = MappingProxyType({})
 
     def init_plugin(self, config: dict = None):
         """
         生效配置信息
         :param config: 配置信息字典
         """
+        # 在新配置生效前，按当前配置和渠道发送重复提示、优先级通道中和待汇总的消息，并停止发送队列，避免注册组件期间投递
+        self.__flush_dedup()
+        self.__stop_priority()
+        self.__flush_digest()
+        self.__stop_delivery()
         # 加载插件配置
         self.__config = config
         # 修正配置
         config = self.__fix_config(config=config)
         # 重新加载插件配置
         self.__config = config
+        # 重建组件配置索引
+        self.__rebuild_comp_configs()
+        # 配置HTTP会话池
+        http_session_pool.configure(pool_maxsize=self.__get_int_config_item(config_key="http_pool_maxsize"),
+                                    timeout=self.__get_timeout_config_item(config_key="http_timeout"))
+        # 配置图片缓存
+        image_cache.configure(cache_dir=self.get_data_path() / "images" if self.__get_config_item("enable_image_cache") else None,
+                              max_bytes=self.__get_int_config_item(config_key="image_cache_size") * 1024 * 1024,
+                              max_dimension=self.__get_int_config_item(config_key="image_max_dimension"))
         # 注册组件
         self.__register_comp()
+        # 重置渠道流控
+        self.__channel_guards = {}
+        # 启动发送队列
+        if self.get_state() and self.__get_config_item("enable_queue"):
+            self.__start_delivery()
+        # 启动优先级分发
+        if self.get_state() and self.__get_config_item("enable_priority"):
+            self.__start_priority()
 
     def get_state(self) -> bool:
         """
@@ -87,7 +184,26 @@ class MergeMessageNotify(_PluginBase):
             "description": "API说明"
         }]
         """
-        pass
+        metrics_api = {
+            "path": self.__metrics_endpoint,
+            "endpoint": self.__get_metrics,
+            "methods": ["GET"],
+            "auth": "apikey",
+            "summary": "获取渠道发送指标",
+            "description": "以Prometheus文本格式输出各渠道的发送次数、失败原因和耗时分布"
+        }
+        return [metrics_api]
+
+    def __get_metrics(self, apikey: str = None):
+        """
+        渠道发送指标（Prometheus文本格式）
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        return PlainTextResponse(
+            content=self.__send_metrics.render_prometheus(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -98,6 +214,8 @@ class MergeMessageNotify(_PluginBase):
         config_suggest = {}
         # 合并默认配置
         config_suggest.update(self.__config_default)
+        # 打开配置页面时加载全部组件
+        self.__load_all_comps()
         # 合并组件的表单建议配置
         for _, comp_obj in self.__comp_objs.items():
             comp_form_data = self.__get_comp_form_data(comp_obj=comp_obj)
@@ -105,11 +223,18 @@ class MergeMessageNotify(_PluginBase):
                 config_suggest.update(comp_form_data)
         # 通知渠道下拉数据
         channel_select_items = [{
-            "title": comp_obj.comp_name,
-            "value": comp_obj.comp_key
-        } for _, comp_obj in self.__comp_objs.items() if comp_obj and comp_obj.comp_key and comp_obj.comp_name]
+            "title": meta.name,
+            "value": meta.key
+        } for meta in channel_metas]
         # 头部元素
         channel_strategy_hint_desc = "；".join([item.name_ + "-" + item.desc for item in ChannelStrategy])
+        order_mode_hint_desc = "；".join([item.name_ + "-" + item.desc for item in OrderMode])
+        priority_hint_desc = "；".join([item.name_ + "-" + item.desc for item in MessagePriority])
+        # 消息类型下拉数据
+        notify_type_select_items = [{
+            "title": type.value,
+            "value": type.name
+        } for type in NotificationType if type]
         header_elements = [{
             'component': 'VRow',
             'content': [{
@@ -165,6 +290,358 @@ class MergeMessageNotify(_PluginBase):
                         'hint': f'选填。【当前使用通知渠道】选择的渠道以何种策略运行：{channel_strategy_hint_desc}。缺省时为“{ChannelStrategy.ALL_SELECTED.name_}”。'
                     }
                 }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'channel_timeout',
+                        'label': '单渠道超时（秒）',
+                        'type': 'number',
+                        'hint': f'选填。“{ChannelStrategy.ALL_SELECTED.name_}”策略下各渠道并行发送，单个渠道超过该时间未完成即视为失败。缺省时为{self.__config_default.get("channel_timeout")}秒。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'total_timeout',
+                        'label': '总超时（秒）',
+                        'type': 'number',
+                        'hint': f'选填。“{ChannelStrategy.ALL_SELECTED.name_}”策略下一条消息发送的总时长上限，超时后未完成的渠道视为失败。缺省时为{self.__config_default.get("total_timeout")}秒。'
+                    }
+                }]
+            }]
+        }, {
+            'component': 'VRow',
+            'content': [{
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VSelect',
+                    'props': {
+                        'model': 'order_mode',
+                        'label': '渠道排序方式',
+                        'items': [{
+                            'title': item.name_,
+                            'value': item.name
+                        } for item in OrderMode],
+                        'hint': f'选填。“{ChannelStrategy.ORDER_SUCCESS_ONE.name_}”策略下渠道的尝试顺序：{order_mode_hint_desc}。缺省时为“{OrderMode.FIXED.name_}”。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VSwitch',
+                    'props': {
+                        'model': 'enable_hedge',
+                        'label': '对冲发送',
+                        'hint': f'“{ChannelStrategy.ORDER_SUCCESS_ONE.name_}”策略下，当前渠道超过其近期耗时的95分位数仍未返回时提前尝试下一个渠道，任一渠道成功即止；极端情况下可能重复收到消息。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'dedup_window',
+                        'label': '重复消息抑制窗口（秒）',
+                        'type': 'number',
+                        'hint': '选填。标题、内容和类型都相同的消息在该时间内只发送第一条，窗口结束时如有重复，补发一条带重复次数的提示。缺省或为0时不抑制。'
+                    }
+                }]
+            }]
+        }, {
+            'component': 'VRow',
+            'content': [{
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VSwitch',
+                    'props': {
+                        'model': 'enable_queue',
+                        'label': '持久化发送队列',
+                        'hint': '开启后消息先写入插件数据目录下的发送队列再由后台线程投递，失败按指数退避重试，重启后未投递的消息仍会继续投递；同时提供仪表板发送队列组件。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'queue_workers',
+                        'label': '队列投递线程数',
+                        'type': 'number',
+                        'hint': f'选填。缺省时为{self.__config_default.get("queue_workers")}。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'queue_max_attempts',
+                        'label': '队列最大尝试次数',
+                        'type': 'number',
+                        'hint': f'选填。单个渠道投递失败达到该次数后放弃。缺省时为{self.__config_default.get("queue_max_attempts")}。'
+                    }
+                }]
+            }]
+        }, {
+            'component': 'VRow',
+            'content': [{
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VSwitch',
+                    'props': {
+                        'model': 'enable_priority',
+                        'label': '优先级分发',
+                        'hint': f'开启后消息按优先级进入独立的通道由后台线程分发，{priority_hint_desc}。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VSelect',
+                    'props': {
+                        'model': 'high_priority_types',
+                        'label': '高优先级消息类型',
+                        'multiple': True,
+                        'chips': True,
+                        'clearable': True,
+                        'items': notify_type_select_items,
+                        'hint': '选填。缺省时为“手动处理”。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VSelect',
+                    'props': {
+                        'model': 'low_priority_types',
+                        'label': '低优先级消息类型',
+                        'multiple': True,
+                        'chips': True,
+                        'clearable': True,
+                        'items': notify_type_select_items,
+                        'hint': '选填。批量产生、可以延迟或合并的消息类型。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'high_priority_keywords',
+                        'label': '高优先级关键字',
+                        'hint': f'选填。标题包含任一关键字的消息为高优先级，多个用英文逗号分隔。缺省时为“{self.__config_default.get("high_priority_keywords")}”。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'normal_queue_limit',
+                        'label': '普通优先级队列长度',
+                        'type': 'number',
+                        'hint': f'选填。超出时在事件线程直接分发。缺省时为{self.__config_default.get("normal_queue_limit")}。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'low_queue_limit',
+                        'label': '低优先级队列长度',
+                        'type': 'number',
+                        'hint': f'选填。超出时按消息类型合并为汇总消息，汇总的消息数也达到该值时丢弃。缺省时为{self.__config_default.get("low_queue_limit")}。'
+                    }
+                }]
+            }]
+        }, {
+            'component': 'VRow',
+            'content': [{
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'http_pool_maxsize',
+                        'label': 'HTTP连接池大小',
+                        'type': 'number',
+                        'hint': f'选填。基于HTTP的渠道按“协议+主机+代理”复用长连接，该值为每个主机保持的最大连接数。缺省时为{self.__config_default.get("http_pool_maxsize")}。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'http_timeout',
+                        'label': 'HTTP请求超时（秒）',
+                        'type': 'number',
+                        'hint': f'选填。基于HTTP的渠道单次请求的超时时间。缺省时为{self.__config_default.get("http_timeout")}秒。'
+                    }
+                }]
+            }]
+        }, {
+            'component': 'VRow',
+            'content': [{
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'breaker_threshold',
+                        'label': '熔断失败次数',
+                        'type': 'number',
+                        'hint': f'选填。渠道连续失败达到该次数后熔断，熔断期间直接跳过该渠道。缺省时为{self.__config_default.get("breaker_threshold")}次。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'breaker_cooldown',
+                        'label': '熔断冷却时间（秒）',
+                        'type': 'number',
+                        'hint': f'选填。熔断后经过该时间放行一次探测发送，成功则恢复。缺省时为{self.__config_default.get("breaker_cooldown")}秒。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'slow_send_threshold',
+                        'label': '慢发送阈值（秒）',
+                        'type': 'number',
+                        'hint': f'选填。渠道发送耗时超过该值时记录耗时分解（读取配置、渲染模板、签名加密、网络请求），可在仪表板查看。缺省时为{self.__config_default.get("slow_send_threshold")}秒。'
+                    }
+                }]
+            }]
+        }, {
+            'component': 'VRow',
+            'content': [{
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VSwitch',
+                    'props': {
+                        'model': 'enable_image_cache',
+                        'label': '图片缓存',
+                        'hint': '开启后消息图片只下载一次并缓存在插件数据目录下，Apprise以本地文件附加，邮件以内嵌图片发送。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'image_cache_size',
+                        'label': '图片缓存容量（MB）',
+                        'type': 'number',
+                        'hint': f'选填。超出时删除最久未使用的图片。缺省时为{self.__config_default.get("image_cache_size")}MB。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'image_max_dimension',
+                        'label': '图片最大边长（像素）',
+                        'type': 'number',
+                        'hint': '选填。缓存时将超出该边长的图片等比缩小，需要安装Pillow。缺省或为0时不缩小。'
+                    }
+                }]
             }]
         }]
         # 尾部元素
@@ -187,6 +664,179 @@ class MergeMessageNotify(_PluginBase):
         """
         pass
 
+    def get_dashboard_meta(self) -> Optional[List[Dict[str, str]]]:
+        """
+        获取插件仪表盘元信息
+        返回示例：
+            [{
+                "key": "dashboard1", // 仪表盘的key，在当前插件范围唯一
+                "name": "仪表盘1" // 仪表盘的名称
+            }, {
+                "key": "dashboard2",
+                "name": "仪表盘2"
+            }]
+        """
+        dashboard_meta = []
+        if not self.get_state():
+            return dashboard_meta
+        dashboard_meta.append({
+            "key": "channel_metrics",
+            "name": "渠道发送指标"
+        })
+        if self.__get_config_item("enable_queue"):
+            dashboard_meta.append({
+                "key": "delivery_queue",
+                "name": "消息发送队列"
+            })
+        return dashboard_meta
+
+    def get_dashboard(self, key: str = None, **kwargs) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], List[dict]]]:
+        """
+        获取插件仪表盘页面，需要返回：1、仪表板col配置字典；2、全局配置（自动刷新等）；3、仪表板页面元素配置json（含数据）
+        1、col配置参考：
+        {
+            "cols": 12, "md": 6
+        }
+        2、全局配置参考：
+        {
+            "refresh": 10 // 自动刷新时间，单位秒
+        }
+        3、页面配置使用Vuetify组件拼装，参考：https://vuetifyjs.com/
+
+        kwargs参数可获取的值：1、user_agent：浏览器UA
+
+        :param key: 仪表盘key，根据指定的key返回相应的仪表盘数据，缺省时返回一个固定的仪表盘数据（兼容旧版）
+        """
+        if not key or not self.get_dashboard_meta():
+            return None
+        if key == "channel_metrics":
+            return self.__get_dashboard_channel_metrics_widget()
+        if key == "delivery_queue":
+            return self.__get_dashboard_delivery_queue_widget()
+        return None
+
+    def __get_dashboard_channel_metrics_widget(self) -> Tuple[Dict[str, Any], Dict[str, Any], List[dict]]:
+        """
+        获取仪表板渠道发送指标组件：各渠道发送统计、优先级通道积压和最近的慢发送
+        """
+        # 列配置
+        cols = {
+            'cols': 12,
+            'md': 8,
+        }
+        # 全局配置
+        attrs = {
+            'title': '渠道发送指标',
+            'refresh': 30
+        }
+        rows = []
+        for comp_name, attempts, successes, failures, network_latency in self.__send_metrics.get_summary():
+            failure_text = ", ".join(f"{reason}: {count}" for reason, count in sorted(failures.items())) or "-"
+            latency_text = f"{network_latency * 1000:.0f}ms" if network_latency is not None else "-"
+            rows.append([comp_name, str(attempts), str(successes), failure_text, latency_text])
+        slow_rows = []
+        for trace in self.__send_metrics.get_slow_traces():
+            slow_rows.append([datetime.fromtimestamp(trace.start_time).strftime("%m-%d %H:%M:%S"), trace.comp_name,
+                              f"{trace.duration:.2f}秒", trace.format_phases()])
+
+        def __build_table(headers: List[str], table_rows: List[List[str]]) -> dict:
+            return {
+                'component': 'VTable',
+                'props': {
+                    'density': 'compact',
+                },
+                'content': [{
+                    'component': 'thead',
+                    'content': [{
+                        'component': 'tr',
+                        'content': [{
+                            'component': 'th',
+                            'text': header
+                        } for header in headers]
+                    }]
+                }, {
+                    'component': 'tbody',
+                    'content': [{
+                        'component': 'tr',
+                        'content': [{
+                            'component': 'td',
+                            'text': value
+                        } for value in row]
+                    } for row in table_rows]
+                }]
+            }
+
+        # 页面元素
+        elements = [__build_table(headers=['渠道', '发送', '成功', '失败原因', '平均网络耗时'], table_rows=rows)]
+        priority_dispatcher = self.__priority_dispatcher
+        if priority_dispatcher:
+            backlog_rows = [[priority.name_, str(pending), str(overflow), str(shed)]
+                            for priority, (pending, overflow, shed) in priority_dispatcher.get_backlog().items()]
+            elements.append({
+                'component': 'div',
+                'props': {
+                    'class': 'text-subtitle-2 mt-4'
+                },
+                'text': '优先级通道'
+            })
+            elements.append(__build_table(headers=['优先级', '排队', '待汇总', '已丢弃'], table_rows=backlog_rows))
+        if slow_rows:
+            elements.append({
+                'component': 'div',
+                'props': {
+                    'class': 'text-subtitle-2 mt-4'
+                },
+                'text': '最近的慢发送'
+            })
+            elements.append(__build_table(headers=['时间', '渠道', '总耗时', '耗时分解'], table_rows=slow_rows))
+        return cols, attrs, elements
+
+    def __get_dashboard_delivery_queue_widget(self) -> Tuple[Dict[str, Any], Dict[str, Any], List[dict]]:
+        """
+        获取仪表板发送队列组件
+        """
+        # 列配置
+        cols = {
+            'cols': 12,
+            'md': 4,
+        }
+        # 全局配置
+        attrs = {
+            'title': '消息发送队列',
+            'refresh': 10
+        }
+        stats = self.__delivery_queue.stats() if self.__delivery_queue else {}
+        rows = [
+            ('待投递', stats.get("pending", 0)),
+            ('重试中', stats.get("retrying", 0)),
+            ('已放弃', stats.get("dead", 0)),
+            ('最早待投递消息已等待', f'{stats.get("oldest_age", 0)}秒'),
+        ]
+        # 页面元素
+        elements = [{
+            'component': 'VTable',
+            'props': {
+                'density': 'compact',
+            },
+            'content': [{
+                'component': 'tbody',
+                'content': [{
+                    'component': 'tr',
+                    'content': [{
+                        'component': 'td',
+                        'text': name
+                    }, {
+                        'component': 'td',
+                        'props': {
+                            'class': 'text-end'
+                        },
+                        'text': str(value)
+                    }]
+                } for name, value in rows]
+            }]
+        }]
+        return cols, attrs, elements
+
     def get_service(self) -> List[Dict[str, Any]]:
         """
         注册插件公共服务
@@ -250,22 +900,36 @@ class MergeMessageNotify(_PluginBase):
             config_value = config_default.get(config_key)
         return config_value
 
-    def get_comp_config(self, comp_key: str) -> Dict[str, Any]:
+    @staticmethod
+    def __split_comp_config_key(key: str) -> Tuple[Optional[str], Optional[str]]:
         """
-        获取组件配置
+        拆分组件配置键：组件key中可能包含“.”，组件配置项的键不包含“.”
+        :return: 组件key, 组件配置项的键
         """
-        comp_config = {}
-        if not comp_key:
-            return comp_config
-        if not self.__config:
-            return comp_config
-        key_prefix = f"{comp_key}."
-        for key, value in self.__config.items():
-            if not key or not key.startswith(key_prefix):
+        if not key or "." not in key:
+            return None, None
+        comp_key, comp_config_key = key.rsplit(".", 1)
+        return comp_key, comp_config_key
+
+    def __rebuild_comp_configs(self):
+        """
+        重建组件配置索引
+        """
+        comp_configs: Dict[str, Dict[str, Any]] = {}
+        for key, value in (self.__config or {}).items():
+            comp_key, comp_config_key = self.__split_comp_config_key(key=key)
+            if not comp_key or not comp_config_key:
                 continue
-            comp_config_key = key.removeprefix(key_prefix)
-            comp_config[comp_config_key] = value
-        return comp_config
+            comp_configs.setdefault(comp_key, {})[comp_config_key] = value
+        self.__comp_configs = {comp_key: MappingProxyType(comp_config) for comp_key, comp_config in comp_configs.items()}
+
+    def get_comp_config(self, comp_key: str) -> MappingProxyType:
+        """
+        获取组件配置（只读）
+        """
+        if not comp_key:
+            return self.__empty_comp_config
+        return self.__comp_configs.get(comp_key) or self.__empty_comp_config
 
     def update_comp_config(self, comp_key: str, comp_config: dict) -> bool:
         """"
@@ -286,6 +950,12 @@ class MergeMessageNotify(_PluginBase):
                 config[key] = value
         result = self.update_config(config=config)
         self.__config = config
+        # 只需重建该组件的配置索引
+        comp_configs = dict(self.__comp_configs)
+        comp_configs[comp_key] = MappingProxyType({
+            comp_config_key: value for comp_config_key, value in (comp_config or {}).items() if comp_config_key
+        })
+        self.__comp_configs = comp_configs
         return result
 
     def __filter_comp_type(self, comp_type: type) -> bool:
@@ -300,41 +970,66 @@ class MergeMessageNotify(_PluginBase):
 
     def __register_comp(self):
         """
-        注册组件
+        注册组件：只加载启用的渠道和待测试的渠道，其余渠道在打开配置页面或实际用到时再加载
         """
-        # 加载所有组件类
-        comp_types: List[Type[Channel]] = ModuleHelper.load(
-            package_path="app.plugins.mergemessagenotify.channel",
-            filter_func=lambda _, obj: self.__filter_comp_type(comp_type=obj)
-        ) + ModuleHelper.load(
-            package_path="app.plugins.mergemessagenotify.channel.custom",
-            filter_func=lambda _, obj: self.__filter_comp_type(comp_type=obj)
-        )
-        # 去重
-        comp_types = list(set(comp_types))
-        # 数量
-        comp_count = len(comp_types) if comp_types else 0
-        logger.info(f"总共加载到{comp_count}个组件")
-        if not comp_types:
-            return
-        # 组件排序，顺序一样时按照key排序
-        comp_types = sorted(comp_types, key=lambda comp_type: (comp_type.comp_order, comp_type.comp_key))
-        # 依次实例化并注册
-        for comp_type in comp_types:
-            #comp_name = comp_type.comp_name
+        enable_channels = set(self.__get_config_item("enable_channels") or [])
+        metas = [meta for meta in channel_metas
+                 if meta.key in enable_channels or self.get_comp_config(comp_key=meta.key).get("test_once")]
+        with self.__comp_lock:
+            # 已加载的组件重新初始化，使新配置生效
+            self.__load_comps(metas=metas + [meta for meta in channel_metas if meta.key in self.__comp_objs and meta not in metas],
+                              reinit=True)
+        logger.info(f"总共注册{len(channel_metas)}个组件，已加载{len(self.__comp_objs)}个")
+
+    def __load_comps(self, metas: List[ChannelMeta], reinit: bool = False):
+        """
+        加载组件，调用方需持有组件加载锁
+        :param reinit: 已加载的组件是否重新初始化
+        """
+        comp_objs = OrderedDict(self.__comp_objs)
+        for meta in metas:
+            comp_obj = comp_objs.get(meta.key)
+            if comp_obj and not reinit:
+                continue
             try:
-                comp_key = comp_type.comp_key
-                comp_obj = self.__comp_objs.pop(key=comp_key, default=None)
                 if not comp_obj:
+                    comp_type = meta.load_type()
+                    if not self.__filter_comp_type(comp_type=comp_type):
+                        continue
                     # 实例化组件
                     comp_obj = comp_type(plugin=self)
                 # 初始化组件
                 comp_obj.init_comp()
                 # 注册组件
-                self.__comp_objs[comp_key] = comp_obj
-                logger.info(f"注册组件 - {comp_type.__name__} - 成功")
+                comp_objs[meta.key] = comp_obj
+                logger.info(f"注册组件 - {comp_obj.__class__.__name__} - 成功")
             except Exception as e:
-                logger.error(f"注册组件 - {comp_type.__name__} - 异常: {str(e)}", exc_info=True)
+                logger.error(f"注册组件 - {meta.module_path}.{meta.class_name} - 异常: {str(e)}", exc_info=True)
+        # 按组件顺序排列，替换整个字典，读取方无需加锁
+        orders = {meta.key: index for index, meta in enumerate(channel_metas)}
+        self.__comp_objs = OrderedDict(sorted(comp_objs.items(), key=lambda item: orders.get(item[0], len(orders))))
+
+    def __load_all_comps(self):
+        """
+        加载全部组件，用于拼装配置页面
+        """
+        with self.__comp_lock:
+            self.__load_comps(metas=[meta for meta in channel_metas if meta.key not in self.__comp_objs])
+
+    def __get_comp_obj(self, comp_key: str) -> Optional[Channel]:
+        """
+        获取组件，未加载时加载
+        """
+        comp_obj = self.__comp_objs.get(comp_key)
+        if comp_obj:
+            return comp_obj
+        meta = get_channel_meta(key=comp_key)
+        if not meta:
+            return None
+        with self.__comp_lock:
+            if comp_key not in self.__comp_objs:
+                self.__load_comps(metas=[meta])
+        return self.__comp_objs.get(comp_key)
 
     def __wrapper_comp_form_model(self, comp_key: str, model: str) -> str:
         """
@@ -477,8 +1172,18 @@ class MergeMessageNotify(_PluginBase):
         """
         try:
             logger.info('尝试回收内存...')
+            self.__flush_dedup()
+            self.__stop_priority()
+            self.__flush_digest()
+            self.__stop_delivery()
             if self.__comp_objs:
                 self.__comp_objs.clear()
+            if self.__send_executor:
+                self.__send_executor.shutdown(wait=False, cancel_futures=True)
+                self.__send_executor = None
+            http_session_pool.close()
+            smtp_pool.close()
+            onebot_ws_pool.close()
             logger.info('回收内存成功')
         except Exception as e:
             logger.error(f"回收内存异常: {str(e)}", exc_info=True)
@@ -525,32 +1230,628 @@ class MergeMessageNotify(_PluginBase):
                 return
             # 消息类型在MPv1中是type，在MPv2中是mtype
             type: NotificationType = message_info.get("type") or message_info.get("mtype")
-            # 渠道策略
-            channel_strategy = self.__get_config_item(config_key="channel_strategy")
-            is_order_success_one: bool = (ChannelStrategy.ORDER_SUCCESS_ONE.name == channel_strategy)
-            # 成功失败数
-            success_count = 0
-            fail_count = 0
-            for enable_channel in enable_channels:
-                # 处理【顺序优先，成功即止】策略
-                if is_order_success_one and success_count > 0:
-                    break
-                if not enable_channel:
-                    continue
-                comp_key = enable_channel
-                comp_obj = self.__comp_objs.get(comp_key)
-                if not comp_obj:
-                    continue
-                try:
-                    success = comp_obj.send_message(title=title, text=text, type=type, ext_info=message_info)
-                    if success:
-                        success_count += 1
-                    else:
-                        fail_count += 1
-                    logger.info(f"消息发送执行完成: 渠道 = {comp_obj.comp_name} success = {success}")
-                except Exception as e:
-                    fail_count += 1
-                    logger.error(f"消息发送执行异常: 渠道 = {comp_obj.comp_name}", exc_info=True)
-            logger.info(f'发送消息通知事件监听任务执行成功: 成功渠道数 = {success_count}, 失败渠道数 = {fail_count}')
+            # 重复消息抑制：在渲染模板和发送之前丢弃窗口内的重复消息
+            if not self.__check_dedup(title=title, text=text, type=type, message_info=message_info):
+                logger.info('发送消息通知事件监听任务执行中止: 重复消息已抑制')
+                return
+            # 优先级分发：按优先级进入独立的通道，由通道的工作线程分发；通道已满时在当前线程直接分发
+            priority = self.__get_message_priority(title=title, type=type)
+            priority_dispatcher = self.__priority_dispatcher
+            if priority_dispatcher and priority_dispatcher.submit(priority=priority, task=PriorityTask(
+                    title=title, text=text, type=type, message_info=message_info)):
+                logger.info(f'发送消息通知事件监听任务执行成功: 消息已进入优先级通道, 优先级 = {priority.name_}')
+                return
+            self.__dispatch_message(enable_channels=enable_channels, title=title, text=text, type=type, message_info=message_info,
+                                    priority=priority)
         except Exception as e:
             logger.error(f'发送消息通知事件监听任务执行异常: {str(e)}', exc_info=True)
+
+    def __dispatch_message(self, enable_channels: List[str], title: str, text: str, type: NotificationType, message_info: dict,
+                           priority: MessagePriority = MessagePriority.NORMAL,
+                           pending_messages: Optional[List[PendingMessage]] = None):
+        """
+        按渠道策略分发消息：汇总、入队或直接发送
+        :param priority: 消息优先级，入队时优先级高的先投递
+        :param pending_messages: 不为None时，需直接发送的消息不在当前线程发送，而是加入该列表
+        """
+        # 启用的渠道组件
+        comp_objs = [self.__get_comp_obj(comp_key=enable_channel) for enable_channel in enable_channels if enable_channel]
+        comp_objs = [comp_obj for comp_obj in comp_objs if comp_obj]
+        # 渠道策略
+        channel_strategy = self.__get_config_item(config_key="channel_strategy")
+        in_order = ChannelStrategy.ORDER_SUCCESS_ONE.name == channel_strategy
+        # 消息汇总：仅在【全部所选】策略下生效，进入汇总的渠道不再单独发送
+        if not in_order:
+            comp_objs = self.__add_digest(comp_objs=comp_objs, title=title, text=text, type=type, priority=priority)
+            if not comp_objs:
+                logger.info('发送消息通知事件监听任务执行成功: 消息已进入汇总')
+                return
+        # 持久化发送队列，扩展信息无法序列化时直接发送，保证与直接发送的内容一致
+        if self.__delivery_queue:
+            comp_keys_list = [[comp_obj.comp_key for comp_obj in comp_objs]] if in_order \
+                else [[comp_obj.comp_key] for comp_obj in comp_objs]
+            try:
+                count = self.__delivery_queue.put(comp_keys_list=comp_keys_list, in_order=in_order, title=title, text=text,
+                                                  type_name=type.name if type else None, ext_info=message_info,
+                                                  priority=priority.level)
+            except ValueError as e:
+                logger.warn(f'消息无法写入发送队列，改为直接发送: {str(e)}')
+            else:
+                with self.__delivery_condition:
+                    self.__delivery_condition.notify_all()
+                logger.info(f'发送消息通知事件监听任务执行成功: 入队任务数 = {count}')
+                return
+        if pending_messages is not None:
+            pending_messages.append(PendingMessage(comp_objs=comp_objs, in_order=in_order, title=title, text=text,
+                                                   type=type, message_info=message_info))
+            return
+        if in_order:
+            success_count, fail_count = self.__send_message_in_order(comp_objs=comp_objs, title=title, text=text, type=type, message_info=message_info)
+        else:
+            success_count, fail_count = self.__send_message_in_parallel(comp_objs=comp_objs, title=title, text=text, type=type, message_info=message_info)
+        logger.info(f'发送消息通知事件监听任务执行成功: 成功渠道数 = {success_count}, 失败渠道数 = {fail_count}')
+
+    def __get_channel_guard(self, comp_obj: Channel) -> ChannelGuard:
+        """
+        获取渠道流控，不存在时创建
+        """
+        guard = self.__channel_guards.get(comp_obj.comp_key)
+        if guard:
+            return guard
+        guard = ChannelGuard(rate_per_minute=comp_obj.get_rate_per_minute(),
+                             failure_threshold=self.__get_int_config_item(config_key="breaker_threshold"),
+                             cooldown=self.__get_timeout_config_item(config_key="breaker_cooldown"))
+        # 并发创建时以先写入的为准
+        return self.__channel_guards.setdefault(comp_obj.comp_key, guard)
+
+    def __send_message_by_comp(self, comp_obj: Channel, title: str, text: str, type: NotificationType, message_info: dict,
+                               wait_timeout: float = 0) -> bool:
+        """
+        通过指定渠道发送消息，渠道熔断或限流时直接跳过
+        :param wait_timeout: 限流时等待令牌的最长时间（秒），为0时不等待
+        :return: 是否成功
+        """
+        # 渠道未启用该消息类型时不经过流控，也不计入熔断
+        if type and not comp_obj.check_notify_type_enabled(type=type):
+            return self.__do_send_message_by_comp(comp_obj=comp_obj, title=title, text=text, type=type, message_info=message_info)
+        guard = self.__get_channel_guard(comp_obj=comp_obj)
+        if not guard.breaker.allow():
+            self.__send_metrics.record_skip(comp_key=comp_obj.comp_key, comp_name=comp_obj.comp_name,
+                                            reason=SendMetrics.reason_circuit_open)
+            logger.warn(f"消息发送跳过: 渠道 = {comp_obj.comp_name}, 渠道已熔断")
+            return False
+        if not guard.acquire(timeout=wait_timeout):
+            guard.breaker.cancel()
+            self.__send_metrics.record_skip(comp_key=comp_obj.comp_key, comp_name=comp_obj.comp_name,
+                                            reason=SendMetrics.reason_rate_limited)
+            logger.warn(f"消息发送跳过: 渠道 = {comp_obj.comp_name}, 超出发送频率限制")
+            return False
+        trace = SendTrace(comp_key=comp_obj.comp_key, comp_name=comp_obj.comp_name)
+        with bind_trace(trace):
+            # 超长消息按渠道的单条消息最大字节数切分
+            with trace_phase(TracePhase.RENDER):
+                chunks = split_message(title=title, text=text, max_bytes=comp_obj.get_max_message_bytes(),
+                                       overhead_bytes=comp_obj.get_message_overhead_bytes(ext_info=message_info))
+            success = self.__send_chunks_by_comp(comp_obj=comp_obj, guard=guard, chunks=chunks, type=type, message_info=message_info)
+        latency = trace.finish()
+        guard.breaker.record(success=success)
+        self.__get_channel_stats(comp_key=comp_obj.comp_key).record(success=success, latency=latency)
+        if self.__send_metrics.record(trace=trace, success=success,
+                                      slow_threshold=self.__get_timeout_config_item(config_key="slow_send_threshold")):
+            logger.warn(f"慢发送: 渠道 = {comp_obj.comp_name}, 总耗时 = {latency * 1000:.1f}ms, {trace.format_phases()}")
+        return success
+
+    def __send_chunks_by_comp(self, comp_obj: Channel, guard: ChannelGuard, chunks: List[MessageChunk], type: NotificationType,
+                              message_info: dict) -> bool:
+        """
+        依次发送切分后的消息段，第一段已获取发送令牌，后续段限流时等待令牌；任一段失败时不再发送剩余的段
+        :return: 是否全部成功
+        """
+        if len(chunks) == 1:
+            return self.__do_send_message_by_comp(comp_obj=comp_obj, title=chunks[0].title, text=chunks[0].text, type=type,
+                                                  message_info=message_info)
+        logger.info(f"消息已切分: 渠道 = {comp_obj.comp_name}, 段数 = {len(chunks)}")
+        # 图片只随第一段发送
+        rest_message_info = {key: value for key, value in (message_info or {}).items() if key != "image"}
+        wait_timeout = self.__get_timeout_config_item(config_key="channel_timeout")
+        for chunk in chunks:
+            if chunk.index > 1 and not guard.acquire(timeout=wait_timeout):
+                logger.warn(f"消息段发送中止: 渠道 = {comp_obj.comp_name}, 段 = {chunk.index}/{chunk.total}, 超出发送频率限制")
+                return False
+            if not self.__do_send_message_by_comp(comp_obj=comp_obj, title=chunk.title, text=chunk.text, type=type,
+                                                  message_info=message_info if chunk.index == 1 else rest_message_info):
+                logger.warn(f"消息段发送失败: 渠道 = {comp_obj.comp_name}, 段 = {chunk.index}/{chunk.total}")
+                return False
+        return True
+
+    def __get_channel_stats(self, comp_key: str) -> ChannelStats:
+        """
+        获取渠道发送统计，不存在时创建
+        """
+        stats = self.__channel_stats.get(comp_key)
+        if stats:
+            return stats
+        return self.__channel_stats.setdefault(comp_key, ChannelStats())
+
+    def __sort_comp_objs(self, comp_objs: List[Channel]) -> List[Channel]:
+        """
+        按渠道排序方式排序，自适应时健康且耗时短的渠道在前（稳定排序，同等条件下保持选择的顺序）
+        """
+        if OrderMode.ADAPTIVE.name != self.__get_config_item(config_key="order_mode"):
+            return comp_objs
+        return sorted(comp_objs, key=lambda comp_obj: self.__get_channel_stats(comp_key=comp_obj.comp_key).sort_key())
+
+    @staticmethod
+    def __do_send_message_by_comp(comp_obj: Channel, title: str, text: str, type: NotificationType, message_info: dict) -> bool:
+        """
+        通过指定渠道发送消息
+        :return: 是否成功
+        """
+        try:
+            success = comp_obj.send_message(title=title, text=text, type=type, ext_info=message_info)
+            logger.info(f"消息发送执行完成: 渠道 = {comp_obj.comp_name} success = {success}")
+            return True if success else False
+        except Exception as e:
+            set_trace_error(e)
+            logger.error(f"消息发送执行异常: 渠道 = {comp_obj.comp_name}", exc_info=True)
+            return False
+
+    def __send_message_in_order(self, comp_objs: List[Channel], title: str, text: str, type: NotificationType, message_info: dict) -> Tuple[int, int]:
+        """
+        顺序发送消息，成功即止；熔断或限流的渠道不等待，直接尝试下一个
+        :return: 成功渠道数, 失败渠道数
+        """
+        comp_objs = self.__sort_comp_objs(comp_objs=comp_objs)
+        if self.__get_config_item(config_key="enable_hedge") and len(comp_objs) > 1:
+            return self.__send_message_in_order_hedged(comp_objs=comp_objs, title=title, text=text, type=type, message_info=message_info)
+        success_count = 0
+        fail_count = 0
+        for comp_obj in comp_objs:
+            if self.__send_message_by_comp(comp_obj=comp_obj, title=title, text=text, type=type, message_info=message_info):
+                success_count += 1
+                break
+            fail_count += 1
+        return success_count, fail_count
+
+    def __send_message_in_order_hedged(self, comp_objs: List[Channel], title: str, text: str, type: NotificationType, message_info: dict) -> Tuple[int, int]:
+        """
+        顺序对冲发送：当前渠道超过其耗时95分位数（样本不足时为单渠道超时）仍未返回、或已失败时启动下一个渠道，
+        已启动的渠道不会被中断，任一渠道成功即止，总超时从开始时计算
+        :return: 成功渠道数, 失败渠道数
+        """
+        channel_timeout = self.__get_timeout_config_item(config_key="channel_timeout")
+        total_deadline = time.monotonic() + self.__get_timeout_config_item(config_key="total_timeout")
+        executor = self.__get_send_executor()
+        futures: Dict[Future, Channel] = {}
+        pending = set()
+        fail_count = 0
+        next_index = 0
+        # 启动下一个渠道的时间
+        hedge_time = 0.0
+        while True:
+            now = time.monotonic()
+            if next_index < len(comp_objs) and (not pending or now >= hedge_time):
+                comp_obj = comp_objs[next_index]
+                next_index += 1
+                if pending:
+                    logger.info(f"消息发送对冲: 启动渠道 = {comp_obj.comp_name}")
+                future = executor.submit(self.__send_message_by_comp, comp_obj=comp_obj, title=title, text=text,
+                                         type=type, message_info=message_info)
+                futures[future] = comp_obj
+                pending.add(future)
+                p95_latency = self.__get_channel_stats(comp_key=comp_obj.comp_key).get_p95_latency()
+                hedge_time = now + min(p95_latency or channel_timeout, channel_timeout)
+                continue
+            if not pending:
+                break
+            if now >= total_deadline:
+                for future in pending:
+                    future.cancel()
+                    logger.warn(f"消息发送超时: 渠道 = {futures[future].comp_name}")
+                fail_count += len(pending)
+                break
+            deadline = min(total_deadline, hedge_time) if next_index < len(comp_objs) else total_deadline
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0.01), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    return 1, fail_count
+                fail_count += 1
+            # 有渠道失败时立即启动下一个渠道
+            if done:
+                hedge_time = 0.0
+        return 0, fail_count
+
+    def __get_timeout_config_item(self, config_key: str) -> float:
+        """
+        获取超时配置项（秒），无效时使用缺省值
+        """
+        try:
+            timeout = float(self.__get_config_item(config_key=config_key))
+        except (TypeError, ValueError):
+            timeout = 0
+        if timeout <= 0:
+            timeout = float(self.__config_default.get(config_key))
+        return timeout
+
+    def __get_send_executor(self) -> ThreadPoolExecutor:
+        """
+        获取发送线程池
+        """
+        if not self.__send_executor:
+            self.__send_executor = ThreadPoolExecutor(max_workers=self.__send_executor_max_workers,
+                                                      thread_name_prefix="MergeMessageNotify")
+        return self.__send_executor
+
+    def __send_message_in_parallel(self, comp_objs: List[Channel], title: str, text: str, type: NotificationType, message_info: dict) -> Tuple[int, int]:
+        """
+        并行发送消息：各渠道在线程池中并行发送，单渠道超时从渠道开始发送时计算，总超时从提交时计算
+        超时的渠道计为失败，其发送线程不会被中断，结果将被忽略
+        :return: 成功渠道数, 失败渠道数
+        """
+        if not comp_objs:
+            return 0, 0
+        channel_timeout = self.__get_timeout_config_item(config_key="channel_timeout")
+        total_deadline = time.monotonic() + self.__get_timeout_config_item(config_key="total_timeout")
+        # 各渠道开始发送的时间
+        start_times: Dict[str, float] = {}
+
+        def __do_send(comp_obj: Channel) -> bool:
+            start_times[comp_obj.comp_key] = time.monotonic()
+            return self.__send_message_by_comp(comp_obj=comp_obj, title=title, text=text, type=type, message_info=message_info,
+                                               wait_timeout=channel_timeout)
+
+        executor = self.__get_send_executor()
+        futures: Dict[Future, Channel] = {executor.submit(__do_send, comp_obj): comp_obj for comp_obj in comp_objs}
+        success_count = 0
+        fail_count = 0
+        pending = set(futures.keys())
+        while pending:
+            now = time.monotonic()
+            # 超时的渠道
+            expired = set()
+            for future in pending:
+                start_time = start_times.get(futures[future].comp_key)
+                if now >= total_deadline or (start_time is not None and now >= start_time + channel_timeout):
+                    expired.add(future)
+            for future in expired:
+                future.cancel()
+                fail_count += 1
+                logger.warn(f"消息发送超时: 渠道 = {futures[future].comp_name}")
+            pending -= expired
+            if not pending:
+                break
+            # 等待到最近的截止时间
+            deadline = min([total_deadline] + [start_times[futures[future].comp_key] + channel_timeout
+                                               for future in pending if futures[future].comp_key in start_times])
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0.01), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    success_count += 1
+                else:
+                    fail_count += 1
+        return success_count, fail_count
+
+    def __get_int_config_item(self, config_key: str) -> int:
+        """
+        获取正整数配置项，无效时使用缺省值
+        """
+        try:
+            value = int(self.__get_config_item(config_key=config_key))
+        except (TypeError, ValueError):
+            value = 0
+        if value <= 0:
+            value = int(self.__config_default.get(config_key))
+        return value
+
+    def __start_delivery(self):
+        """
+        启动发送队列
+        """
+        try:
+            self.__delivery_queue = DeliveryQueue(db_path=self.get_data_path() / "delivery.db", enum_types=[NotificationType])
+            self.__delivery_queue.reset_leases()
+        except Exception as e:
+            self.__delivery_queue = None
+            logger.error(f"发送队列启动异常，回退为直接发送: {str(e)}", exc_info=True)
+            return
+        self.__delivery_stop_event = ThreadEvent()
+        worker_count = self.__get_int_config_item(config_key="queue_workers")
+        self.__delivery_workers = [Thread(target=self.__delivery_worker,
+                                          args=(self.__delivery_queue, self.__delivery_stop_event),
+                                          name=f"MergeMessageNotify-delivery-{index}",
+                                          daemon=True) for index in range(worker_count)]
+        for worker in self.__delivery_workers:
+            worker.start()
+        logger.info(f"发送队列启动成功: 投递线程数 = {worker_count}, 队列状态 = {self.__delivery_queue.stats()}")
+
+    def __stop_delivery(self):
+        """
+        停止发送队列
+        """
+        if not self.__delivery_queue and not self.__delivery_workers:
+            return
+        if self.__delivery_stop_event:
+            self.__delivery_stop_event.set()
+        with self.__delivery_condition:
+            self.__delivery_condition.notify_all()
+        for worker in self.__delivery_workers or []:
+            worker.join(timeout=5)
+        self.__delivery_workers = []
+        if self.__delivery_queue:
+            self.__delivery_queue.close()
+            self.__delivery_queue = None
+        logger.info("发送队列已停止")
+
+    def __delivery_worker(self, delivery_queue: DeliveryQueue, stop_event: ThreadEvent):
+        """
+        发送队列投递线程
+        """
+        while not stop_event.is_set():
+            try:
+                task = delivery_queue.take()
+                if not task:
+                    # 等待到最近的任务到期或被新任务唤醒
+                    next_time = delivery_queue.get_next_time()
+                    timeout = min(max(next_time - time.time(), 0.05), 5) if next_time else 5
+                    with self.__delivery_condition:
+                        self.__delivery_condition.wait(timeout=timeout)
+                    continue
+                self.__deliver_task(delivery_queue=delivery_queue, task=task)
+            except Exception as e:
+                if stop_event.is_set():
+                    break
+                logger.error(f"发送队列投递异常: {str(e)}", exc_info=True)
+                stop_event.wait(timeout=1)
+
+    def __deliver_task(self, delivery_queue: DeliveryQueue, task: DeliveryTask):
+        """
+        投递一个发送任务
+        """
+        comp_objs = [self.__get_comp_obj(comp_key=comp_key) for comp_key in task.comp_keys]
+        comp_objs = [comp_obj for comp_obj in comp_objs if comp_obj]
+        if not comp_objs:
+            delivery_queue.dead(task_id=task.id, attempts=task.attempts, error="渠道不存在")
+            logger.warn(f"发送队列放弃任务: 渠道不存在, 渠道 = {task.comp_keys}")
+            return
+        type = NotificationType.__members__.get(task.type_name) if task.type_name else None
+        if task.in_order:
+            success_count, _ = self.__send_message_in_order(comp_objs=comp_objs, title=task.title, text=task.text,
+                                                            type=type, message_info=task.ext_info)
+            success = success_count > 0
+        else:
+            success = self.__send_message_by_comp(comp_obj=comp_objs[0], title=task.title, text=task.text,
+                                                  type=type, message_info=task.ext_info,
+                                                  wait_timeout=self.__get_timeout_config_item(config_key="channel_timeout"))
+        if success:
+            delivery_queue.ack(task_id=task.id)
+            return
+        attempts = task.attempts + 1
+        comp_names = [comp_obj.comp_name for comp_obj in comp_objs]
+        if attempts >= self.__get_int_config_item(config_key="queue_max_attempts"):
+            delivery_queue.dead(task_id=task.id, attempts=attempts, error="超过最大尝试次数")
+            delivery_queue.purge_dead()
+            logger.warn(f"发送队列放弃任务: 超过最大尝试次数, 渠道 = {comp_names}, 尝试次数 = {attempts}")
+            return
+        delay = self.__delivery_backoff.delay(attempts=attempts)
+        delivery_queue.retry(task_id=task.id, attempts=attempts, delay=delay, error="发送失败")
+        logger.info(f"发送队列任务将重试: 渠道 = {comp_names}, 尝试次数 = {attempts}, 延迟 = {round(delay, 1)}秒")
+
+    def __get_message_priority(self, title: str, type: NotificationType) -> MessagePriority:
+        """
+        判断消息优先级：高优先级类型或标题包含高优先级关键字的为高，低优先级类型的为低，其余为普通
+        """
+        high_priority_types: List[str] = self.__get_config_item("high_priority_types") or []
+        if type and type.name in high_priority_types:
+            return MessagePriority.HIGH
+        high_priority_keywords: str = self.__get_config_item("high_priority_keywords") or ""
+        if title and any(keyword in title for keyword in
+                         [keyword.strip() for keyword in high_priority_keywords.replace("，", ",").split(",")] if keyword):
+            return MessagePriority.HIGH
+        low_priority_types: List[str] = self.__get_config_item("low_priority_types") or []
+        if type and type.name in low_priority_types:
+            return MessagePriority.LOW
+        return MessagePriority.NORMAL
+
+    def __start_priority(self):
+        """
+        启动优先级分发
+        """
+        queue_limits = {
+            MessagePriority.NORMAL: self.__get_int_config_item(config_key="normal_queue_limit"),
+            MessagePriority.LOW: self.__get_int_config_item(config_key="low_queue_limit"),
+        }
+        self.__priority_dispatcher = PriorityDispatcher(dispatch_func=self.__dispatch_priority_task, queue_limits=queue_limits)
+        self.__priority_dispatcher.start()
+        queue_limits_desc = ", ".join([f"{priority.name_} = {limit}" for priority, limit in queue_limits.items()])
+        logger.info(f"优先级分发启动成功: 队列长度上限（{queue_limits_desc}）")
+
+    def __stop_priority(self):
+        """
+        停止优先级分发，尚未分发的消息进入汇总或发送队列，其余交由后台线程发送，不阻塞当前线程；插件未启用时丢弃
+        """
+        priority_dispatcher = self.__priority_dispatcher
+        if not priority_dispatcher:
+            return
+        self.__priority_dispatcher = None
+        remain_tasks = priority_dispatcher.stop()
+        logger.info("优先级分发已停止")
+        if not remain_tasks:
+            return
+        if not self.get_state():
+            logger.warn(f"插件未启用，丢弃优先级通道中的剩余消息: 消息数 = {len(remain_tasks)}")
+            return
+        logger.info(f"分发优先级通道中的剩余消息: 消息数 = {len(remain_tasks)}")
+        pending_messages: List[PendingMessage] = []
+        for task, priority in remain_tasks:
+            try:
+                self.__dispatch_priority_task(task=task, priority=priority, pending_messages=pending_messages)
+            except Exception as e:
+                logger.error(f"优先级通道剩余消息分发异常: {str(e)}", exc_info=True)
+        self.__send_pending_messages(pending_messages=pending_messages)
+
+    def __dispatch_priority_task(self, task: PriorityTask, priority: MessagePriority,
+                                 pending_messages: Optional[List[PendingMessage]] = None):
+        """
+        分发优先级通道中的消息
+        :param pending_messages: 不为None时，需直接发送的消息不在当前线程发送，而是加入该列表
+        """
+        enable_channels: List[str] = self.__get_config_item("enable_channels") or []
+        if not enable_channels:
+            logger.warn('优先级通道消息分发中止: 没有启用任何渠道')
+            return
+        self.__dispatch_message(enable_channels=enable_channels, title=task.title, text=task.text, type=task.type,
+                                message_info=task.message_info, priority=priority, pending_messages=pending_messages)
+
+    def __add_digest(self, comp_objs: List[Channel], title: str, text: str, type: NotificationType,
+                     priority: MessagePriority = MessagePriority.NORMAL) -> List[Channel]:
+        """
+        将需要汇总的消息加入对应渠道的汇总缓冲
+        :return: 不需要汇总、仍需直接发送的渠道
+        """
+        if not type:
+            return comp_objs
+        remain_comp_objs = []
+        for comp_obj in comp_objs:
+            if not comp_obj.check_digest_notify_type(type=type) or not comp_obj.check_notify_type_enabled(type=type):
+                remain_comp_objs.append(comp_obj)
+                continue
+            if not self.__digest_buffer:
+                self.__digest_buffer = DigestBuffer(flush_func=self.__send_digest)
+            self.__digest_buffer.add(comp_key=comp_obj.comp_key, type=type,
+                                     message=DigestMessage(title=title, text=text, priority=priority),
+                                     max_delay=comp_obj.get_digest_window(),
+                                     max_size=comp_obj.get_digest_max_size())
+        return remain_comp_objs
+
+    def __send_digest(self, comp_key: str, type: Optional[NotificationType], messages: List[DigestMessage],
+                      pending_messages: Optional[List[PendingMessage]] = None):
+        """
+        发送汇总消息
+        :param pending_messages: 不为None时，需直接发送的汇总消息不在当前线程发送，而是加入该列表
+        """
+        comp_obj = self.__get_comp_obj(comp_key=comp_key)
+        if not comp_obj:
+            logger.warn(f"汇总消息发送中止: 渠道不存在, 渠道 = {comp_key}, 消息数 = {len(messages)}")
+            return
+        title, text = DigestBuffer.build_digest(type=type, messages=messages)
+        logger.info(f"发送汇总消息: 渠道 = {comp_obj.comp_name}, 消息数 = {len(messages)}")
+        if self.__delivery_queue:
+            self.__delivery_queue.put(comp_keys_list=[[comp_key]], in_order=False, title=title, text=text,
+                                      type_name=type.name if type else None, ext_info={},
+                                      priority=DigestBuffer.get_priority(messages=messages).level)
+            with self.__delivery_condition:
+                self.__delivery_condition.notify_all()
+            return
+        if pending_messages is not None:
+            pending_messages.append(PendingMessage(comp_objs=[comp_obj], in_order=False, title=title, text=text,
+                                                   type=type, message_info={}))
+            return
+        self.__send_message_by_comp(comp_obj=comp_obj, title=title, text=text, type=type, message_info={},
+                                    wait_timeout=self.__get_timeout_config_item(config_key="channel_timeout"))
+
+    def __flush_digest(self):
+        """
+        立即取出全部待汇总的消息：发送队列可用时入队，否则交由后台线程发送，不阻塞当前线程；插件未启用时丢弃
+        """
+        if not self.__digest_buffer:
+            return
+        batches = self.__digest_buffer.take_all()
+        if not batches:
+            return
+        if not self.get_state():
+            logger.warn(f"插件未启用，丢弃待汇总的消息: 消息数 = {sum(len(batch.messages) for batch in batches)}")
+            return
+        pending_messages: List[PendingMessage] = []
+        for batch in batches:
+            try:
+                self.__send_digest(comp_key=batch.comp_key, type=batch.type, messages=batch.messages,
+                                   pending_messages=pending_messages)
+            except Exception as e:
+                logger.error(f"发送汇总消息异常: 渠道 = {batch.comp_key}, {str(e)}", exc_info=True)
+        self.__send_pending_messages(pending_messages=pending_messages)
+
+    def __send_pending_messages(self, pending_messages: List[PendingMessage]):
+        """
+        在后台线程依次发送取出的消息，不阻塞配置生效和插件停止；超过总超时或插件停用后不再发送剩余的消息
+        """
+        if not pending_messages:
+            return
+        deadline = time.monotonic() + self.__get_timeout_config_item(config_key="total_timeout")
+        Thread(target=self.__pending_worker, args=(pending_messages, deadline),
+               name="MergeMessageNotify-pending", daemon=True).start()
+        logger.info(f"后台发送取出的消息: 消息数 = {len(pending_messages)}")
+
+    def __pending_worker(self, pending_messages: List[PendingMessage], deadline: float):
+        """
+        取出消息的后台发送线程
+        """
+        for index, pending_message in enumerate(pending_messages):
+            if time.monotonic() >= deadline or not self.get_state():
+                logger.warn(f"后台发送中止: 已超时或插件已停用, 未发送的消息数 = {len(pending_messages) - index}")
+                return
+            try:
+                if pending_message.in_order:
+                    self.__send_message_in_order(comp_objs=pending_message.comp_objs, title=pending_message.title,
+                                                 text=pending_message.text, type=pending_message.type,
+                                                 message_info=pending_message.message_info)
+                else:
+                    self.__send_message_in_parallel(comp_objs=pending_message.comp_objs, title=pending_message.title,
+                                                    text=pending_message.text, type=pending_message.type,
+                                                    message_info=pending_message.message_info)
+            except Exception as e:
+                logger.error(f"后台发送异常: 标题 = {pending_message.title}, {str(e)}", exc_info=True)
+
+    def __get_dedup_window(self) -> float:
+        """
+        获取重复消息抑制窗口（秒），为0时不抑制
+        """
+        try:
+            window = float(self.__get_config_item(config_key="dedup_window"))
+        except (TypeError, ValueError):
+            window = 0
+        return window if window > 0 else 0
+
+    def __check_dedup(self, title: str, text: str, type: NotificationType, message_info: dict) -> bool:
+        """
+        检查消息是否需要发送，窗口内的重复消息计入抑制次数
+        :return: 是否需要发送
+        """
+        window = self.__get_dedup_window()
+        if not window:
+            return True
+        if not self.__dedup_window:
+            self.__dedup_window = DedupWindow(flush_func=self.__send_dedup_summary)
+        return self.__dedup_window.check(title=title, text=text, type=type, message_info=message_info, window=window)
+
+    def __send_dedup_summary(self, entry: DedupEntry, pending_messages: Optional[List[PendingMessage]] = None):
+        """
+        窗口结束时发送带重复次数的提示
+        :param pending_messages: 不为None时，需直接发送的提示不在当前线程发送，而是加入该列表
+        """
+        if not self.get_state():
+            return
+        enable_channels: List[str] = self.__get_config_item("enable_channels") or []
+        if not enable_channels:
+            return
+        text = f"{entry.text}\n\n" if entry.text else ""
+        text += f"（该消息在{entry.window:g}秒内又重复了{entry.suppressed}次，已省略）"
+        logger.info(f"发送重复消息提示: 标题 = {entry.title}, 重复次数 = {entry.suppressed}")
+        self.__dispatch_message(enable_channels=enable_channels, title=entry.title, text=text, type=entry.type,
+                                message_info=entry.message_info, pending_messages=pending_messages)
+
+    def __flush_dedup(self):
+        """
+        立即结束全部重复消息抑制窗口：提示进入汇总或发送队列，其余交由后台线程发送，不阻塞当前线程；插件未启用时丢弃
+        """
+        if not self.__dedup_window:
+            return
+        entries = self.__dedup_window.take_all()
+        if not entries:
+            return
+        pending_messages: List[PendingMessage] = []
+        for entry in entries:
+            try:
+                self.__send_dedup_summary(entry=entry, pending_messages=pending_messages)
+            except Exception as e:
+                logger.error(f"发送重复消息提示异常: {str(e)}", exc_info=True)
+        self.__send_pending_messages(pending_messages=pending_messages)
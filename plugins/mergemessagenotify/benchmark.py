@@ -0,0 +1,391 @@
+"""
+离线发送基准测试：本地模拟各渠道的服务端响应格式和一个SMTP收件服务，
+向插件发送消息通知事件，统计不同渠道策略下的吞吐量、p50/p99耗时和每条消息的内存分配。
+
+需要在MoviePilot的运行环境中以独立进程执行，不要在运行中的MoviePilot进程内调用（结束时会关闭插件的全局连接池）：
+    python -m app.plugins.mergemessagenotify.benchmark --messages 200 --latency-ms 20 --failure-rate 0.05
+"""
+import argparse
+import json
+import random
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.plugins.mergemessagenotify import MergeMessageNotify
+from app.plugins.mergemessagenotify.channel.registry import channel_metas
+from app.plugins.mergemessagenotify.session import http_session_pool
+from app.schemas.types import NotificationType
+
+
+class MockBehavior:
+    """
+    模拟服务端的行为：延迟和失败率
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, failure_rate: float = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+
+    def sleep(self):
+        delay = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def should_fail(self) -> bool:
+        return self.failure_rate > 0 and random.random() < self.failure_rate
+
+
+# 各渠道服务端的响应：路由 -> (成功响应, 失败响应, 失败时的状态码)；响应为字符串时按纯文本返回
+mock_responses: Dict[str, Tuple[Any, Any, int]] = {
+    "bark": ({"code": 200, "message": "success"}, {"code": 400, "message": "mock failure"}, 400),
+    "gotify": ({"id": 1}, {"errorCode": 500, "errorDescription": "mock failure"}, 500),
+    "ntfy": ({"id": "mock"}, {"code": 50000, "error": "mock failure"}, 500),
+    "pushdeer": ({"code": 0, "content": {"result": []}}, {"code": 80403, "error": "mock failure"}, 200),
+    "pushme": ("success", "mock failure", 200),
+    "onebot": ({"status": "ok", "retcode": 0}, {"status": "failed", "retcode": 100, "msg": "mock failure"}, 200),
+    "http": ("ok", "mock failure", 500),
+    "sctapi.ftqq.com": ({"code": 0, "message": ""}, {"code": 40001, "message": "mock failure"}, 200),
+    "www.pushplus.plus": ({"code": 200, "msg": "请求成功"}, {"code": 500, "msg": "mock failure"}, 200),
+    "api.chanify.net": ({"request-uid": "mock"}, {"res": 500, "msg": "mock failure"}, 500),
+    "iyuu.cn": ({"errcode": 0, "errmsg": "ok"}, {"errcode": 1, "errmsg": "mock failure"}, 200),
+    "oapi.dingtalk.com": ({"errcode": 0, "errmsg": "ok"}, {"errcode": 310000, "errmsg": "mock failure"}, 200),
+    "open.feishu.cn": ({"code": 0, "msg": "success"}, {"code": 19021, "msg": "mock failure"}, 200),
+    "qyapi.weixin.qq.com": ({"errcode": 0, "errmsg": "ok"}, {"errcode": 45009, "errmsg": "mock failure"}, 200),
+}
+
+
+class MockHttpServer:
+    """
+    本地HTTP模拟服务：路径的第一段为路由，固定域名的渠道被改写为 /_host/<域名>/...
+    """
+
+    def __init__(self, behavior: MockBehavior):
+        self.behavior = behavior
+        # 路由 -> 请求数
+        self.requests: Dict[str, int] = {}
+        self.requests_lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                parts = [part for part in urlsplit(self.path).path.split("/") if part]
+                route = parts[1] if len(parts) > 1 and parts[0] == "_host" else (parts[0] if parts else "")
+                with server.requests_lock:
+                    server.requests[route] = server.requests.get(route, 0) + 1
+                server.behavior.sleep()
+                success_body, failure_body, failure_status = mock_responses.get(route, ("ok", "mock failure", 500))
+                failed = server.behavior.should_fail()
+                body = failure_body if failed else success_body
+                status = failure_status if failed else 200
+                if isinstance(body, str):
+                    content, content_type = body.encode("utf-8"), "text/plain; charset=utf-8"
+                else:
+                    content, content_type = json.dumps(body).encode("utf-8"), "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = handle_request
+            do_POST = handle_request
+            do_PUT = handle_request
+
+            def log_message(self, format, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.__server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.__server.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.__server.serve_forever, name="benchmark-http", daemon=True).start()
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def rewrite_url(self, url: str) -> str:
+        """
+        将固定域名的渠道地址改写到模拟服务
+        """
+        if url.startswith(self.base_url):
+            return url
+        parts = urlsplit(url)
+        query = f"?{parts.query}" if parts.query else ""
+        return f"{self.base_url}/_host/{parts.netloc}{parts.path}{query}"
+
+
+class SmtpSink:
+    """
+    本地SMTP收件服务：接受任意登录和邮件，按模拟行为延迟和拒收
+    """
+
+    def __init__(self, behavior: MockBehavior):
+        self.behavior = behavior
+        self.connections = 0
+        self.mails = 0
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                sink.connections += 1
+
+                def reply(line: str):
+                    self.wfile.write(f"{line}\r\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                reply("220 benchmark smtp sink")
+                in_data = False
+                for raw in self.rfile:
+                    line = raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+                    if in_data:
+                        if line == ".":
+                            in_data = False
+                            sink.behavior.sleep()
+                            if sink.behavior.should_fail():
+                                reply("451 mock failure")
+                            else:
+                                sink.mails += 1
+                                reply("250 ok")
+                        continue
+                    command = line.split(" ")[0].upper()
+                    if command in ("EHLO", "HELO"):
+                        reply("250-benchmark")
+                        reply("250 AUTH PLAIN LOGIN")
+                    elif command == "AUTH":
+                        reply("235 ok")
+                    elif command == "DATA":
+                        in_data = True
+                        reply("354 go ahead")
+                    elif command == "QUIT":
+                        reply("221 bye")
+                        return
+                    else:
+                        reply("250 ok")
+
+        self.__server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.__server.daemon_threads = True
+        self.port = self.__server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.__server.serve_forever, name="benchmark-smtp", daemon=True).start()
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+class BenchmarkPlugin(MergeMessageNotify):
+    """
+    基准测试用插件：配置保存在内存中，数据目录为临时目录，不读写MoviePilot的配置
+    """
+
+    def __init__(self, data_path: Path):
+        super().__init__()
+        self.__data_path = data_path
+        self.__bench_config: Dict[str, Any] = {}
+
+    def get_config(self, plugin_id: str = None) -> Any:
+        return self.__bench_config
+
+    def update_config(self, config: dict, plugin_id: str = None) -> bool:
+        self.__bench_config = config
+        return True
+
+    def get_data_path(self, plugin_id: str = None) -> Path:
+        return self.__data_path
+
+
+def build_channel_config(http_base: str, smtp_port: int, channels: List[str]) -> Dict[str, Any]:
+    """
+    构造指向模拟服务的渠道配置，所有渠道关闭限流
+    """
+    comp_configs: Dict[str, Dict[str, Any]] = {
+        "custom.iyuu": {"token": "benchmark"},
+        "custom.bark": {"server_url": f"{http_base}/bark", "push_key": "benchmark"},
+        "custom.chanify": {"token": "benchmark"},
+        "custom.ntfy": {"server_url": f"{http_base}/ntfy", "topic": "benchmark", "token": "benchmark"},
+        "custom.pushdeer": {"server_url": f"{http_base}/pushdeer", "push_key": "benchmark"},
+        "custom.pushplus": {"token": "benchmark"},
+        "custom.serverchan": {"send_key": "benchmark"},
+        "custom.gotify": {"server_url": f"{http_base}/gotify", "token": "benchmark"},
+        "custom.pushme": {"server_url": f"{http_base}/pushme", "key_type": "push_key", "key": "benchmark"},
+        "custom.dingtalkrobot": {"access_token": "benchmark", "secret": "benchmark"},
+        "custom.qiyeweixinbot": {"key": "benchmark"},
+        "custom.feishubot": {"access_token": "benchmark", "secret": "benchmark"},
+        "custom.onebot-11": {"server_url": f"{http_base}/onebot", "user_ids": "10001,10002", "group_ids": "20001"},
+        "custom.http": {"method": "POST", "url": f"{http_base}/http",
+                        "headers": '{"Content-Type": "application/json"}',
+                        "body": '{"title": "${title}", "text": "${text}"}'},
+        "custom.email": {"smtp_host": "127.0.0.1", "smtp_port": smtp_port, "smtp_encrypt_type": "NONE",
+                         "username": "benchmark@localhost", "password": "benchmark", "to_addrs": "to@localhost"},
+    }
+    config: Dict[str, Any] = {}
+    for comp_key in channels:
+        for key, value in dict(comp_configs.get(comp_key) or {}, rate_per_minute=0).items():
+            config[f"{comp_key}.{key}"] = value
+    return config
+
+
+# 基准测试的策略：名称 -> 插件配置
+benchmark_strategies: Dict[str, Dict[str, Any]] = {
+    "全部所选": {"channel_strategy": "ALL_SELECTED"},
+    "顺序优先": {"channel_strategy": "ORDER_SUCCESS_ONE"},
+    "顺序优先+自适应+对冲": {"channel_strategy": "ORDER_SUCCESS_ONE", "order_mode": "ADAPTIVE", "enable_hedge": True},
+    # 失败不重试，避免退避等待计入吞吐量
+    "全部所选+发送队列": {"channel_strategy": "ALL_SELECTED", "enable_queue": True, "queue_max_attempts": 1},
+}
+
+
+def percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+def run_strategy(plugin: BenchmarkPlugin, base_config: Dict[str, Any], strategy_config: Dict[str, Any],
+                 messages: int, concurrency: int, alloc_samples: int) -> Dict[str, Any]:
+    """
+    运行一种策略
+    """
+    plugin.init_plugin(config=dict(base_config, **strategy_config))
+
+    def build_event(index: int) -> SimpleNamespace:
+        return SimpleNamespace(event_data={
+            "title": f"基准测试 #{index}",
+            "text": f"这是第{index}条基准测试消息。",
+            "mtype": NotificationType.Plugin,
+        })
+
+    # 预热：建立连接、编译模板
+    plugin.listen_notice_message_event(event=build_event(index=-1))
+    latencies: List[float] = []
+    latencies_lock = threading.Lock()
+    counter = iter(range(messages))
+    counter_lock = threading.Lock()
+
+    def worker():
+        while True:
+            with counter_lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            start = time.perf_counter()
+            plugin.listen_notice_message_event(event=build_event(index=index))
+            elapsed = time.perf_counter() - start
+            with latencies_lock:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, name=f"benchmark-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    dispatch_elapsed = time.perf_counter() - start
+    # 发送队列：等待队列投递完毕
+    delivery_queue = getattr(plugin, "_MergeMessageNotify__delivery_queue", None)
+    if delivery_queue:
+        while delivery_queue.stats().get("pending") and time.perf_counter() - start < 300:
+            time.sleep(0.05)
+    total_elapsed = time.perf_counter() - start
+    # 内存分配：单独采样，避免tracemalloc影响耗时统计
+    alloc_peaks: List[int] = []
+    tracemalloc.start()
+    try:
+        for index in range(alloc_samples):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            plugin.listen_notice_message_event(event=build_event(index=messages + index))
+            _, peak = tracemalloc.get_traced_memory()
+            alloc_peaks.append(peak - current)
+    finally:
+        tracemalloc.stop()
+    plugin.stop_service()
+    return {
+        "messages": messages,
+        "throughput": messages / total_elapsed if total_elapsed else 0,
+        "dispatch_p50_ms": percentile(latencies, 50) * 1000,
+        "dispatch_p99_ms": percentile(latencies, 99) * 1000,
+        "dispatch_elapsed_s": dispatch_elapsed,
+        "total_elapsed_s": total_elapsed,
+        "alloc_peak_kib": (sum(alloc_peaks) / len(alloc_peaks) / 1024) if alloc_peaks else 0,
+    }
+
+
+def run_benchmark(messages: int = 200, concurrency: int = 4, latency_ms: float = 20, jitter_ms: float = 0,
+                  failure_rate: float = 0, channels: Optional[List[str]] = None, strategies: Optional[List[str]] = None,
+                  alloc_samples: int = 20) -> Dict[str, Dict[str, Any]]:
+    """
+    运行基准测试
+    :return: 策略名称 -> 统计结果
+    """
+    behavior = MockBehavior(latency_ms=latency_ms, jitter_ms=jitter_ms, failure_rate=failure_rate)
+    http_server = MockHttpServer(behavior=behavior)
+    smtp_sink = SmtpSink(behavior=behavior)
+    http_server.start()
+    smtp_sink.start()
+    data_path = Path(tempfile.mkdtemp(prefix="mergemessagenotify-benchmark-"))
+    # 固定域名的渠道改写到模拟服务
+    original_request = http_session_pool.request
+    http_session_pool.request = lambda method, url, **kwargs: original_request(method=method, url=http_server.rewrite_url(url), **kwargs)
+    try:
+        # 缺省为全部有模拟服务的渠道（Apprise由其自身的服务地址决定，不参与）
+        channels = channels or [meta.key for meta in channel_metas if meta.key != "custom.apprise"]
+        base_config = dict(build_channel_config(http_base=http_server.base_url, smtp_port=smtp_sink.port, channels=channels),
+                           enable=True, enable_channels=channels, http_pool_maxsize=32)
+        plugin = BenchmarkPlugin(data_path=data_path)
+        results = {}
+        for name in strategies or list(benchmark_strategies.keys()):
+            results[name] = run_strategy(plugin=plugin, base_config=base_config, strategy_config=benchmark_strategies[name],
+                                         messages=messages, concurrency=concurrency, alloc_samples=alloc_samples)
+        return results
+    finally:
+        http_session_pool.request = original_request
+        http_server.stop()
+        smtp_sink.stop()
+        shutil.rmtree(data_path, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="聚合消息通知离线发送基准测试")
+    parser.add_argument("--messages", type=int, default=200, help="每种策略发送的消息数")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发发送事件的线程数")
+    parser.add_argument("--latency-ms", type=float, default=20, help="模拟服务端的固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="模拟服务端的随机延迟上限（毫秒）")
+    parser.add_argument("--failure-rate", type=float, default=0, help="模拟服务端的失败率（0~1）")
+    parser.add_argument("--channels", type=str, default="", help="参与测试的渠道key，多个用英文逗号,分隔，缺省时为全部渠道")
+    parser.add_argument("--strategies", type=str, default="", help=f"参与测试的策略，多个用英文逗号,分隔，可选：{','.join(benchmark_strategies.keys())}")
+    parser.add_argument("--alloc-samples", type=int, default=20, help="统计内存分配的采样消息数")
+    args = parser.parse_args(argv)
+    results = run_benchmark(messages=args.messages, concurrency=args.concurrency, latency_ms=args.latency_ms,
+                            jitter_ms=args.jitter_ms, failure_rate=args.failure_rate,
+                            channels=[item.strip() for item in args.channels.split(",") if item.strip()],
+                            strategies=[item.strip() for item in args.strategies.split(",") if item.strip()],
+                            alloc_samples=args.alloc_samples)
+    print(f"{'throughput/s':>14}{'p50(ms)':>10}{'p99(ms)':>10}{'alloc(KiB)':>12}  策略")
+    for name, result in results.items():
+        print(f"{result['throughput']:>14.1f}{result['dispatch_p50_ms']:>10.1f}{result['dispatch_p99_ms']:>10.1f}"
+              f"{result['alloc_peak_kib']:>12.1f}  {name}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
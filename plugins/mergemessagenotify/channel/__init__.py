@@ -1,9 +1,10 @@
 from abc import abstractmethod, ABC
-import inspect
 import os
-from typing import Dict, Any, Tuple, List
+import sys
+from typing import Dict, Any, Tuple, List, Mapping, Optional
 
 from app.plugins import _PluginBase
+from app.plugins.mergemessagenotify.metrics import trace_phase, TracePhase
 from app.schemas.types import NotificationType
 
 
@@ -22,6 +23,19 @@ class Channel(ABC):
     # 配置相关
     # 组件缺省配置
     config_default: Dict[str, Any] = {}
+    # 汇总窗口缺省值（秒）
+    digest_window_default: int = 60
+    # 汇总最大条数缺省值
+    digest_max_size_default: int = 20
+    # 每分钟最大发送条数缺省值，为None时不限流，按服务商的频率限制设置
+    rate_per_minute_default: Optional[int] = None
+    # 单条消息最大字节数缺省值，为None时不切分，按服务商的消息长度限制设置
+    max_message_bytes_default: Optional[int] = None
+    # 除标题和内容外的消息开销估算（字节），如格式标记和请求体中的固定字段
+    message_overhead_bytes: int = 0
+
+    # 发送计划：(构造计划时的组件配置, 计划)
+    __send_plan: Optional[Tuple[Mapping[str, Any], Any]] = None
 
     def __init__(self, plugin: _PluginBase):
         """
@@ -31,9 +45,9 @@ class Channel(ABC):
             raise Exception("组件实例化错误")
         self.__plugin = plugin
 
-    def get_config(self) -> dict:
+    def get_config(self) -> Mapping[str, Any]:
         """
-        获取组件配置
+        获取组件配置（只读，修改时需要先复制）
         """
         get_comp_config = getattr(self.__plugin, "get_comp_config")
         if not get_comp_config:
@@ -48,7 +62,28 @@ class Channel(ABC):
         update_comp_config = getattr(self.__plugin, "update_comp_config")
         if not update_comp_config:
             raise Exception("插件方法不存在[update_comp_config]")
-        return update_comp_config(comp_key=self.comp_key, comp_config=config)
+        result = update_comp_config(comp_key=self.comp_key, comp_config=config)
+        self.__send_plan = None
+        return result
+
+    def build_send_plan(self) -> Any:
+        """
+        构造发送计划：把每条消息都相同的内容（地址、请求头、固定参数、收件人列表、已编译模板、密钥等）预先计算好，
+        发送时只需渲染、签名和发送；配置无效时返回None。需要时由子类实现
+        """
+        return None
+
+    def get_send_plan(self) -> Any:
+        """
+        获取发送计划，组件配置变化后重新构造；配置无效时返回None，且不缓存，下次发送时重新检查
+        """
+        config = self.get_config()
+        send_plan = self.__send_plan
+        if send_plan and send_plan[0] is config:
+            return send_plan[1]
+        plan = self.build_send_plan()
+        self.__send_plan = (config, plan) if plan is not None else None
+        return plan
 
     def get_config_item(self, config_key: str, use_default: bool = True) -> Any:
         """
@@ -59,11 +94,12 @@ class Channel(ABC):
         """
         if not config_key:
             return None
-        config = self.get_config() or {}
-        config_default = self.config_default or {}
-        config_value = config.get(config_key)
-        if config_value is None and use_default:
-            config_value = config_default.get(config_key)
+        with trace_phase(TracePhase.CONFIG):
+            config = self.get_config() or {}
+            config_default = self.config_default or {}
+            config_value = config.get(config_key)
+            if config_value is None and use_default:
+                config_value = config_default.get(config_key)
         return config_value
 
     def __build_notify_type_select_element(self) -> dict:
@@ -100,29 +136,191 @@ class Channel(ABC):
             'content': [self.__build_notify_type_select_element()]
         }
 
+    def __build_digest_col_elements(self) -> List[dict]:
+        """
+        构造消息汇总配置Col元素
+        """
+        select_items = [{
+            "title": type.value,
+            "value": type.name
+        } for type in NotificationType if type]
+        return [{
+            'component': 'VCol',
+            'props': {
+                'cols': 12,
+                'xxl': 6, 'xl': 6, 'lg': 6, 'md': 6, 'sm': 12, 'xs': 12
+            },
+            'content': [{
+                'component': 'VSelect',
+                'props': {
+                    'model': 'digest_notify_types',
+                    'label': '汇总消息类型',
+                    'multiple': True,
+                    'chips': True,
+                    'clearable': True,
+                    'items': select_items,
+                    'hint': '选填。选择的类型的消息在汇总窗口内合并为一条发送，用于避免突发消息触发渠道限流；仅在“全部所选”渠道策略下生效。'
+                }
+            }]
+        }, {
+            'component': 'VCol',
+            'props': {
+                'cols': 12,
+                'xxl': 3, 'xl': 3, 'lg': 3, 'md': 3, 'sm': 6, 'xs': 12
+            },
+            'content': [{
+                'component': 'VTextField',
+                'props': {
+                    'model': 'digest_window',
+                    'label': '汇总窗口（秒）',
+                    'type': 'number',
+                    'hint': f'选填。从第一条消息开始计时，最多延迟多久发送汇总。缺省时为{self.digest_window_default}秒。'
+                }
+            }]
+        }, {
+            'component': 'VCol',
+            'props': {
+                'cols': 12,
+                'xxl': 3, 'xl': 3, 'lg': 3, 'md': 3, 'sm': 6, 'xs': 12
+            },
+            'content': [{
+                'component': 'VTextField',
+                'props': {
+                    'model': 'digest_max_size',
+                    'label': '汇总最大条数',
+                    'type': 'number',
+                    'hint': f'选填。达到该条数时立即发送汇总。缺省时为{self.digest_max_size_default}条。'
+                }
+            }]
+        }, {
+            'component': 'VCol',
+            'props': {
+                'cols': 12,
+                'xxl': 3, 'xl': 3, 'lg': 3, 'md': 3, 'sm': 6, 'xs': 12
+            },
+            'content': [{
+                'component': 'VTextField',
+                'props': {
+                    'model': 'rate_per_minute',
+                    'label': '每分钟最大发送条数',
+                    'type': 'number',
+                    'hint': f'选填。按令牌桶限流，超出时等待或跳过该渠道；填0表示不限流。缺省时为{self.rate_per_minute_default or "不限流"}。'
+                }
+            }]
+        }, {
+            'component': 'VCol',
+            'props': {
+                'cols': 12,
+                'xxl': 3, 'xl': 3, 'lg': 3, 'md': 3, 'sm': 6, 'xs': 12
+            },
+            'content': [{
+                'component': 'VTextField',
+                'props': {
+                    'model': 'max_message_bytes',
+                    'label': '单条消息最大字节数',
+                    'type': 'number',
+                    'hint': f'选填。超长消息按行切分为多条依次发送；填0表示不切分。缺省时为{self.max_message_bytes_default or "不切分"}。'
+                }
+            }]
+        }]
+
     def build_notify_type_select_row_element(self) -> dict:
         """
-        构造消息类型下拉选择行元素
+        构造消息类型下拉选择行元素（含消息汇总配置）
         """
         return {
             'component': 'VRow',
-            'content': [self.__build_notify_type_select_col_element()]
+            'content': [self.__build_notify_type_select_col_element()] + self.__build_digest_col_elements()
         }
 
+    def check_notify_type_enabled(self, type: NotificationType) -> bool:
+        """
+        判断指定的消息类型是否允许通过此渠道发送
+        """
+        enable_notify_types: List[str] = self.get_config_item("enable_notify_types")
+        return not type or not enable_notify_types or type.name in enable_notify_types
+
+    def check_digest_notify_type(self, type: NotificationType) -> bool:
+        """
+        判断指定的消息类型是否需要汇总发送
+        """
+        digest_notify_types: List[str] = self.get_config_item("digest_notify_types")
+        return True if type and digest_notify_types and type.name in digest_notify_types else False
+
+    def __get_positive_number_config_item(self, config_key: str, default: int) -> int:
+        """
+        获取正整数配置项，无效时使用缺省值
+        """
+        try:
+            value = int(self.get_config_item(config_key=config_key))
+        except (TypeError, ValueError):
+            value = 0
+        return value if value > 0 else default
+
+    def get_rate_per_minute(self) -> Optional[int]:
+        """
+        获取每分钟最大发送条数，为None时不限流
+        """
+        rate_per_minute = self.get_config_item(config_key="rate_per_minute")
+        if rate_per_minute is None or rate_per_minute == "":
+            return self.rate_per_minute_default
+        try:
+            rate_per_minute = int(rate_per_minute)
+        except (TypeError, ValueError):
+            return self.rate_per_minute_default
+        return rate_per_minute if rate_per_minute > 0 else None
+
+    def get_max_message_bytes(self) -> Optional[int]:
+        """
+        获取单条消息最大字节数，为None时不切分
+        """
+        max_message_bytes = self.get_config_item(config_key="max_message_bytes")
+        if max_message_bytes is None or max_message_bytes == "":
+            return self.max_message_bytes_default
+        try:
+            max_message_bytes = int(max_message_bytes)
+        except (TypeError, ValueError):
+            return self.max_message_bytes_default
+        return max_message_bytes if max_message_bytes > 0 else None
+
+    def get_message_overhead_bytes(self, ext_info: dict = None) -> int:
+        """
+        估算除标题和内容外的消息开销（字节），含图片和链接地址
+        """
+        overhead = self.message_overhead_bytes
+        for key in ("image", "link"):
+            value = ext_info.get(key) if ext_info else None
+            if value and isinstance(value, str):
+                overhead += len(value.encode("utf-8"))
+        return overhead
+
+    def get_digest_window(self) -> int:
+        """
+        获取汇总窗口（秒）
+        """
+        return self.__get_positive_number_config_item(config_key="digest_window", default=self.digest_window_default)
+
+    def get_digest_max_size(self) -> int:
+        """
+        获取汇总最大条数
+        """
+        return self.__get_positive_number_config_item(config_key="digest_max_size", default=self.digest_max_size_default)
+
     def check_stack_contain_method(self, package_name: str, function_name: str) -> bool:
         """
         判断调用栈是否包含指定的方法
+        直接遍历栈帧的代码对象，不使用 inspect.stack()，避免为每一帧解析源码行
         """
         if not package_name or not function_name:
             return False
         package_path = package_name.replace('.', os.sep)
-        for stack in inspect.stack():
-            if not stack or not stack.filename:
-                continue
-            if stack.function != function_name:
-                continue
-            if stack.filename.endswith(f"{package_path}.py") or stack.filename.endswith(f"{package_path}{os.sep}__init__.py"):
+        filename_suffixes = (f"{package_path}.py", f"{package_path}{os.sep}__init__.py")
+        frame = sys._getframe(1)
+        while frame:
+            code = frame.f_code
+            if code.co_name == function_name and code.co_filename and code.co_filename.endswith(filename_suffixes):
                 return True
+            frame = frame.f_back
         return False
 
     def check_stack_contain_save_config_request(self) -> bool:
@@ -1,10 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import List, Optional, Callable, Tuple, TypeVar, Iterable, Union
 from urllib.parse import quote
 
+import requests
+
 from app.log import logger
 from app.plugins.mergemessagenotify.channel import Channel
-from app.plugins.mergemessagenotify.util import TemplateUtil
+from app.plugins.mergemessagenotify.image import image_cache, CachedImage
+from app.plugins.mergemessagenotify.metrics import trace_phase, TracePhase, bind_trace, get_current_trace, \
+    add_payload_bytes, set_http_status
+from app.plugins.mergemessagenotify.session import http_session_pool
+from app.plugins.mergemessagenotify.util import TemplateUtil, CompiledTemplate
 from app.schemas.types import NotificationType
 
+# 发送目标类型
+T = TypeVar("T")
+
 
 class CustomChannel(Channel):
     """
@@ -17,6 +29,12 @@ class CustomChannel(Channel):
     comp_name: str = ""
     # 组件顺序
     comp_order: int = 2
+    # 多目标并发发送数缺省值
+    target_concurrency_default: int = 4
+
+    # 多目标发送线程池，所有渠道共享
+    __target_executor: Optional[ThreadPoolExecutor] = None
+    __target_executor_lock: Lock = Lock()
 
     def __build_test_once_switch_element(self) -> dict:
         """
@@ -57,11 +75,12 @@ class CustomChannel(Channel):
         """
         处理测试一次
         """
-        if not self.check_stack_contain_save_config_request():
-            return
-        config = config or self.get_config() or {}
+        config = dict(config or self.get_config() or {})
         if not config.get("test_once"):
             return
+        # 先判断开关再检查调用栈，未开启测试的渠道无需检查
+        if not self.check_stack_contain_save_config_request():
+            return
         try:
             self.send_message(title="测试消息", text="这是一条测试消息，您收到此消息表示您的渠道配置无误。")
             logger.info(f"测试一次消息发送完成 - {self.comp_name}")
@@ -99,18 +118,112 @@ class CustomChannel(Channel):
             obj_temp[key] = value
         return obj_temp
 
-    def render_template(self, text: str, variables: dict, url_encode: bool = False) -> str:
+    def render_template(self, text: Union[str, CompiledTemplate, None], variables: dict, url_encode: bool = False) -> str:
         """
         渲染模板
+        :param text: 模板文本，或发送计划中已编译的模板
+        """
+        with trace_phase(TracePhase.RENDER):
+            if url_encode:
+                variables = self.__url_encode_dict_value(obj=variables)
+            if isinstance(text, CompiledTemplate):
+                return TemplateUtil.render_compiled(compiled=text, variables=variables)
+            return TemplateUtil.render_text(text=text, variables=variables)
+
+    def http_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        通过共享的HTTP会话池发起请求，复用长连接，未指定超时时使用缺省超时
+        """
+        with trace_phase(TracePhase.NETWORK):
+            res = http_session_pool.request(method=method, url=url, **kwargs)
+        add_payload_bytes(res.request.body)
+        set_http_status(res.status_code)
+        return res
+
+    def http_post(self, url: str, **kwargs) -> requests.Response:
+        """
+        通过共享的HTTP会话池发起POST请求
+        """
+        return self.http_request(method="post", url=url, **kwargs)
+
+    @staticmethod
+    def get_cached_image(ext_info: dict) -> Optional[CachedImage]:
+        """
+        获取消息图片的本地缓存，未启用图片缓存或获取失败时返回None，此时应直接使用图片url
+        """
+        image = ext_info.get("image") if ext_info else None
+        return image_cache.get(url=image) if image else None
+
+    @classmethod
+    def __get_target_executor(cls) -> ThreadPoolExecutor:
+        """
+        获取多目标发送线程池
+        """
+        if not CustomChannel.__target_executor:
+            with CustomChannel.__target_executor_lock:
+                if not CustomChannel.__target_executor:
+                    CustomChannel.__target_executor = ThreadPoolExecutor(max_workers=16,
+                                                                        thread_name_prefix="MergeMessageNotify-target")
+        return CustomChannel.__target_executor
+
+    def get_target_concurrency(self) -> int:
         """
-        if url_encode:
-            variables = self.__url_encode_dict_value(obj=variables)
-        return TemplateUtil.render_text(text=text, variables=variables)
+        获取多目标并发发送数
+        """
+        try:
+            concurrency = int(self.get_config_item(config_key="target_concurrency"))
+        except (TypeError, ValueError):
+            concurrency = 0
+        return concurrency if concurrency > 0 else self.target_concurrency_default
+
+    def send_to_targets(self, targets: Iterable[T], send_func: Callable[[T], bool]) -> Tuple[int, int]:
+        """
+        向多个目标并发发送，并发数不超过组件配置的多目标并发发送数；当前线程也参与发送
+        :param send_func: 向单个目标发送，返回是否成功
+        :return: 成功数, 失败数
+        """
+        targets = list(targets)
+        if not targets:
+            return 0, 0
+        lock = Lock()
+        target_iter = iter(targets)
+        results: List[bool] = []
+        # 工作线程沿用当前线程的发送跟踪
+        trace = get_current_trace()
+
+        def __worker():
+            with bind_trace(trace):
+                __send_targets()
+
+        def __send_targets():
+            while True:
+                with lock:
+                    target = next(target_iter, None)
+                if target is None:
+                    return
+                try:
+                    success = send_func(target)
+                except Exception as e:
+                    logger.error(f"发送消息异常: channel = {self.comp_name}, target = {target}, {str(e)}", exc_info=True)
+                    success = False
+                with lock:
+                    results.append(True if success else False)
+
+        concurrency = min(self.get_target_concurrency(), len(targets))
+        executor = self.__get_target_executor()
+        futures = [executor.submit(__worker) for _ in range(concurrency - 1)]
+        __send_targets()
+        for future in futures:
+            future.result()
+        success_count = results.count(True)
+        return success_count, len(results) - success_count
 
     def init_comp(self):
         """
         初始化组件
         """
+        # 预先构造发送计划（含模板编译）
+        self.get_send_plan()
         config = self.get_config() or {}
         # 处理测试一次
         self.__test_once(config=config)
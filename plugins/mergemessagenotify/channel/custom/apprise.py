@@ -1,11 +1,20 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional, NamedTuple
 import apprise
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
+from app.plugins.mergemessagenotify.metrics import trace_phase, TracePhase
 from app.schemas.types import NotificationType
 from app.log import logger
 
 
+class AppriseSendPlan(NamedTuple):
+    """
+    Apprise发送计划
+    """
+    # 已添加全部服务地址的apprise
+    app: apprise.Apprise
+
+
 class AppriseChannel(CustomChannel):
     """
     Apprise渠道
@@ -79,18 +88,26 @@ class AppriseChannel(CustomChannel):
         service_urls: str = self.get_config_item(config_key="service_urls") or ""
         return [line.strip() for line in service_urls.splitlines() if line and line.strip()]
 
-    def __build_apprise(self) -> apprise.Apprise:
+    def __build_apprise(self, service_url_lines: List[str]) -> apprise.Apprise:
         """
-        构造apprise
+        构造apprise，多个服务地址时并发发送
         """
-        app = apprise.Apprise()
-        service_url_lines = self.__extract_service_url_lines()
+        app = apprise.Apprise(asset=apprise.AppriseAsset(async_mode=True))
         for service_url_line in service_url_lines:
             if not service_url_line:
                 continue
             app.add(service_url_line)
         return app
 
+    def build_send_plan(self) -> Optional[AppriseSendPlan]:
+        """
+        构造发送计划：按去重后的服务地址构造apprise，避免每次发送都重新解析服务地址
+        """
+        if not self.__check_config():
+            return None
+        service_url_lines = list(dict.fromkeys(self.__extract_service_url_lines()))
+        return AppriseSendPlan(app=self.__build_apprise(service_url_lines=service_url_lines))
+
     # noinspection DuplicatedCode
     def send_message(self, title: str, text: str, type: NotificationType = None, ext_info: dict = {}) -> bool:
         """
@@ -101,16 +118,21 @@ class AppriseChannel(CustomChannel):
         if type and enable_notify_types and type.name not in enable_notify_types:
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息类型不受支持")
             return False
-        if not self.__check_config():
+        plan: AppriseSendPlan = self.get_send_plan()
+        if not plan:
             return False
 
         image = ext_info.get("image")
-        app = self.__build_apprise()
-        res = app.notify(
-            title=title,
-            body=text or title,
-            attach=image
-        )
+        # 优先附加本地缓存的图片，避免apprise每次重新下载
+        cached_image = self.get_cached_image(ext_info=ext_info)
+        if cached_image:
+            image = str(cached_image.path)
+        with trace_phase(TracePhase.NETWORK):
+            res = plan.app.notify(
+                title=title,
+                body=text or title,
+                attach=image
+            )
         if res:
             logger.info(f"发送消息成功: channel = {self.comp_name}, type = {type_str}")
             return True
@@ -1,7 +1,7 @@
 import base64
-from typing import Tuple, List, Dict, Any
+from types import MappingProxyType
+from typing import Tuple, List, Dict, Any, Optional, NamedTuple, Mapping
 from enum import Enum
-import requests
 import json as lib_json
 
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
@@ -10,6 +10,7 @@ from cryptography.hazmat.primitives import padding as lib_padding
 from cryptography.exceptions import InvalidTag
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
+from app.plugins.mergemessagenotify.metrics import trace_phase, TracePhase
 from app.schemas.types import NotificationType
 from app.log import logger
 from app.core.config import settings
@@ -60,6 +61,32 @@ class Sound(Enum):
         self.second = second
 
 
+class BarkCipher(NamedTuple):
+    """
+    Bark推送加密器
+    """
+    # 已构造的加密器，每条消息通过它创建新的加密上下文
+    cipher: Cipher
+    # 加密模式
+    mode: str
+    # 初始向量，ECB模式时为None
+    iv: Optional[str]
+
+
+class BarkSendPlan(NamedTuple):
+    """
+    Bark发送计划
+    """
+    url: str
+    # 铃声、分组、通知级别等固定参数
+    static_json: Mapping[str, Any]
+    # 已解析的更多参数
+    more_json: Mapping[str, Any]
+    # 加密器，未启用推送加密时为None
+    cipher: Optional[BarkCipher]
+    enable_proxy: bool
+
+
 class BarkChannel(CustomChannel):
     """
     Bark渠道
@@ -71,6 +98,10 @@ class BarkChannel(CustomChannel):
     comp_name: str = "Bark"
     # 组件顺序
     comp_order: int = CustomChannel.comp_order * 100 + 2
+    # 单条消息最大字节数缺省值，APNs限制推送负载最大4KB
+    max_message_bytes_default: int = 4096
+    # 分组、通知级别、铃声等固定参数
+    message_overhead_bytes: int = 256
 
     # 支持的加密算法
     support_cipher_algorithms = ["AES128", "AES192", "AES256"]
@@ -430,6 +461,15 @@ class BarkChannel(CustomChannel):
         self.save_default_config()
         return elements, config_suggest
 
+    def get_max_message_bytes(self) -> Optional[int]:
+        """
+        获取单条消息最大字节数，启用推送加密时密文经Base64编码后变长，按3/4计算
+        """
+        max_message_bytes = super().get_max_message_bytes()
+        if max_message_bytes and self.get_config_item(config_key="cipher_enable"):
+            return max_message_bytes * 3 // 4
+        return max_message_bytes
+
     def __check_config(self) -> bool:
         """
         检查配置
@@ -508,16 +548,71 @@ class BarkChannel(CustomChannel):
 
         return True
 
-    def __build_url(self) -> str:
+    def __build_cipher(self) -> Optional[BarkCipher]:
         """
-        构造url
+        构造加密器，未启用推送加密时返回None
         """
+        if not self.get_config_item(config_key="cipher_enable"):
+            return None
+        mode: str = self.get_config_item(config_key="cipher_mode")
+        key_bytes = self.get_config_item(config_key="cipher_key").encode("utf-8")
+        iv: str = self.get_config_item(config_key="cipher_iv") or ""
+        iv_bytes = iv.encode("utf-8")
+        if mode == "ECB":
+            cipher_mode = modes.ECB()
+            iv = None
+        elif mode == "CBC":
+            cipher_mode = modes.CBC(iv_bytes)
+        else:
+            cipher_mode = modes.GCM(iv_bytes)
+        cipher = Cipher(algorithm=algorithms.AES(key_bytes), mode=cipher_mode, backend=default_backend())
+        return BarkCipher(cipher=cipher, mode=mode, iv=iv)
+
+    def __build_more_json(self) -> Dict[str, Any]:
+        """
+        解析更多参数
+        """
+        more_json: str = self.get_config_item(config_key="more_json")
+        if not more_json:
+            return {}
+        try:
+            return lib_json.loads(more_json) or {}
+        except Exception as e:
+            logger.error(f"更多参数解析异常: {str(e)}", exc_info=True)
+            return {}
+
+    def build_send_plan(self) -> Optional[BarkSendPlan]:
+        """
+        构造发送计划：地址、固定参数、更多参数和加密器只在配置变化后重新构造
+        """
+        if not self.__check_config():
+            return None
         server_url: str = self.get_config_item(config_key="server_url")
         server_url = server_url.rstrip("/")
         push_key = self.get_config_item(config_key="push_key")
-        return f"{server_url}/{push_key}"
+        static_json = {}
+        for key in ["sound", "group", "level"]:
+            value = self.get_config_item(config_key=key)
+            if value:
+                static_json[key] = value
+        for key in ["isArchive", "autoCopy"]:
+            if self.get_config_item(config_key=key):
+                static_json[key] = 1
+        try:
+            cipher = self.__build_cipher()
+        except Exception as e:
+            logger.error(f"加密器构造异常，已降级为非加密方式: {str(e)}", exc_info=True)
+            cipher = None
+        return BarkSendPlan(
+            url=f"{server_url}/{push_key}",
+            static_json=MappingProxyType(static_json),
+            more_json=MappingProxyType(self.__build_more_json()),
+            cipher=cipher,
+            enable_proxy=bool(self.get_config_item(config_key="enable_proxy"))
+        )
 
-    def __build_json(self, title: str, text: str, ext_info: dict = {}) -> dict:
+    @staticmethod
+    def __build_json(plan: BarkSendPlan, title: str, text: str, ext_info: dict = {}) -> dict:
         """
         构造请求json
         """
@@ -529,118 +624,57 @@ class BarkChannel(CustomChannel):
             "title": title,
             "body": text or title
         }
-        # sound
-        sound = self.get_config_item(config_key="sound")
-        if sound:
-            json["sound"] = sound
         # icon
         image = ext_info.get("image")
         if image:
             json["icon"] = image
-        # group
-        group = self.get_config_item(config_key="group")
-        if group:
-            json["group"] = group
         # url
         link = ext_info.get("link")
         if link:
             json["url"] = link
-        # level
-        level = self.get_config_item(config_key="level")
-        if level:
-            json["level"] = level
-        # isArchive
-        isArchive = self.get_config_item(config_key="isArchive")
-        if isArchive:
-            json["isArchive"] = 1
-        # autoCopy
-        autoCopy = self.get_config_item(config_key="autoCopy")
-        if autoCopy:
-            json["autoCopy"] = 1
-
+        # 铃声、分组、通知级别等固定参数
+        json.update(plan.static_json)
         # 更多参数
-        more_json: str = self.get_config_item(config_key="more_json")
-        if more_json:
-            try:
-                more_json_obj = lib_json.loads(more_json)
-                json.update(more_json_obj)
-            except Exception as e:
-                logger.error(f"更多参数解析异常: {str(e)}", exc_info=True)
-
+        json.update(plan.more_json)
         return json
 
-    def __cipher_text(self, plaintext: str,
-                      algorithm: str, mode: str, padding: str, key: str, iv: str) -> tuple[str, str]:
+    @staticmethod
+    def __cipher_text(plaintext: str, cipher: BarkCipher) -> tuple[str, str]:
         """
         加密文本
         """
         plaintext = plaintext or ""
         plaintext_bytes = plaintext.encode("utf-8")
-        key = key or ""
-        key_bytes = key.encode("utf-8")
-        iv = iv or ""
-        iv_bytes = iv.encode("utf-8")
 
-        if mode in ["CBC", "ECB"]:
+        if cipher.mode in ["CBC", "ECB"]:
             padder = lib_padding.PKCS7(128).padder()
             padded_plaintext_bytes = padder.update(plaintext_bytes) + padder.finalize()
         else:
             padded_plaintext_bytes = plaintext_bytes
 
-        backend = default_backend()
-
         try:
-            if mode == "ECB":
-                cipher = Cipher(algorithm=algorithms.AES(key_bytes), mode=modes.ECB(), backend=backend)
-                encryptor = cipher.encryptor()
-                ciphertext_bytes = encryptor.update(padded_plaintext_bytes) + encryptor.finalize()
-                ciphertext = base64.b64encode(ciphertext_bytes).decode("utf-8")
-                return ciphertext, None
-            elif mode == "CBC":
-                cipher = Cipher(algorithm=algorithms.AES(key_bytes), mode=modes.CBC(iv_bytes), backend=backend)
-                encryptor = cipher.encryptor()
-                ciphertext_bytes = encryptor.update(padded_plaintext_bytes) + encryptor.finalize()
-                ciphertext = base64.b64encode(ciphertext_bytes).decode("utf-8")
-                return ciphertext, iv
-            elif mode == "GCM":
-                cipher = Cipher(algorithm=algorithms.AES(key_bytes), mode=modes.GCM(iv_bytes), backend=backend)
-                encryptor = cipher.encryptor()
-                ciphertext_bytes = encryptor.update(padded_plaintext_bytes) + encryptor.finalize() + encryptor.tag
-                ciphertext = base64.b64encode(ciphertext_bytes).decode("utf-8")
-                return ciphertext, iv
-            else:
-                return None, None
+            encryptor = cipher.cipher.encryptor()
+            ciphertext_bytes = encryptor.update(padded_plaintext_bytes) + encryptor.finalize()
+            if cipher.mode == "GCM":
+                ciphertext_bytes += encryptor.tag
+            ciphertext = base64.b64encode(ciphertext_bytes).decode("utf-8")
+            return ciphertext, cipher.iv
         except InvalidTag:
             raise InvalidTag("GCM模式加密失败: 认证标签生成异常")
         except Exception as e:
             raise ValueError(f"AES加密失败: {str(e)}")
 
-    def __cipher_json(self, json: dict) -> tuple[str, str]:
-        """
-        加密json
-        """
-        if not self.__check_cipher_config():
-            raise ValueError("加密配置有误")
-
-        return self.__cipher_text(
-            plaintext=lib_json.dumps(json or {}),
-            algorithm=self.get_config_item(config_key="cipher_algorithm"),
-            mode=self.get_config_item(config_key="cipher_mode"),
-            padding=self.get_config_item(config_key="cipher_padding"),
-            key=self.get_config_item(config_key="cipher_key"),
-            iv=self.get_config_item(config_key="cipher_iv")
-        )
-
-    def __build_req_data(self, title: str, text: str, ext_info: dict = {}) -> dict:
+    def __build_req_data(self, plan: BarkSendPlan, title: str, text: str, ext_info: dict = {}) -> dict:
         """
         生成请求数据
         """
-        json = self.__build_json(title=title, text=text, ext_info=ext_info)
-        if not self.get_config_item(config_key="cipher_enable"):
+        json = self.__build_json(plan=plan, title=title, text=text, ext_info=ext_info)
+        if not plan.cipher:
             return json
         else:
             try:
-                ciphertext, iv = self.__cipher_json(json)
+                with trace_phase(TracePhase.SIGN):
+                    ciphertext, iv = self.__cipher_text(plaintext=lib_json.dumps(json), cipher=plan.cipher)
                 return {
                     "ciphertext": ciphertext,
                     "iv": iv
@@ -658,12 +692,12 @@ class BarkChannel(CustomChannel):
         if (type and enable_notify_types and type.name not in enable_notify_types):
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息类型不受支持")
             return False
-        if not self.__check_config():
+        plan: BarkSendPlan = self.get_send_plan()
+        if not plan:
             return False
-        send_url = self.__build_url()
-        json = self.__build_req_data(title=title, text=text, ext_info=ext_info)
-        proxies = settings.PROXY if self.get_config_item(config_key="enable_proxy") else None
-        res = requests.post(url=send_url, json=json, proxies=proxies)
+        json = self.__build_req_data(plan=plan, title=title, text=text, ext_info=ext_info)
+        proxies = settings.PROXY if plan.enable_proxy else None
+        res = self.http_post(url=plan.url, json=json, proxies=proxies)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("code")
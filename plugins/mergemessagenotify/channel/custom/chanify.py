@@ -1,11 +1,20 @@
-from typing import Tuple, List, Dict, Any
-import requests
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
 from app.schemas.types import NotificationType
 from app.log import logger
 
 
+class ChanifySendPlan(NamedTuple):
+    """
+    Chanify发送计划
+    """
+    # 请求地址
+    url: str
+    # 是否响铃
+    sound: bool
+
+
 class ChanifyChannel(CustomChannel):
     """
     Chanify渠道
@@ -85,7 +94,17 @@ class ChanifyChannel(CustomChannel):
         token = self.get_config_item(config_key="token")
         return f"https://api.chanify.net/v1/sender/{token}"
 
-    def __build_json(self, title: str, text: str) -> dict:
+    def build_send_plan(self) -> Optional[ChanifySendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        return ChanifySendPlan(url=self.__build_url(),
+                               sound=True if self.get_config_item(config_key="sound") else False)
+
+    @staticmethod
+    def __build_json(plan: ChanifySendPlan, title: str, text: str) -> dict:
         """
         构造请求json
         """
@@ -95,7 +114,7 @@ class ChanifyChannel(CustomChannel):
             "text": text,
         }
         # sound
-        if self.get_config_item(config_key="sound"):
+        if plan.sound:
             json["sound"] = 1
         return json
 
@@ -108,11 +127,11 @@ class ChanifyChannel(CustomChannel):
         if (type and enable_notify_types and type.name not in enable_notify_types):
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息类型不受支持")
             return False
-        if not self.__check_config():
+        plan: ChanifySendPlan = self.get_send_plan()
+        if not plan:
             return False
-        send_url = self.__build_url()
-        json = self.__build_json(title=title, text=text)
-        res = requests.post(url=send_url, json=json)
+        json = self.__build_json(plan=plan, title=title, text=text)
+        res = self.http_post(url=plan.url, json=json)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("res")
@@ -1,16 +1,34 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional
 from urllib.parse import urlencode, quote_plus
-import requests
 import time
 import hmac
 import hashlib
 import base64
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
+from app.plugins.mergemessagenotify.metrics import trace_phase, TracePhase
 from app.schemas.types import NotificationType
 from app.log import logger
 
 
+class DingtalkRobotSendPlan(NamedTuple):
+    """
+    钉钉机器人发送计划
+    """
+    # 不含签名的请求地址
+    base_url: str
+    # 加签密钥
+    secret: Optional[str]
+    # 以加签密钥预先初始化的HMAC，未配置加签时为None
+    signer: Optional[hmac.HMAC]
+    # @的手机号
+    at_mobiles: Tuple[str, ...]
+    # @的用户ID
+    at_user_ids: Tuple[str, ...]
+    # 是否@所有人
+    is_at_all: bool
+
+
 class DingtalkRobotChannel(CustomChannel):
     """
     钉钉机器人渠道 https://open.dingtalk.com/document/orgapp/custom-robots-send-group-messages
@@ -22,6 +40,12 @@ class DingtalkRobotChannel(CustomChannel):
     comp_name: str = "钉钉机器人"
     # 组件顺序
     comp_order: int = CustomChannel.comp_order * 100 + 41
+    # 每分钟最大发送条数缺省值：钉钉机器人每分钟最多20条，桶容量允许少量突发，留出余量
+    rate_per_minute_default: int = 16
+    # 单条消息最大字节数缺省值，官方限制消息内容最长20000字节
+    max_message_bytes_default: int = 20000
+    # markdown消息的标题出现两次，另含@列表
+    message_overhead_bytes: int = 512
 
     # 配置相关
     # 组件缺省配置
@@ -130,40 +154,59 @@ class DingtalkRobotChannel(CustomChannel):
         return True
 
     @classmethod
-    def __sign(cls, timestamp: str, secret: str) -> str:
+    def __sign(cls, timestamp: str, secret: str, signer: hmac.HMAC) -> str:
         """
         构造签名字符串
+        :param signer: 以secret为密钥预先初始化的HMAC
         """
-        secret_enc = secret.encode('utf-8')
         string_to_sign = f"{timestamp}\n{secret}"
         string_to_sign_enc = string_to_sign.encode('utf-8')
-        hmac_code = hmac.new(secret_enc, string_to_sign_enc, digestmod=hashlib.sha256).digest()
-        sign = quote_plus(base64.b64encode(hmac_code))
+        hmac_obj = signer.copy()
+        hmac_obj.update(string_to_sign_enc)
+        sign = quote_plus(base64.b64encode(hmac_obj.digest()))
         return sign
 
-    def __build_query(self) -> str:
+    def __build_base_url(self) -> str:
         """
-        构造请求query
+        构造不含签名的url
         """
         # query
         query = {
             'access_token': self.get_config_item(config_key="access_token"),
         }
-        # 签名相关
+        return f"https://oapi.dingtalk.com/robot/send?{urlencode(query)}"
+
+    def build_send_plan(self) -> Optional[DingtalkRobotSendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
         secret = self.get_config_item(config_key="secret")
-        if secret:
-            timestamp = str(round(time.time() * 1000))
-            sign = self.__sign(timestamp, secret)
-            query["timestamp"] = timestamp
-            query["sign"] = sign
-        return urlencode(query)
+        return DingtalkRobotSendPlan(
+            base_url=self.__build_base_url(),
+            secret=secret,
+            signer=hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256) if secret else None,
+            at_mobiles=tuple(self.__split_multstr(raw_str=self.get_config_item(config_key="atMobiles"))),
+            at_user_ids=tuple(self.__split_multstr(raw_str=self.get_config_item(config_key="atUserIds"))),
+            is_at_all=True if self.get_config_item(config_key="isAtAll") else False
+        )
 
-    def __build_url(self) -> str:
+    def __build_url(self, plan: DingtalkRobotSendPlan) -> str:
         """
-        构造url
+        构造url，配置了加签密钥时附加签名
         """
-        query = self.__build_query()
-        return f"https://oapi.dingtalk.com/robot/send?{query}"
+        if not plan.signer:
+            return plan.base_url
+        # 签名相关
+        timestamp = str(round(time.time() * 1000))
+        with trace_phase(TracePhase.SIGN):
+            sign = self.__sign(timestamp=timestamp, secret=plan.secret, signer=plan.signer)
+        query = {
+            "timestamp": timestamp,
+            "sign": sign
+        }
+        return f"{plan.base_url}&{urlencode(query)}"
 
     def __build_message(self, title: str, text: str, ext_info: dict = {}) -> Tuple[str, dict]:
         """
@@ -205,7 +248,7 @@ class DingtalkRobotChannel(CustomChannel):
         """
         return list(set([item.strip() for item in raw_str.split(",") if item and item.strip()])) if raw_str else []
 
-    def __build_json(self, title: str, text: str, ext_info: dict = {}) -> dict:
+    def __build_json(self, plan: DingtalkRobotSendPlan, title: str, text: str, ext_info: dict = {}) -> dict:
         """
         构造请求json
         """
@@ -215,9 +258,9 @@ class DingtalkRobotChannel(CustomChannel):
             "msgtype": msgtype,
             msgtype: msg,
             "at": {
-                "atMobiles": self.__split_multstr(raw_str=self.get_config_item(config_key="atMobiles")),
-                "atUserIds": self.__split_multstr(raw_str=self.get_config_item(config_key="atUserIds")),
-                "isAtAll": True if self.get_config_item(config_key="isAtAll") else False,
+                "atMobiles": list(plan.at_mobiles),
+                "atUserIds": list(plan.at_user_ids),
+                "isAtAll": plan.is_at_all,
             }
         }
         return json
@@ -234,11 +277,12 @@ class DingtalkRobotChannel(CustomChannel):
         if not text:
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息内容为空")
             return False
-        if not self.__check_config():
+        plan: DingtalkRobotSendPlan = self.get_send_plan()
+        if not plan:
             return False
-        send_url = self.__build_url()
-        json = self.__build_json(title=title, text=text, ext_info=ext_info)
-        res = requests.post(url=send_url, json=json)
+        send_url = self.__build_url(plan=plan)
+        json = self.__build_json(plan=plan, title=title, text=text, ext_info=ext_info)
+        res = self.http_post(url=send_url, json=json)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("errcode")
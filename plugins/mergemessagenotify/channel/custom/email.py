@@ -1,13 +1,17 @@
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr
 from enum import Enum
 import smtplib
-from typing import Tuple, List, Dict, Any, Union
+from typing import Tuple, List, Dict, Any, Union, NamedTuple, Optional
 from datetime import datetime
 import pytz
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
+from app.plugins.mergemessagenotify.metrics import trace_phase, TracePhase, add_payload_bytes, set_trace_error
+from app.plugins.mergemessagenotify.smtppool import smtp_pool
 from app.schemas.types import NotificationType
 from app.core.config import settings
 from app.log import logger
@@ -22,6 +26,30 @@ class SmtpEncryptType(Enum):
     TLS = "TLS加密"
 
 
+class EmailSendPlan(NamedTuple):
+    """
+    邮件发送计划
+    """
+    # SMTP主机
+    smtp_host: str
+    # SMTP端口
+    smtp_port: int
+    # SMTP加密类型
+    smtp_encrypt_type: SmtpEncryptType
+    # SMTP连接池key
+    smtp_key: Tuple
+    # 邮箱账户
+    username: str
+    # 邮箱密码
+    password: str
+    # 发件人邮件头
+    from_header: str
+    # 收件人
+    to_addrs: Tuple[str, ...]
+    # 收件人邮件头
+    to_header: str
+
+
 class EmailChannel(CustomChannel):
     """
     邮件渠道
@@ -196,22 +224,53 @@ class EmailChannel(CustomChannel):
             return False
         return True
 
-    def __build_message(self, title: str, text: str, to_addrs: List[str], ext_info: dict = {}) -> MIMEText:
+    def build_send_plan(self) -> Optional[EmailSendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        smtp_host = self.get_config_item(config_key="smtp_host")
+        smtp_port = self.get_config_item(config_key="smtp_port")
+        smtp_encrypt_type = self.get_config_item(config_key="smtp_encrypt_type")
+        username = self.get_config_item(config_key="username")
+        password = self.get_config_item(config_key="password")
+        to_addrs = self.__split_multstr(self.get_config_item(config_key="to_addrs"))
+        return EmailSendPlan(smtp_host=smtp_host,
+                             smtp_port=smtp_port,
+                             smtp_encrypt_type=SmtpEncryptType.__members__.get(smtp_encrypt_type),
+                             smtp_key=smtp_pool.build_key(host=smtp_host, port=smtp_port, encrypt_type=smtp_encrypt_type,
+                                                          username=username, password=password),
+                             username=username,
+                             password=password,
+                             from_header=formataddr(pair=(self.get_config_item(config_key="from_name"), username)),
+                             to_addrs=tuple(to_addrs),
+                             to_header=",".join(to_addrs))
+
+    def __build_message(self, plan: EmailSendPlan, title: str, text: str, ext_info: dict = {}) -> Union[MIMEText, MIMEMultipart]:
         """
         构造消息对象
         """
         ext_info = ext_info or {}
         image = ext_info.get("image")
-        if image:
+        # 图片已缓存时以CID内嵌，收件人无需再从远端加载
+        cached_image = self.get_cached_image(ext_info=ext_info)
+        if cached_image:
+            html = f'<div>{text}</div><br><img src="cid:{cached_image.digest}"></img>'
+            message = MIMEMultipart("related")
+            message.attach(MIMEText(html, "html", "utf-8"))
+            image_part = MIMEImage(cached_image.read_bytes(), _subtype=cached_image.content_type.split("/")[-1])
+            image_part.add_header("Content-ID", f"<{cached_image.digest}>")
+            image_part.add_header("Content-Disposition", "inline", filename=cached_image.path.name)
+            message.attach(image_part)
+        elif image:
             html = f'<div>{text}</div><br><img src="{image}"></img>'
             message = MIMEText(html, "html", "utf-8")
         else:
             message = MIMEText(text, "plain", "utf-8")
-        from_name = self.get_config_item(config_key="from_name")
-        username = self.get_config_item(config_key="username")
-        message["From"] = formataddr(pair=(from_name, username))
+        message["From"] = plan.from_header
         message["Date"] = datetime.now(tz=pytz.timezone(settings.TZ)).strftime("%a, %d %b %Y %H:%M:%S %z")
-        message["To"] = ",".join(to_addrs) if to_addrs else ""
+        message["To"] = plan.to_header
         message["Subject"] = Header(title, "utf-8")
         return message
 
@@ -222,15 +281,16 @@ class EmailChannel(CustomChannel):
         """
         return list(set([item.strip() for item in raw_str.split(",") if item and item.strip()])) if raw_str else []
 
-    def __connect_smtp(self, username: str = None, password: str = None) -> smtplib.SMTP:
+    @staticmethod
+    def __connect_smtp(plan: EmailSendPlan) -> smtplib.SMTP:
         """
         连接SMTP
         """
-        smtp_host = self.get_config_item(config_key="smtp_host")
-        smtp_port = self.get_config_item(config_key="smtp_port")
+        smtp_host = plan.smtp_host
+        smtp_port = plan.smtp_port
         timeout = 60
         # 针对不同加密类型的处理
-        smtp_encrypt_type = SmtpEncryptType.__members__.get(self.get_config_item(config_key="smtp_encrypt_type"))
+        smtp_encrypt_type = plan.smtp_encrypt_type
         if smtp_encrypt_type == SmtpEncryptType.SSL:
             smtp = smtplib.SMTP_SSL(host=smtp_host, port=smtp_port, timeout=timeout)
         else:
@@ -238,11 +298,7 @@ class EmailChannel(CustomChannel):
             if smtp_encrypt_type == SmtpEncryptType.TLS:
                 smtp.starttls()
         # 登录
-        if not username:
-            username = self.get_config_item(config_key="username")
-        if not password:
-            password = self.get_config_item(config_key="password")
-        smtp.login(user=username, password=password)
+        smtp.login(user=plan.username, password=plan.password)
         return smtp
 
     def send_message(self, title: str, text: str, type: NotificationType = None, ext_info: dict = {}) -> bool:
@@ -257,21 +313,21 @@ class EmailChannel(CustomChannel):
         if not text:
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息内容为空")
             return False
-        if not self.__check_config():
+        plan: EmailSendPlan = self.get_send_plan()
+        if not plan:
             return False
         # 发送邮件
-        username= self.get_config_item(config_key="username")
-        to_addrs= self.__split_multstr(self.get_config_item(config_key="to_addrs"))
-        message = self.__build_message(title=title, text=text, to_addrs=to_addrs, ext_info=ext_info)
-        smtp = None
+        message = self.__build_message(plan=plan, title=title, text=text, ext_info=ext_info)
+        msg = message.as_string()
+        add_payload_bytes(msg)
         try:
-            smtp = self.__connect_smtp(username=username)
-            smtp.sendmail(from_addr=username, to_addrs=to_addrs, msg=message.as_string())
+            # 复用连接池中已登录的连接，所有收件人在一次sendmail中发送
+            with trace_phase(TracePhase.NETWORK):
+                smtp_pool.sendmail(key=plan.smtp_key, connect_func=lambda: self.__connect_smtp(plan=plan),
+                                   from_addr=plan.username, to_addrs=list(plan.to_addrs), msg=msg)
             logger.info(f"发送消息成功: channel = {self.comp_name}, type = {type_str}")
             return True
         except Exception as e:
+            set_trace_error(e)
             logger.error(f"发送消息失败: channel = {self.comp_name}, type = {type_str}", exc_info=True)
             return False
-        finally:
-            if smtp:
-                smtp.quit()
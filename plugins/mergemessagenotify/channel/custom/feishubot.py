@@ -1,16 +1,30 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional
 from urllib.parse import urlencode
-import requests
 import time
 import hmac
 import hashlib
 import base64
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
+from app.plugins.mergemessagenotify.metrics import trace_phase, TracePhase
 from app.schemas.types import NotificationType
 from app.log import logger
 
 
+class FeishuBotSendPlan(NamedTuple):
+    """
+    飞书机器人发送计划
+    """
+    # 请求地址
+    url: str
+    # 签名校验密钥
+    secret: Optional[str]
+    # @的用户ID
+    at_user_ids: Tuple[str, ...]
+    # 是否@所有人
+    at_all: bool
+
+
 class FeishuBotChannel(CustomChannel):
     """
     飞书机器人渠道 https://open.feishu.cn/document/client-docs/bot-v3/add-custom-bot
@@ -22,6 +36,12 @@ class FeishuBotChannel(CustomChannel):
     comp_name: str = "飞书机器人"
     # 组件顺序
     comp_order: int = CustomChannel.comp_order * 100 + 43
+    # 每分钟最大发送条数缺省值：飞书机器人每分钟最多100条，桶容量允许少量突发，留出余量
+    rate_per_minute_default: int = 80
+    # 单条消息最大字节数缺省值，官方限制请求体最大20KB
+    max_message_bytes_default: int = 20000
+    # 富文本消息的结构和@列表
+    message_overhead_bytes: int = 1024
 
     # 配置相关
     # 组件缺省配置
@@ -132,6 +152,17 @@ class FeishuBotChannel(CustomChannel):
         access_token = self.get_config_item(config_key="access_token")
         return f"https://open.feishu.cn/open-apis/bot/v2/hook/{access_token}"
 
+    def build_send_plan(self) -> Optional[FeishuBotSendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        return FeishuBotSendPlan(url=self.__build_url(),
+                                 secret=self.get_config_item(config_key="secret"),
+                                 at_user_ids=tuple(self.__split_multstr(raw_str=self.get_config_item(config_key="at_user_ids"))),
+                                 at_all=True if self.get_config_item(config_key="at_all") else False)
+
     @classmethod
     def __build_text_at_user(cls, user_id: str, user_name: str = "") -> str:
         """
@@ -149,14 +180,14 @@ class FeishuBotChannel(CustomChannel):
         """
         return cls.__build_text_at_user(user_id="all", user_name="所有人")
 
-    def __build_message(self, title: str, text: str, ext_info: dict = {}) -> Tuple[str, dict]:
+    def __build_message(self, plan: FeishuBotSendPlan, title: str, text: str, ext_info: dict = {}) -> Tuple[str, dict]:
         """
         构造消息
         """
         ext_info = ext_info or {}
         link = ext_info.get("link")
-        at_user_ids = self.__split_multstr(raw_str=self.get_config_item(config_key="at_user_ids"))
-        at_all = self.get_config_item(config_key="at_all")
+        at_user_ids = plan.at_user_ids
+        at_all = plan.at_all
         # 文本消息
         if not title and text and not link:
             if at_user_ids:
@@ -208,22 +239,23 @@ class FeishuBotChannel(CustomChannel):
         """
         return list(set([item.strip() for item in raw_str.split(",") if item and item.strip()])) if raw_str else []
 
-    def __build_json(self, title: str, text: str, ext_info: dict = {}) -> dict:
+    def __build_json(self, plan: FeishuBotSendPlan, title: str, text: str, ext_info: dict = {}) -> dict:
         """
         构造请求json
         """
-        msgtype, msg = self.__build_message(title=title, text=text, ext_info=ext_info)
+        msgtype, msg = self.__build_message(plan=plan, title=title, text=text, ext_info=ext_info)
         # json
         json = {
             "msg_type": msgtype,
             "content": msg
         }
         # 签名
-        secret = self.get_config_item(config_key="secret")
+        secret = plan.secret
         if secret:
             timestamp = str(round(time.time()))
             json["timestamp"] = timestamp
-            json["sign"] = self.__sign(timestamp=timestamp, secret=secret)
+            with trace_phase(TracePhase.SIGN):
+                json["sign"] = self.__sign(timestamp=timestamp, secret=secret)
         return json
 
     def send_message(self, title: str, text: str, type: NotificationType = None, ext_info: dict = {}) -> bool:
@@ -238,11 +270,11 @@ class FeishuBotChannel(CustomChannel):
         if not text:
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息内容为空")
             return False
-        if not self.__check_config():
+        plan: FeishuBotSendPlan = self.get_send_plan()
+        if not plan:
             return False
-        send_url = self.__build_url()
-        json = self.__build_json(title=title, text=text, ext_info=ext_info)
-        res = requests.post(url=send_url, json=json)
+        json = self.__build_json(plan=plan, title=title, text=text, ext_info=ext_info)
+        res = self.http_post(url=plan.url, json=json)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("code")
@@ -1,5 +1,4 @@
-from typing import Tuple, List, Dict, Any
-import requests
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
 from app.schemas.types import NotificationType
@@ -7,6 +6,16 @@ from app.log import logger
 from app.core.config import settings
 
 
+class GotifySendPlan(NamedTuple):
+    """
+    Gotify发送计划
+    """
+    # 请求地址
+    url: str
+    # 是否使用代理
+    enable_proxy: bool
+
+
 class GotifyChannel(CustomChannel):
     """
     Gotify渠道 https://gotify.net/
@@ -108,6 +117,15 @@ class GotifyChannel(CustomChannel):
         token = self.get_config_item(config_key="token")
         return f"{server_url}/message?token={token}"
 
+    def build_send_plan(self) -> Optional[GotifySendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        return GotifySendPlan(url=self.__build_url(),
+                              enable_proxy=True if self.get_config_item(config_key="enable_proxy") else False)
+
     def __build_json(self, title: str, text: str, ext_info: dict = {}) -> dict:
         """
         构造请求json
@@ -160,12 +178,12 @@ class GotifyChannel(CustomChannel):
         if (type and enable_notify_types and type.name not in enable_notify_types):
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息类型不受支持")
             return False
-        if not self.__check_config():
+        plan: GotifySendPlan = self.get_send_plan()
+        if not plan:
             return False
-        send_url = self.__build_url()
         json = self.__build_json(title=title, text=text)
-        proxies = settings.PROXY if self.get_config_item(config_key="enable_proxy") else None
-        res = requests.post(url=send_url, json=json, proxies=proxies)
+        proxies = settings.PROXY if plan.enable_proxy else None
+        res = self.http_post(url=plan.url, json=json, proxies=proxies)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("errorCode")
@@ -1,13 +1,34 @@
-from typing import Tuple, List, Dict, Any
-import requests
+from types import MappingProxyType
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional, Mapping
 import json
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
+from app.plugins.mergemessagenotify.util import TemplateUtil, CompiledTemplate
 from app.schemas.types import NotificationType
 from app.log import logger
 from app.core.config import settings
 
 
+class HttpSendPlan(NamedTuple):
+    """
+    HTTP请求发送计划
+    """
+    # 请求方法
+    method: str
+    # 已编译的请求URL模板
+    url: Optional[CompiledTemplate]
+    # 已编译的请求头模板
+    headers: Optional[CompiledTemplate]
+    # 已编译的请求参数模板
+    params: Optional[CompiledTemplate]
+    # 已编译的请求体模板
+    body: Optional[CompiledTemplate]
+    # 自定义模板变量
+    template_variables: Mapping[str, Any]
+    # 是否使用代理
+    enable_proxy: bool
+
+
 class HttpChannel(CustomChannel):
     """
     HTTP请求渠道
@@ -233,6 +254,21 @@ class HttpChannel(CustomChannel):
             result[key] = value
         return result
 
+    def build_send_plan(self) -> Optional[HttpSendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        custom_template_variables = self.get_config_item(config_key="template_variables")
+        return HttpSendPlan(method=self.get_config_item(config_key="method"),
+                            url=TemplateUtil.compile_text(text=self.get_config_item(config_key="url")),
+                            headers=TemplateUtil.compile_text(text=self.get_config_item(config_key="headers")),
+                            params=TemplateUtil.compile_text(text=self.get_config_item(config_key="params")),
+                            body=TemplateUtil.compile_text(text=self.get_config_item(config_key="body")),
+                            template_variables=MappingProxyType(self.__str_to_dict(s=custom_template_variables) or {}),
+                            enable_proxy=True if self.get_config_item(config_key="enable_proxy") else False)
+
     def build_template_variables(self, title: str, text: str, type: NotificationType, ext_info: dict) -> dict:
         """
         构造模板变量
@@ -240,10 +276,9 @@ class HttpChannel(CustomChannel):
         # 预置的
         template_variables = super().build_template_variables(title=title, text=text, type=type, ext_info=ext_info)
         # 自定义的
-        custom_template_variables = self.get_config_item(config_key="template_variables")
-        custom_template_variables = self.__str_to_dict(s=custom_template_variables) or {}
-        # 合并
-        template_variables.update(custom_template_variables)
+        plan: HttpSendPlan = self.get_send_plan()
+        if plan:
+            template_variables.update(plan.template_variables)
         return template_variables
 
     @classmethod
@@ -267,31 +302,28 @@ class HttpChannel(CustomChannel):
         if (type and enable_notify_types and type.name not in enable_notify_types):
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息类型不受支持")
             return False
-        if not self.__check_config():
+        plan: HttpSendPlan = self.get_send_plan()
+        if not plan:
             return False
         # 模板变量
         template_variables = self.build_template_variables(title=title, text=text, type=type, ext_info=ext_info)
         logger.info(f"HTTP请求 >>> 全部模板变量: {template_variables}")
         # 请求方法
-        method = self.get_config_item(config_key="method")
+        method = plan.method
         logger.info(f"HTTP请求 >>> 请求方法: {method}")
         # 请求URL
-        url = self.get_config_item(config_key="url")
-        url = self.render_template(text=url, variables=template_variables, url_encode=True)
+        url = self.render_template(text=plan.url, variables=template_variables, url_encode=True)
         logger.info(f"HTTP请求 >>> 请求URL: {url}")
         # 请求头
-        headers = self.get_config_item(config_key="headers")
-        headers = self.render_template(text=headers, variables=template_variables)
+        headers = self.render_template(text=plan.headers, variables=template_variables)
         headers = self.__str_to_dict(s=headers)
         logger.info(f"HTTP请求 >>> 请求头: {headers}")
         # 请求参数
-        params = self.get_config_item(config_key="params")
-        params = self.render_template(text=params, variables=template_variables)
+        params = self.render_template(text=plan.params, variables=template_variables)
         params = self.__str_to_dict(s=params)
         logger.info(f"HTTP请求 >>> 请求参数: {params}")
         # 请求体
-        body = self.get_config_item(config_key="body")
-        body = self.render_template(text=body, variables=template_variables)
+        body = self.render_template(text=plan.body, variables=template_variables)
         logger.info(f"HTTP请求 >>> 请求体: {body}")
         is_json = self.__is_json(s=body)
         content_type = self.__get_dict_value_ignorecase(data=headers, key="Content-Type")
@@ -302,9 +334,9 @@ class HttpChannel(CustomChannel):
         elif not body:
             body = None
         # 代理
-        proxies = settings.PROXY if self.get_config_item(config_key="enable_proxy") else None
+        proxies = settings.PROXY if plan.enable_proxy else None
         # 发起请求
-        res = requests.request(method=method, url=url, headers=headers, params=params, data=body, proxies=proxies)
+        res = self.http_request(method=method, url=url, headers=headers, params=params, data=body, proxies=proxies)
         if res:
             if res.ok:
                 logger.info(f"发送消息成功: channel = {self.comp_name}, type = {type_str}, text = {res.text}")
@@ -1,11 +1,18 @@
-from typing import Tuple, List, Dict, Any
-import requests
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
 from app.schemas.types import NotificationType
 from app.log import logger
 
 
+class IYUUSendPlan(NamedTuple):
+    """
+    IYUU发送计划
+    """
+    # 请求地址
+    url: str
+
+
 class IYUUChannel(CustomChannel):
     """
     爱语飞飞渠道
@@ -72,6 +79,14 @@ class IYUUChannel(CustomChannel):
         token = self.get_config_item(config_key="token")
         return f"https://iyuu.cn/{token}.send"
 
+    def build_send_plan(self) -> Optional[IYUUSendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        return IYUUSendPlan(url=self.__build_url())
+
     def __build_params(self, title: str, text: str) -> dict:
         """
         构造请求参数
@@ -97,11 +112,11 @@ class IYUUChannel(CustomChannel):
         if not title:
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息标题为空")
             return False
-        if not self.__check_config():
+        plan: IYUUSendPlan = self.get_send_plan()
+        if not plan:
             return False
-        send_url = self.__build_url()
         params = self.__build_params(title=title, text=text)
-        res = requests.post(url=send_url, params=params)
+        res = self.http_post(url=plan.url, params=params)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("errcode")
@@ -1,7 +1,7 @@
-from typing import Tuple, List, Dict, Any
+from types import MappingProxyType
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional, Mapping
 from urllib.parse import quote
 import base64
-import requests
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
 from app.schemas.types import NotificationType
@@ -9,6 +9,20 @@ from app.log import logger
 from app.core.config import settings
 
 
+class NtfySendPlan(NamedTuple):
+    """
+    ntfy发送计划
+    """
+    # 请求地址
+    url: str
+    # 每条消息都相同的headers（认证、Markdown）
+    static_headers: Mapping[str, str]
+    # 是否启用Markdown
+    enable_md: bool
+    # 是否使用代理
+    enable_proxy: bool
+
+
 class NtfyChannel(CustomChannel):
     """
     Ntfy渠道 https://ntfy.sh
@@ -196,24 +210,15 @@ class NtfyChannel(CustomChannel):
         raw_str = f"{username or ''}:{password or ''}"
         return cls.__base64_encode(raw_str=raw_str)
 
-    def __build_headers(self, title: str, type: NotificationType, image: str = None) -> dict:
+    def __build_static_headers(self) -> dict:
         """
-        构造headers
+        构造每条消息都相同的headers
         """
         headers = {
         }
         # X-Markdown
         if self.get_config_item(config_key="enable_md"):
             headers["X-Markdown"] = "true"
-        # X-Title
-        if title:
-            headers["X-Title"] = title.encode(encoding="utf-8")
-        # X-Tags
-        if type:
-            headers["X-Tags"] = type.value.encode(encoding="utf-8")
-        # X-Attach, 如果不是md，则加X-Attach
-        if image and not self.get_config_item(config_key="enable_md"):
-            headers["X-Attach"] = image
         # Authorization
         token = self.get_config_item(config_key="token")
         if token:
@@ -226,7 +231,36 @@ class NtfyChannel(CustomChannel):
                 headers["Authorization"] = f"Basic {basic_auth_value}"
         return headers
 
-    def __build_data(self, title: str, text: str, ext_info: dict = {}) -> bytes:
+    def build_send_plan(self) -> Optional[NtfySendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        return NtfySendPlan(url=self.__build_url(),
+                            static_headers=MappingProxyType(self.__build_static_headers()),
+                            enable_md=True if self.get_config_item(config_key="enable_md") else False,
+                            enable_proxy=True if self.get_config_item(config_key="enable_proxy") else False)
+
+    @staticmethod
+    def __build_headers(plan: NtfySendPlan, title: str, type: NotificationType, image: str = None) -> dict:
+        """
+        构造headers
+        """
+        headers = dict(plan.static_headers)
+        # X-Title
+        if title:
+            headers["X-Title"] = title.encode(encoding="utf-8")
+        # X-Tags
+        if type:
+            headers["X-Tags"] = type.value.encode(encoding="utf-8")
+        # X-Attach, 如果不是md，则加X-Attach
+        if image and not plan.enable_md:
+            headers["X-Attach"] = image
+        return headers
+
+    @staticmethod
+    def __build_data(plan: NtfySendPlan, title: str, text: str, ext_info: dict = {}) -> bytes:
         """
         构造请求数据
         """
@@ -234,7 +268,7 @@ class NtfyChannel(CustomChannel):
         data = text or title
         image = ext_info.get("image")
         if image:
-            if self.get_config_item(config_key="enable_md"):
+            if plan.enable_md:
                 data += f"\n\n![]({image})"
         return data.encode(encoding="utf-8")
 
@@ -247,13 +281,13 @@ class NtfyChannel(CustomChannel):
         if (type and enable_notify_types and type.name not in enable_notify_types):
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息类型不受支持")
             return False
-        if not self.__check_config():
+        plan: NtfySendPlan = self.get_send_plan()
+        if not plan:
             return False
-        send_url = self.__build_url()
-        headers = self.__build_headers(title=title, type=type, image=ext_info.get("image"))
-        data = self.__build_data(title=title, text=text, ext_info=ext_info)
-        proxies = settings.PROXY if self.get_config_item(config_key="enable_proxy") else None
-        res = requests.post(url=send_url, headers=headers, data=data, proxies=proxies)
+        headers = self.__build_headers(plan=plan, title=title, type=type, image=ext_info.get("image"))
+        data = self.__build_data(plan=plan, title=title, text=text, ext_info=ext_info)
+        proxies = settings.PROXY if plan.enable_proxy else None
+        res = self.http_post(url=plan.url, headers=headers, data=data, proxies=proxies)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("code")
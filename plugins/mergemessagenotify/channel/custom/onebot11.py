@@ -1,12 +1,30 @@
-from typing import Dict, Any, Tuple, List, Union
-import requests
+from typing import Dict, Any, Tuple, List, Union, Optional, NamedTuple
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
+from app.plugins.mergemessagenotify.metrics import trace_phase, TracePhase
+from app.plugins.mergemessagenotify.util import TemplateUtil, CompiledTemplate
+from app.plugins.mergemessagenotify.wsclient import onebot_ws_pool, OneBotResponseError
 from app.schemas.types import NotificationType
 from app.log import logger
 from app.core.config import settings
 
 
+class OneBot11SendPlan(NamedTuple):
+    """
+    OneBot-11发送计划
+    """
+    # HTTP请求地址
+    url: str
+    # 正向WebSocket地址
+    ws_url: Optional[str]
+    # 已编译的消息模板
+    message_template: Optional[CompiledTemplate]
+    # 发送目标：私聊 (user_id, None)，群聊 (None, group_id)
+    targets: Tuple[Tuple[Optional[str], Optional[str]], ...]
+    # 是否使用代理
+    enable_proxy: bool
+
+
 class OneBot11Channel(CustomChannel):
     """
     OneBot-11 通用聊天机器人规范渠道 https://github.com/botuniverse/onebot-11
@@ -91,6 +109,36 @@ class OneBot11Channel(CustomChannel):
                         'hint': '选填。对方群组号，多个用英文逗号,分隔；与【目标用户】不允许同时为空。'
                     }
                 }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'ws_url',
+                        'label': 'WebSocket地址',
+                        'placeholder': 'ws://192.168.1.11:3001',
+                        'hint': '选填。服务器的正向WebSocket地址，填写后通过持久连接发送消息，失败时回退为HTTP；需要安装websocket-client。'
+                    }
+                }]
+            }, {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'xxl': 4, 'xl': 4, 'lg': 4, 'md': 4, 'sm': 6, 'xs': 12
+                },
+                'content': [{
+                    'component': 'VTextField',
+                    'props': {
+                        'model': 'target_concurrency',
+                        'label': '并发发送数',
+                        'type': 'number',
+                        'hint': f'选填。多个目标用户和群组同时发送的最大数量。缺省时为{self.target_concurrency_default}。'
+                    }
+                }]
             }, {
                 'component': 'VCol',
                 'props': {
@@ -217,6 +265,22 @@ class OneBot11Channel(CustomChannel):
         """
         return list(set([item.strip() for item in raw_str.split(",") if item and item.strip()])) if raw_str else []
 
+    def build_send_plan(self) -> Optional[OneBot11SendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        # 发送目标：私聊 (user_id, None)，群聊 (None, group_id)
+        user_ids = self.__split_multstr(raw_str=self.get_config_item("user_ids"))
+        group_ids = self.__split_multstr(raw_str=self.get_config_item("group_ids"))
+        targets = [(user_id, None) for user_id in user_ids] + [(None, group_id) for group_id in group_ids]
+        return OneBot11SendPlan(url=self.__build_url(),
+                                ws_url=self.get_config_item(config_key="ws_url"),
+                                message_template=TemplateUtil.compile_text(text=self.get_config_item(config_key="message_template")),
+                                targets=tuple(targets),
+                                enable_proxy=True if self.get_config_item(config_key="enable_proxy") else False)
+
     def __build_json(self, user_id: Union[int, str],
                            group_id: Union[int, str],
                            message: str) -> dict:
@@ -232,7 +296,21 @@ class OneBot11Channel(CustomChannel):
             json["group_id"] = group_id
         return json
 
-    def __send_msg(self, url: str,
+    def __send_msg_by_ws(self, ws_url: str, json: dict) -> Optional[dict]:
+        """
+        通过WebSocket发送，连接或发送失败时返回None
+        :raise OneBotResponseError: 请求已发送但未取得响应，不能回退为HTTP，否则消息可能重复
+        """
+        try:
+            with trace_phase(TracePhase.NETWORK):
+                return onebot_ws_pool.get(url=ws_url).call(action="send_msg", params=json)
+        except OneBotResponseError:
+            raise
+        except Exception as e:
+            logger.warn(f"WebSocket发送失败，回退为HTTP: channel = {self.comp_name}, {str(e)}")
+            return None
+
+    def __send_msg(self, plan: OneBot11SendPlan,
                          user_id: Union[int, str],
                          group_id: Union[int, str],
                          message: str,
@@ -243,7 +321,20 @@ class OneBot11Channel(CustomChannel):
         """
         type_str = type.value if type else None
         json = self.__build_json(user_id=user_id, group_id=group_id, message=message)
-        res = requests.post(url=url, json=json, proxies=proxies)
+        ws_url = plan.ws_url
+        try:
+            res_json = self.__send_msg_by_ws(ws_url=ws_url, json=json) if ws_url and onebot_ws_pool.is_available() else None
+        except OneBotResponseError as e:
+            logger.warn(f"发送消息失败: channel = {self.comp_name}, type = {type_str}, user_id = {user_id}, group_id = {group_id}, WebSocket{str(e)}，不回退为HTTP")
+            return False
+        if res_json is not None:
+            code = res_json.get("retcode")
+            if code == 0 or code == 1:
+                logger.info(f"发送消息成功: channel = {self.comp_name}, type = {type_str}, user_id = {user_id}, group_id = {group_id}")
+                return True
+            logger.warn(f"发送消息失败: channel = {self.comp_name}, type = {type_str}, user_id = {user_id}, group_id = {group_id}, code = {code}, message = {res_json.get('msg')}")
+            return False
+        res = self.http_post(url=plan.url, json=json, proxies=proxies)
         res_json = res.json() or {}
         if res.ok:
             code = res_json.get("retcode")
@@ -267,38 +358,19 @@ class OneBot11Channel(CustomChannel):
         if (type and enable_notify_types and type.name not in enable_notify_types):
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息类型不受支持")
             return False
-        if not self.__check_config():
+        plan: OneBot11SendPlan = self.get_send_plan()
+        if not plan:
             return False
         # 模板变量
         template_variables = self.build_template_variables(title=title, text=text, type=type, ext_info=ext_info)
         logger.info(f">>> 全部模板变量: {template_variables}")
-        # 发送url
-        send_url = self.__build_url()
-        # 消息模板
-        message_template = self.get_config_item(config_key="message_template")
         # 消息
-        message = self.render_template(text=message_template, variables=template_variables)
+        message = self.render_template(text=plan.message_template, variables=template_variables)
         # 代理开关
-        proxies = settings.PROXY if self.get_config_item(config_key="enable_proxy") else None
-        # 成功失败数
-        success_count = 0
-        fail_count = 0
-        # 发送私聊信息
-        user_ids = self.get_config_item("user_ids")
-        user_ids = self.__split_multstr(raw_str=user_ids)
-        for user_id in user_ids:
-            success = self.__send_msg(url=send_url, user_id=user_id, group_id=None, message=message, type=type, proxies=proxies)
-            if success:
-                success_count += 1
-            else:
-                fail_count += 1
-        # 发送群聊信息
-        group_ids = self.get_config_item("group_ids")
-        group_ids = self.__split_multstr(raw_str=group_ids)
-        for group_id in group_ids:
-            success = self.__send_msg(url=send_url, user_id=None, group_id=group_id, message=message, type=type, proxies=proxies)
-            if success:
-                success_count += 1
-            else:
-                fail_count += 1
+        proxies = settings.PROXY if plan.enable_proxy else None
+        # 并发发送
+        _, fail_count = self.send_to_targets(
+            targets=plan.targets,
+            send_func=lambda target: self.__send_msg(plan=plan, user_id=target[0], group_id=target[1],
+                                                     message=message, type=type, proxies=proxies))
         return fail_count == 0
@@ -1,6 +1,5 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional
 from urllib.parse import urlencode
-import requests
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
 from app.schemas.types import NotificationType
@@ -8,6 +7,18 @@ from app.log import logger
 from app.core.config import settings
 
 
+class PushDeerSendPlan(NamedTuple):
+    """
+    PushDeer发送计划
+    """
+    # 请求地址
+    url: str
+    # 推送密钥
+    push_key: str
+    # 是否使用代理
+    enable_proxy: bool
+
+
 class PushDeerChannel(CustomChannel):
     """
     PushDeer渠道 http://www.pushdeer.com
@@ -113,14 +124,25 @@ class PushDeerChannel(CustomChannel):
         server_url = server_url.rstrip("/")
         return f"{server_url}/message/push"
 
-    def __build_json(self, title: str, text: str, ext_info: dict = {}) -> dict:
+    def build_send_plan(self) -> Optional[PushDeerSendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        return PushDeerSendPlan(url=self.__build_url(),
+                                push_key=self.get_config_item(config_key="push_key"),
+                                enable_proxy=True if self.get_config_item(config_key="enable_proxy") else False)
+
+    @staticmethod
+    def __build_json(plan: PushDeerSendPlan, title: str, text: str, ext_info: dict = {}) -> dict:
         """
         构造请求json
         """
         ext_info = ext_info or {}
         # json
         json = {
-            "pushkey": self.get_config_item(config_key="push_key"),
+            "pushkey": plan.push_key,
             "text": title,
             "type": "markdown"
         }
@@ -144,12 +166,12 @@ class PushDeerChannel(CustomChannel):
         if not title:
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息标题为空")
             return False
-        if not self.__check_config():
+        plan: PushDeerSendPlan = self.get_send_plan()
+        if not plan:
             return False
-        send_url = self.__build_url()
-        json = self.__build_json(title=title, text=text, ext_info=ext_info)
-        proxies = settings.PROXY if self.get_config_item(config_key="enable_proxy") else None
-        res = requests.post(url=send_url, json=json, proxies=proxies)
+        json = self.__build_json(plan=plan, title=title, text=text, ext_info=ext_info)
+        proxies = settings.PROXY if plan.enable_proxy else None
+        res = self.http_post(url=plan.url, json=json, proxies=proxies)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("code")
@@ -1,6 +1,5 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional
 from enum import Enum
-import requests
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
 from app.schemas.types import NotificationType
@@ -30,6 +29,24 @@ class MessageTopic(Enum):
         self.desc = desc
 
 
+class PushMeSendPlan(NamedTuple):
+    """
+    PushMe发送计划
+    """
+    # 请求地址
+    url: str
+    # 密钥字段名
+    key_field: Optional[str]
+    # 密钥
+    key: str
+    # 标题前缀（消息主题）
+    title_prefix: str
+    # 标题后缀（消息频道）
+    title_suffix: str
+    # 是否使用代理
+    enable_proxy: bool
+
+
 class PushMeChannel(CustomChannel):
     """
     PushMe渠道 https://push.i-i.me/
@@ -178,29 +195,51 @@ class PushMeChannel(CustomChannel):
             return False
         return True
 
-    def __build_data(self, title: str, text: str, ext_info: dict = {}) -> dict:
+    def build_send_plan(self) -> Optional[PushMeSendPlan]:
         """
-        构造表单数据
+        构造发送计划
         """
-        data = {}
+        if not self.__check_config():
+            return None
         # 密钥
         key_type = self.get_config_item(config_key="key_type")
         key = self.get_config_item(config_key="key")
+        key_field = None
         if key_type == ApiKeyType.push_key.name:
-            data["push_key"] = key
+            key_field = "push_key"
         elif key_type == ApiKeyType.temp_key.name:
-            data["temp_key"] = key
+            key_field = "temp_key"
+        # 标题前缀
+        title_prefix = ""
+        message_topic: str = self.get_config_item(config_key="message_topic")
+        if message_topic:
+            topic: MessageTopic = MessageTopic.__members__.get(message_topic)
+            if topic:
+                title_prefix = f"{topic.symbol} "
+        # 标题后缀
+        title_suffix = ""
+        message_channel: str = self.get_config_item(config_key="message_channel")
+        if message_channel:
+            title_suffix = f" [~{message_channel}]"
+        return PushMeSendPlan(url=self.get_config_item(config_key="server_url"),
+                              key_field=key_field,
+                              key=key,
+                              title_prefix=title_prefix,
+                              title_suffix=title_suffix,
+                              enable_proxy=True if self.get_config_item(config_key="enable_proxy") else False)
+
+    @staticmethod
+    def __build_data(plan: PushMeSendPlan, title: str, text: str, ext_info: dict = {}) -> dict:
+        """
+        构造表单数据
+        """
+        data = {}
+        # 密钥
+        if plan.key_field:
+            data[plan.key_field] = plan.key
         # 标题
         if title:
-            message_topic: str = self.get_config_item(config_key="message_topic")
-            if message_topic:
-                topic: MessageTopic = MessageTopic.__members__.get(message_topic)
-                if topic:
-                    title = f"{topic.symbol} {title}"
-            message_channel: str = self.get_config_item(config_key="message_channel")
-            if message_channel:
-                title = f"{title} [~{message_channel}]"
-            data["title"] = title
+            data["title"] = f"{plan.title_prefix}{title}{plan.title_suffix}"
         # 消息类型和内容
         content = text
         data["type"] = "text"
@@ -220,13 +259,12 @@ class PushMeChannel(CustomChannel):
         if (type and enable_notify_types and type.name not in enable_notify_types):
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息类型不受支持")
             return False
-        if not self.__check_config():
+        plan: PushMeSendPlan = self.get_send_plan()
+        if not plan:
             return False
-        server_url: str = self.get_config_item(config_key="server_url")
-        send_url = server_url
-        data = self.__build_data(title=title, text=text, ext_info=ext_info)
-        proxies = settings.PROXY if self.get_config_item(config_key="enable_proxy") else None
-        res = requests.post(url=send_url, data=data, proxies=proxies)
+        data = self.__build_data(plan=plan, title=title, text=text, ext_info=ext_info)
+        proxies = settings.PROXY if plan.enable_proxy else None
+        res = self.http_post(url=plan.url, data=data, proxies=proxies)
         res_text = res.text
         if res_text == 'success':
             logger.info(f"发送消息成功: channel = {self.comp_name}, type = {type_str}")
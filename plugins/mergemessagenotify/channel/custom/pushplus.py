@@ -1,6 +1,6 @@
-from typing import Tuple, List, Dict, Any
+from types import MappingProxyType
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional, Mapping
 from enum import Enum
-import requests
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
 from app.schemas.types import NotificationType
@@ -19,6 +19,16 @@ class SendChannel(Enum):
     sms = "短信"
 
 
+class PushPlusSendPlan(NamedTuple):
+    """
+    PushPlus发送计划
+    """
+    # 请求json中的固定参数
+    static_json: Mapping[str, Any]
+    # 请求地址
+    url: str = "http://www.pushplus.plus/send"
+
+
 class PushPlusChannel(CustomChannel):
     """
     PushPlus渠道 http://www.pushplus.plus
@@ -113,19 +123,28 @@ class PushPlusChannel(CustomChannel):
             return False
         return True
 
-    def __build_json(self, title: str, text: str, ext_info: dict = {}) -> dict:
+    def build_send_plan(self) -> Optional[PushPlusSendPlan]:
         """
-        构造请求json
+        构造发送计划
         """
-        ext_info = ext_info or {}
-        # json
-        json = {
+        if not self.__check_config():
+            return None
+        return PushPlusSendPlan(static_json=MappingProxyType({
             "token": self.get_config_item(config_key="token"),
-            "title": title,
             "topic": self.get_config_item(config_key="topic"),
             "template": "markdown",
             "channel": self.get_config_item(config_key="channel"),
-        }
+        }))
+
+    @staticmethod
+    def __build_json(plan: PushPlusSendPlan, title: str, text: str, ext_info: dict = {}) -> dict:
+        """
+        构造请求json
+        """
+        ext_info = ext_info or {}
+        # json
+        json = dict(plan.static_json)
+        json["title"] = title
         # content
         content = text or title
         image = ext_info.get("image")
@@ -143,11 +162,11 @@ class PushPlusChannel(CustomChannel):
         if (type and enable_notify_types and type.name not in enable_notify_types):
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息类型不受支持")
             return False
-        if not self.__check_config():
+        plan: PushPlusSendPlan = self.get_send_plan()
+        if not plan:
             return False
-        send_url = "http://www.pushplus.plus/send"
-        json = self.__build_json(title=title, text=text, ext_info=ext_info)
-        res = requests.post(url=send_url, json=json)
+        json = self.__build_json(plan=plan, title=title, text=text, ext_info=ext_info)
+        res = self.http_post(url=plan.url, json=json)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("code")
@@ -1,6 +1,5 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional
 from urllib.parse import urlencode, quote_plus
-import requests
 import time
 import hmac
 import hashlib
@@ -11,6 +10,18 @@ from app.schemas.types import NotificationType
 from app.log import logger
 
 
+class QiyeWeixinBotSendPlan(NamedTuple):
+    """
+    企业微信机器人发送计划
+    """
+    # 请求地址
+    url: str
+    # 提醒的手机号列表
+    mentioned_mobile_list: Tuple[str, ...]
+    # 提醒的用户ID列表
+    mentioned_list: Tuple[str, ...]
+
+
 class QiyeWeixinBotChannel(CustomChannel):
     """
     企业微信机器人渠道
@@ -22,6 +33,11 @@ class QiyeWeixinBotChannel(CustomChannel):
     comp_name: str = "企业微信机器人"
     # 组件顺序
     comp_order: int = CustomChannel.comp_order * 100 + 42
+    # 每分钟最大发送条数缺省值：企业微信机器人每分钟最多20条，桶容量允许少量突发，留出余量
+    rate_per_minute_default: int = 16
+    # 单条消息最大字节数缺省值，官方限制markdown内容最长4096字节
+    max_message_bytes_default: int = 4096
+    message_overhead_bytes: int = 64
 
     # 配置相关
     # 组件缺省配置
@@ -140,19 +156,29 @@ class QiyeWeixinBotChannel(CustomChannel):
             markdown += f"![]({image})\n\n"
         return "markdown", markdown
 
-    def __build_message(self, title: str, text: str, ext_info: dict = {}) -> Tuple[str, dict]:
+    def build_send_plan(self) -> Optional[QiyeWeixinBotSendPlan]:
         """
-        构造消息
+        构造发送计划
         """
-        msgtype, content = self.__build_message_content(title=title, text=text, ext_info=ext_info)
+        if not self.__check_config():
+            return None
         mentioned_mobile_list = self.__split_multstr(raw_str=self.get_config_item(config_key="mentioned_mobile_list"))
         mentioned_list = self.__split_multstr(raw_str=self.get_config_item(config_key="mentioned_list"))
         if self.get_config_item(config_key="isAtAll"):
             mentioned_mobile_list.append("@all")
+        return QiyeWeixinBotSendPlan(url=self.__build_url(),
+                                     mentioned_mobile_list=tuple(mentioned_mobile_list),
+                                     mentioned_list=tuple(mentioned_list))
+
+    def __build_message(self, plan: QiyeWeixinBotSendPlan, title: str, text: str, ext_info: dict = {}) -> Tuple[str, dict]:
+        """
+        构造消息
+        """
+        msgtype, content = self.__build_message_content(title=title, text=text, ext_info=ext_info)
         return msgtype, {
             "content": content,
-            "mentioned_mobile_list": mentioned_mobile_list,
-            "mentioned_list": mentioned_list
+            "mentioned_mobile_list": list(plan.mentioned_mobile_list),
+            "mentioned_list": list(plan.mentioned_list)
         }
 
     @classmethod
@@ -162,11 +188,11 @@ class QiyeWeixinBotChannel(CustomChannel):
         """
         return list(set([item.strip() for item in raw_str.split(",") if item and item.strip()])) if raw_str else []
 
-    def __build_json(self, title: str, text: str, ext_info: dict = {}) -> dict:
+    def __build_json(self, plan: QiyeWeixinBotSendPlan, title: str, text: str, ext_info: dict = {}) -> dict:
         """
         构造请求json
         """
-        msgtype, msg = self.__build_message(title=title, text=text, ext_info=ext_info)
+        msgtype, msg = self.__build_message(plan=plan, title=title, text=text, ext_info=ext_info)
         # json
         json = {
             "msgtype": msgtype,
@@ -186,11 +212,11 @@ class QiyeWeixinBotChannel(CustomChannel):
         if not text:
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息内容为空")
             return False
-        if not self.__check_config():
-            return
-        send_url = self.__build_url()
-        json = self.__build_json(title=title, text=text, ext_info=ext_info)
-        res = requests.post(url=send_url, json=json)
+        plan: QiyeWeixinBotSendPlan = self.get_send_plan()
+        if not plan:
+            return False
+        json = self.__build_json(plan=plan, title=title, text=text, ext_info=ext_info)
+        res = self.http_post(url=plan.url, json=json)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("errcode")
@@ -1,6 +1,5 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, NamedTuple, Optional
 from enum import Enum
-import requests
 
 from app.plugins.mergemessagenotify.channel.custom import CustomChannel
 from app.schemas.types import NotificationType
@@ -28,6 +27,18 @@ class SendChannel(Enum):
         self.name_ = name_
 
 
+class ServerChanSendPlan(NamedTuple):
+    """
+    Server酱发送计划
+    """
+    # 请求地址
+    url: str
+    # 是否隐藏调用IP
+    noip: bool
+    # 消息通道
+    channel: Optional[str]
+
+
 class ServerChanChannel(CustomChannel):
     """
     Server酱渠道 https://sct.ftqq.com
@@ -128,7 +139,25 @@ class ServerChanChannel(CustomChannel):
         send_key = self.get_config_item(config_key="send_key")
         return f"https://sctapi.ftqq.com/{send_key}.send"
 
-    def __build_json(self, title: str, text: str, ext_info: dict = {}) -> dict:
+    def build_send_plan(self) -> Optional[ServerChanSendPlan]:
+        """
+        构造发送计划
+        """
+        if not self.__check_config():
+            return None
+        # 消息通道，最多两个
+        channel = None
+        channels = self.get_config_item(config_key="channel")
+        if channels:
+            channels = channels[0:2]
+            channels = [str(channel) for channel in channels]
+            channel = "|".join(channels)
+        return ServerChanSendPlan(url=self.__build_url(),
+                                  noip=self.get_config_item(config_key="noip") or False,
+                                  channel=channel)
+
+    @staticmethod
+    def __build_json(plan: ServerChanSendPlan, title: str, text: str, ext_info: dict = {}) -> dict:
         """
         构造请求json
         """
@@ -136,7 +165,7 @@ class ServerChanChannel(CustomChannel):
         # json
         json = {
             "title": title,
-            "noip": self.get_config_item(config_key="noip") or False
+            "noip": plan.noip
         }
         # desp
         desp = text or title
@@ -145,12 +174,8 @@ class ServerChanChannel(CustomChannel):
             desp += f"\n\n![]({image})"
         json["desp"] = desp
         # channel
-        channels = self.get_config_item(config_key="channel")
-        if channels:
-            channels = channels[0:2]
-            channels = [str(channel) for channel in channels]
-            channel = "|".join(channels)
-            json["channel"] = channel
+        if plan.channel:
+            json["channel"] = plan.channel
         return json
 
     def send_message(self, title: str, text: str, type: NotificationType = None, ext_info: dict = {}) -> bool:
@@ -165,11 +190,11 @@ class ServerChanChannel(CustomChannel):
         if not title:
             logger.warn(f"发送消息中止: channel = {self.comp_name}, type = {type_str}, 消息标题为空")
             return False
-        if not self.__check_config():
-            return
-        send_url = self.__build_url()
-        json = self.__build_json(title=title, text=text, ext_info=ext_info)
-        res = requests.post(url=send_url, json=json)
+        plan: ServerChanSendPlan = self.get_send_plan()
+        if not plan:
+            return False
+        json = self.__build_json(plan=plan, title=title, text=text, ext_info=ext_info)
+        res = self.http_post(url=plan.url, json=json)
         res_json = res.json() or {}
         if res.ok or res_json:
             code = res_json.get("code")
@@ -0,0 +1,63 @@
+import importlib
+from typing import List, Optional, Type
+
+from app.plugins.mergemessagenotify.channel import Channel
+
+
+class ChannelMeta:
+    """
+    渠道元数据：用于在不导入渠道实现的情况下列出渠道，需要时再按模块路径导入
+    """
+
+    def __init__(self, key: str, name: str, order: int, module_path: str, class_name: str):
+        self.key = key
+        self.name = name
+        self.order = order
+        self.module_path = module_path
+        self.class_name = class_name
+
+    def load_type(self) -> Type[Channel]:
+        """
+        导入渠道实现类
+        """
+        module = importlib.import_module(self.module_path)
+        comp_type = getattr(module, self.class_name)
+        if not isinstance(comp_type, type) or not issubclass(comp_type, Channel):
+            raise TypeError(f"{self.module_path}.{self.class_name} 不是渠道类")
+        if comp_type.comp_key != self.key:
+            raise ValueError(f"{self.module_path}.{self.class_name} 的组件key与注册表不一致: {comp_type.comp_key} != {self.key}")
+        return comp_type
+
+
+# 自定义渠道模块包路径
+custom_package = "app.plugins.mergemessagenotify.channel.custom"
+
+# 渠道注册表，新增渠道时需要在此登记，key、名称和顺序需要与渠道类保持一致
+channel_metas: List[ChannelMeta] = sorted([
+    ChannelMeta(key="custom.iyuu", name="爱语飞飞", order=201, module_path=f"{custom_package}.iyuu", class_name="IYUUChannel"),
+    ChannelMeta(key="custom.bark", name="Bark", order=202, module_path=f"{custom_package}.bark", class_name="BarkChannel"),
+    ChannelMeta(key="custom.chanify", name="Chanify", order=203, module_path=f"{custom_package}.chanify", class_name="ChanifyChannel"),
+    ChannelMeta(key="custom.ntfy", name="Ntfy", order=204, module_path=f"{custom_package}.ntfy", class_name="NtfyChannel"),
+    ChannelMeta(key="custom.pushdeer", name="PushDeer", order=205, module_path=f"{custom_package}.pushdeer", class_name="PushDeerChannel"),
+    ChannelMeta(key="custom.pushplus", name="PushPlus", order=206, module_path=f"{custom_package}.pushplus", class_name="PushPlusChannel"),
+    ChannelMeta(key="custom.serverchan", name="Server酱", order=207, module_path=f"{custom_package}.serverchan", class_name="ServerChanChannel"),
+    ChannelMeta(key="custom.gotify", name="Gotify", order=208, module_path=f"{custom_package}.gotify", class_name="GotifyChannel"),
+    ChannelMeta(key="custom.pushme", name="PushMe", order=209, module_path=f"{custom_package}.pushme", class_name="PushMeChannel"),
+    ChannelMeta(key="custom.dingtalkrobot", name="钉钉机器人", order=241, module_path=f"{custom_package}.dingtalkrobot", class_name="DingtalkRobotChannel"),
+    ChannelMeta(key="custom.qiyeweixinbot", name="企业微信机器人", order=242, module_path=f"{custom_package}.qiyeweixinbot", class_name="QiyeWeixinBotChannel"),
+    ChannelMeta(key="custom.feishubot", name="飞书机器人", order=243, module_path=f"{custom_package}.feishubot", class_name="FeishuBotChannel"),
+    ChannelMeta(key="custom.onebot-11", name="OneBot-11", order=251, module_path=f"{custom_package}.onebot11", class_name="OneBot11Channel"),
+    ChannelMeta(key="custom.apprise", name="Apprise", order=252, module_path=f"{custom_package}.apprise", class_name="AppriseChannel"),
+    ChannelMeta(key="custom.email", name="邮件", order=261, module_path=f"{custom_package}.email", class_name="EmailChannel"),
+    ChannelMeta(key="custom.http", name="HTTP请求", order=299, module_path=f"{custom_package}.http", class_name="HttpChannel"),
+], key=lambda meta: (meta.order, meta.key))
+
+
+def get_channel_meta(key: str) -> Optional[ChannelMeta]:
+    """
+    按key获取渠道元数据
+    """
+    for meta in channel_metas:
+        if meta.key == key:
+            return meta
+    return None
@@ -0,0 +1,90 @@
+from typing import List, Optional, NamedTuple
+
+
+class MessageChunk(NamedTuple):
+    """
+    切分后的消息段
+    """
+    title: Optional[str]
+    text: Optional[str]
+    # 序号，从1开始
+    index: int
+    # 总段数
+    total: int
+
+
+# 标题序号后缀预留的字节数，如“ (12/34)”
+_suffix_reserve_bytes: int = 16
+# 每段内容的最小字节数，可用字节数小于该值时不切分，交由渠道自行处理
+_min_chunk_bytes: int = 256
+
+
+def _split_line(line: str, max_bytes: int) -> List[str]:
+    """
+    按字节数切分超长的单行，不会截断多字节字符
+    """
+    pieces: List[str] = []
+    data = line.encode("utf-8")
+    while data:
+        # 末尾不完整的多字节字符在解码时丢弃，留到下一段
+        piece = data[:max_bytes].decode("utf-8", errors="ignore")
+        piece_bytes = piece.encode("utf-8")
+        pieces.append(piece)
+        data = data[len(piece_bytes):]
+    return pieces
+
+
+def split_text(text: str, max_bytes: int) -> List[str]:
+    """
+    按行切分文本，每段UTF-8编码后不超过指定字节数；逐行累加字节数，每行只编码一次，单行超长时按字节切分
+    """
+    if not text or max_bytes <= 0:
+        return [text]
+    chunks: List[str] = []
+    lines: List[str] = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        line_size = len(line.encode("utf-8"))
+        if size + line_size <= max_bytes:
+            lines.append(line)
+            size += line_size
+            continue
+        if lines:
+            chunks.append("".join(lines))
+        lines, size = [], 0
+        if line_size <= max_bytes:
+            lines.append(line)
+            size = line_size
+            continue
+        pieces = _split_line(line=line, max_bytes=max_bytes)
+        chunks.extend(pieces[:-1])
+        lines.append(pieces[-1])
+        size = len(pieces[-1].encode("utf-8"))
+    if lines:
+        chunks.append("".join(lines))
+    # 段尾的换行在段间没有意义
+    return [chunk.rstrip("\r\n") for chunk in chunks if chunk.strip()] or [text]
+
+
+def split_message(title: Optional[str], text: Optional[str], max_bytes: Optional[int], overhead_bytes: int = 0) -> List[MessageChunk]:
+    """
+    按渠道的单条消息最大字节数切分消息，标题加上“(序号/总段数)”后缀
+    :param max_bytes: 单条消息最大字节数，为空时不切分
+    :param overhead_bytes: 除标题和内容外的消息开销（格式标记、图片和链接地址等）
+    """
+    if not max_bytes or not text:
+        return [MessageChunk(title=title, text=text, index=1, total=1)]
+    title_bytes = len(title.encode("utf-8")) if title else 0
+    text_max_bytes = max_bytes - overhead_bytes - title_bytes
+    if len(text.encode("utf-8")) <= text_max_bytes:
+        return [MessageChunk(title=title, text=text, index=1, total=1)]
+    text_max_bytes -= _suffix_reserve_bytes
+    if text_max_bytes < _min_chunk_bytes:
+        return [MessageChunk(title=title, text=text, index=1, total=1)]
+    texts = split_text(text=text, max_bytes=text_max_bytes)
+    total = len(texts)
+    if total == 1:
+        return [MessageChunk(title=title, text=texts[0], index=1, total=1)]
+    return [MessageChunk(title=f"{title} ({index}/{total})" if title else f"({index}/{total})",
+                         text=chunk_text, index=index, total=total)
+            for index, chunk_text in enumerate(texts, start=1)]
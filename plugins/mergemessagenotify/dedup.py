@@ -0,0 +1,110 @@
+import hashlib
+import time
+from collections import OrderedDict as OrderedDictType
+from threading import Lock, Timer
+from typing import Optional, Callable, Dict, Any, List
+
+from app.log import logger
+from app.schemas.types import NotificationType
+
+
+class DedupEntry:
+    """
+    去重窗口中的一条消息
+    """
+
+    def __init__(self, title: Optional[str], text: Optional[str], type: Optional[NotificationType],
+                 message_info: Dict[str, Any], window: float):
+        self.title = title
+        self.text = text
+        self.type = type
+        self.message_info = message_info
+        # 窗口时长（秒）
+        self.window = window
+        # 窗口关闭时间
+        self.expire_time = time.monotonic() + window
+        # 被抑制的重复次数
+        self.suppressed: int = 0
+        # 有重复时启动的窗口关闭定时器
+        self.timer: Optional[Timer] = None
+
+
+class DedupWindow:
+    """
+    重复消息抑制：相同 (标题, 内容, 类型) 的消息在窗口内只放行第一条，
+    窗口关闭时如有被抑制的重复消息，通过回调发送一条带重复次数的提示
+    """
+
+    def __init__(self, flush_func: Callable[[DedupEntry], None]):
+        """
+        :param flush_func: 窗口关闭且有重复时的回调
+        """
+        self.__lock = Lock()
+        self.__flush_func = flush_func
+        # 按窗口关闭时间先后排列（窗口时长相同时即插入顺序）
+        self.__entries: OrderedDictType[str, DedupEntry] = OrderedDictType()
+
+    @staticmethod
+    def __build_key(title: Optional[str], text: Optional[str], type: Optional[NotificationType]) -> str:
+        content = "\0".join([title or "", text or "", type.name if type else ""])
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def __evict(self, now: float):
+        """
+        淘汰已关闭的窗口，有重复的窗口由其定时器发送提示
+        """
+        while self.__entries:
+            key, entry = next(iter(self.__entries.items()))
+            if entry.expire_time > now:
+                break
+            self.__entries.pop(key)
+
+    def check(self, title: Optional[str], text: Optional[str], type: Optional[NotificationType],
+              message_info: Dict[str, Any], window: float) -> bool:
+        """
+        检查消息是否放行，重复的消息计入抑制次数
+        :param window: 窗口时长（秒）
+        :return: 是否放行
+        """
+        key = self.__build_key(title=title, text=text, type=type)
+        now = time.monotonic()
+        with self.__lock:
+            self.__evict(now=now)
+            entry = self.__entries.get(key)
+            if entry and entry.expire_time > now:
+                entry.suppressed += 1
+                if not entry.timer:
+                    entry.timer = Timer(interval=entry.expire_time - now, function=self.__close, args=(key, entry))
+                    entry.timer.daemon = True
+                    entry.timer.start()
+                return False
+            self.__entries[key] = DedupEntry(title=title, text=text, type=type, message_info=message_info,
+                                             window=window)
+            self.__entries.move_to_end(key)
+            return True
+
+    def __close(self, key: str, entry: DedupEntry):
+        with self.__lock:
+            if self.__entries.get(key) is entry:
+                self.__entries.pop(key)
+        self.__flush_entry(entry=entry)
+
+    def __flush_entry(self, entry: DedupEntry):
+        if not entry.suppressed:
+            return
+        try:
+            self.__flush_func(entry)
+        except Exception as e:
+            logger.error(f"发送重复消息提示异常: {str(e)}", exc_info=True)
+
+    def take_all(self) -> List[DedupEntry]:
+        """
+        立即关闭全部窗口，取出有重复的条目，不发送提示
+        """
+        with self.__lock:
+            entries = list(self.__entries.values())
+            self.__entries.clear()
+        for entry in entries:
+            if entry.timer:
+                entry.timer.cancel()
+        return [entry for entry in entries if entry.suppressed]
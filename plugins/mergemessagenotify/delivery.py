@@ -0,0 +1,230 @@
+import json
+import random
+import sqlite3
+import time
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from typing import Optional, List, Dict, Any, Type
+
+
+class DeliveryTask:
+    """
+    发送任务：一条消息在一个渠道（或一组按顺序尝试的渠道）上的投递
+    """
+
+    def __init__(self, id: int, comp_keys: List[str], in_order: bool, title: Optional[str], text: Optional[str],
+                 type_name: Optional[str], ext_info: Dict[str, Any], attempts: int, create_time: float):
+        self.id = id
+        # 渠道key，按顺序尝试时包含多个
+        self.comp_keys = comp_keys
+        # 是否按顺序尝试，成功即止
+        self.in_order = in_order
+        self.title = title
+        self.text = text
+        # 消息类型名称
+        self.type_name = type_name
+        self.ext_info = ext_info
+        # 已尝试次数
+        self.attempts = attempts
+        self.create_time = create_time
+
+
+class DeliveryQueue:
+    """
+    持久化发送队列：基于SQLite，进程重启后未投递的消息仍然保留
+    """
+
+    # 任务状态：待投递
+    STATUS_PENDING = 0
+    # 任务状态：已放弃
+    STATUS_DEAD = 1
+
+    def __init__(self, db_path: Path, lease_seconds: float = 300, enum_types: List[Type[Enum]] = None):
+        """
+        :param db_path: 数据库文件路径
+        :param lease_seconds: 取出任务后的租约时长，超过租约未确认的任务会被重新投递
+        :param enum_types: 扩展信息中允许出现的枚举类型，按成员名保存，取出时还原为枚举
+        """
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.__enum_types: Dict[str, Type[Enum]] = {enum_type.__name__: enum_type for enum_type in enum_types or []}
+        self.__lock = Lock()
+        self.__lease_seconds = lease_seconds
+        self.__conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self.__conn.execute("PRAGMA journal_mode=WAL")
+        self.__conn.execute("PRAGMA synchronous=NORMAL")
+        self.__conn.execute("""
+            CREATE TABLE IF NOT EXISTS delivery (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                comp_keys TEXT NOT NULL,
+                in_order INTEGER NOT NULL DEFAULT 0,
+                title TEXT,
+                text TEXT,
+                type_name TEXT,
+                ext_info TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                status INTEGER NOT NULL DEFAULT 0,
+                leased INTEGER NOT NULL DEFAULT 0,
+                next_time REAL NOT NULL,
+                create_time REAL NOT NULL,
+                last_error TEXT
+            )
+        """)
+        self.__conn.execute("CREATE INDEX IF NOT EXISTS idx_delivery_due ON delivery (status, next_time)")
+        # 旧版本的队列没有优先级字段
+        columns = [row[1] for row in self.__conn.execute("PRAGMA table_info(delivery)").fetchall()]
+        if "priority" not in columns:
+            self.__conn.execute("ALTER TABLE delivery ADD COLUMN priority INTEGER NOT NULL DEFAULT 1")
+
+    def reset_leases(self):
+        """
+        释放全部租约，用于启动时立即重新投递上次进程退出时未确认的任务
+        """
+        with self.__lock:
+            self.__conn.execute("UPDATE delivery SET leased = 0, next_time = ? WHERE leased = 1", (time.time(),))
+
+    def put(self, comp_keys_list: List[List[str]], in_order: bool, title: Optional[str], text: Optional[str],
+            type_name: Optional[str], ext_info: Dict[str, Any], priority: int = 1) -> int:
+        """
+        入队，每组渠道key对应一个任务
+        :param priority: 优先级，数值越小越先投递
+        :return: 入队的任务数
+        :raise ValueError: 扩展信息中有无法序列化的值
+        """
+        if not comp_keys_list:
+            return 0
+        now = time.time()
+        ext_info_json = self.__dump_ext_info(ext_info=ext_info)
+        rows = [(json.dumps(comp_keys), 1 if in_order else 0, title, text, type_name, ext_info_json, priority, now, now)
+                for comp_keys in comp_keys_list if comp_keys]
+        with self.__lock:
+            self.__conn.executemany(
+                "INSERT INTO delivery (comp_keys, in_order, title, text, type_name, ext_info, priority, next_time, create_time) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def take(self) -> Optional[DeliveryTask]:
+        """
+        取出一个到期的任务，同时为其加上租约；优先级高的先取出
+        """
+        now = time.time()
+        with self.__lock:
+            row = self.__conn.execute(
+                "SELECT id, comp_keys, in_order, title, text, type_name, ext_info, attempts, create_time FROM delivery "
+                "WHERE status = ? AND next_time <= ? ORDER BY priority, next_time, id LIMIT 1",
+                (self.STATUS_PENDING, now)).fetchone()
+            if not row:
+                return None
+            self.__conn.execute("UPDATE delivery SET leased = 1, next_time = ? WHERE id = ?",
+                                (now + self.__lease_seconds, row[0]))
+        return DeliveryTask(id=row[0], comp_keys=json.loads(row[1]), in_order=bool(row[2]), title=row[3], text=row[4],
+                            type_name=row[5], ext_info=self.__load_ext_info(ext_info_json=row[6]), attempts=row[7],
+                            create_time=row[8])
+
+    def __dump_ext_info(self, ext_info: Optional[Dict[str, Any]]) -> str:
+        """
+        序列化扩展信息：允许的枚举保存为 {"__enum__": 枚举类名, "name": 成员名}，其他无法序列化的值抛出ValueError
+        """
+        def __default(value: Any) -> Any:
+            if isinstance(value, Enum) and self.__enum_types.get(type(value).__name__) is type(value):
+                return {"__enum__": type(value).__name__, "name": value.name}
+            raise ValueError(f"扩展信息中有无法序列化的值: {type(value).__name__}")
+
+        try:
+            return json.dumps(ext_info or {}, ensure_ascii=False, default=__default)
+        except TypeError as e:
+            raise ValueError(f"扩展信息无法序列化: {str(e)}")
+
+    def __load_ext_info(self, ext_info_json: Optional[str]) -> Dict[str, Any]:
+        """
+        反序列化扩展信息，还原枚举
+        """
+        def __object_hook(obj: Dict[str, Any]) -> Any:
+            enum_type = self.__enum_types.get(obj.get("__enum__")) if len(obj) == 2 else None
+            member = enum_type.__members__.get(obj.get("name")) if enum_type else None
+            return member if member is not None else obj
+
+        return json.loads(ext_info_json, object_hook=__object_hook) if ext_info_json else {}
+
+    def ack(self, task_id: int):
+        """
+        确认投递成功，删除任务
+        """
+        with self.__lock:
+            self.__conn.execute("DELETE FROM delivery WHERE id = ?", (task_id,))
+
+    def retry(self, task_id: int, attempts: int, delay: float, error: str = None):
+        """
+        投递失败，延迟后重试
+        """
+        with self.__lock:
+            self.__conn.execute("UPDATE delivery SET attempts = ?, leased = 0, next_time = ?, last_error = ? WHERE id = ?",
+                                (attempts, time.time() + delay, error, task_id))
+
+    def dead(self, task_id: int, attempts: int, error: str = None):
+        """
+        超过最大尝试次数，放弃投递
+        """
+        with self.__lock:
+            self.__conn.execute("UPDATE delivery SET attempts = ?, leased = 0, status = ?, last_error = ? WHERE id = ?",
+                                (attempts, self.STATUS_DEAD, error, task_id))
+
+    def purge_dead(self, keep: int = 100):
+        """
+        清理已放弃的任务，只保留最近的若干条
+        """
+        with self.__lock:
+            self.__conn.execute(
+                "DELETE FROM delivery WHERE status = ? AND id NOT IN "
+                "(SELECT id FROM delivery WHERE status = ? ORDER BY id DESC LIMIT ?)",
+                (self.STATUS_DEAD, self.STATUS_DEAD, keep))
+
+    def get_next_time(self) -> Optional[float]:
+        """
+        获取最近一个待投递任务的到期时间
+        """
+        with self.__lock:
+            row = self.__conn.execute("SELECT MIN(next_time) FROM delivery WHERE status = ?",
+                                      (self.STATUS_PENDING,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        队列统计
+        """
+        with self.__lock:
+            pending, oldest, retrying = self.__conn.execute(
+                "SELECT COUNT(*), MIN(create_time), SUM(CASE WHEN attempts > 0 THEN 1 ELSE 0 END) FROM delivery "
+                "WHERE status = ?", (self.STATUS_PENDING,)).fetchone()
+            dead = self.__conn.execute("SELECT COUNT(*) FROM delivery WHERE status = ?",
+                                       (self.STATUS_DEAD,)).fetchone()[0]
+        return {
+            "pending": pending or 0,
+            "retrying": retrying or 0,
+            "dead": dead or 0,
+            "oldest_age": round(time.time() - oldest, 1) if oldest else 0,
+        }
+
+    def close(self):
+        """
+        关闭队列
+        """
+        with self.__lock:
+            self.__conn.close()
+
+
+class DeliveryBackoff:
+    """
+    指数退避，带随机抖动
+    """
+
+    def __init__(self, base: float = 5, maximum: float = 3600):
+        self.base = base
+        self.maximum = maximum
+
+    def delay(self, attempts: int) -> float:
+        """
+        计算第attempts次失败后的重试延迟：基础延迟按2的幂增长，取其一半加上一半以内的随机抖动
+        """
+        delay = min(self.base * (2 ** max(attempts - 1, 0)), self.maximum)
+        return delay / 2 + random.uniform(0, delay / 2)
@@ -0,0 +1,117 @@
+import time
+from threading import Lock, Timer
+from typing import Optional, List, Dict, Tuple, Callable
+
+from app.log import logger
+from app.plugins.mergemessagenotify.module import MessagePriority
+from app.schemas.types import NotificationType
+
+
+class DigestMessage:
+    """
+    待汇总的消息
+    """
+
+    def __init__(self, title: Optional[str], text: Optional[str], priority: MessagePriority = MessagePriority.NORMAL):
+        self.title = title
+        self.text = text
+        self.priority = priority
+        self.create_time = time.time()
+
+
+class DigestBatch:
+    """
+    一个渠道上同一消息类型的待汇总批次
+    """
+
+    def __init__(self, comp_key: str, type: Optional[NotificationType], timer: Timer):
+        self.comp_key = comp_key
+        self.type = type
+        self.timer = timer
+        self.messages: List[DigestMessage] = []
+
+
+class DigestBuffer:
+    """
+    消息汇总缓冲：同一渠道同一类型的消息在时间窗口内合并为一条汇总消息
+    窗口从批次的第一条消息开始计时，达到最大延迟或最大条数时发送
+    """
+
+    def __init__(self, flush_func: Callable[[str, Optional[NotificationType], List[DigestMessage]], None]):
+        """
+        :param flush_func: 发送汇总的回调：渠道key, 消息类型, 消息列表
+        """
+        self.__lock = Lock()
+        self.__flush_func = flush_func
+        self.__batches: Dict[Tuple[str, Optional[str]], DigestBatch] = {}
+
+    def add(self, comp_key: str, type: Optional[NotificationType], message: DigestMessage,
+            max_delay: float, max_size: int):
+        """
+        添加消息
+        """
+        key = (comp_key, type.name if type else None)
+        full_batch = None
+        with self.__lock:
+            batch = self.__batches.get(key)
+            if not batch:
+                timer = Timer(interval=max_delay, function=self.__flush_key, args=(key,))
+                timer.daemon = True
+                batch = DigestBatch(comp_key=comp_key, type=type, timer=timer)
+                self.__batches[key] = batch
+                timer.start()
+            batch.messages.append(message)
+            if len(batch.messages) >= max_size:
+                full_batch = self.__batches.pop(key)
+                full_batch.timer.cancel()
+        if full_batch:
+            self.__flush_batch(batch=full_batch)
+
+    def __flush_key(self, key: Tuple[str, Optional[str]]):
+        with self.__lock:
+            batch = self.__batches.pop(key, None)
+        if batch:
+            self.__flush_batch(batch=batch)
+
+    def __flush_batch(self, batch: DigestBatch):
+        if not batch.messages:
+            return
+        try:
+            self.__flush_func(batch.comp_key, batch.type, batch.messages)
+        except Exception as e:
+            logger.error(f"发送汇总消息异常: 渠道 = {batch.comp_key}, {str(e)}", exc_info=True)
+
+    def take_all(self) -> List[DigestBatch]:
+        """
+        取出全部待汇总的批次，不发送
+        """
+        with self.__lock:
+            batches = list(self.__batches.values())
+            self.__batches.clear()
+        for batch in batches:
+            batch.timer.cancel()
+        return [batch for batch in batches if batch.messages]
+
+    @staticmethod
+    def get_priority(messages: List[DigestMessage]) -> MessagePriority:
+        """
+        获取汇总消息的优先级：取各消息中最高的
+        """
+        return min((message.priority for message in messages), key=lambda priority: priority.level,
+                   default=MessagePriority.NORMAL)
+
+    @staticmethod
+    def build_digest(type: Optional[NotificationType], messages: List[DigestMessage]) -> Tuple[str, str]:
+        """
+        构造汇总消息
+        :return: 标题, 内容
+        """
+        if len(messages) == 1:
+            return messages[0].title, messages[0].text
+        type_str = type.value if type else ""
+        title = f"{type_str}消息汇总（共{len(messages)}条）"
+        blocks = []
+        for index, message in enumerate(messages, start=1):
+            lines = [line for line in [message.title, message.text] if line]
+            blocks.append(f"{index}. " + "\n".join(lines))
+        return title, "\n\n".join(blocks)
@@ -0,0 +1,135 @@
+import time
+from enum import Enum
+from threading import Lock, Condition
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    令牌桶限流：按固定速率补充令牌，桶容量决定允许的突发量
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        :param rate_per_minute: 每分钟补充的令牌数
+        :param capacity: 桶容量，缺省时为每分钟令牌数的四分之一（至少为1）
+        """
+        self.rate_per_minute = rate_per_minute
+        self.__rate_per_second: float = rate_per_minute / 60
+        self.__capacity: float = capacity if capacity else max(1.0, rate_per_minute / 4)
+        self.__tokens: float = self.__capacity
+        self.__last_time: float = time.monotonic()
+        self.__condition: Condition = Condition(Lock())
+
+    def __refill(self):
+        now = time.monotonic()
+        self.__tokens = min(self.__capacity, self.__tokens + (now - self.__last_time) * self.__rate_per_second)
+        self.__last_time = now
+
+    def acquire(self, timeout: float = 0) -> bool:
+        """
+        获取一个令牌
+        :param timeout: 最长等待时间（秒），为0时不等待
+        :return: 是否获取成功
+        """
+        deadline = time.monotonic() + max(timeout, 0)
+        with self.__condition:
+            while True:
+                self.__refill()
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return True
+                wait_time = (1 - self.__tokens) / self.__rate_per_second
+                remain = deadline - time.monotonic()
+                if remain <= 0 or wait_time > remain:
+                    return False
+                self.__condition.wait(timeout=wait_time)
+
+
+class CircuitState(Enum):
+    """
+    熔断器状态
+    """
+
+    CLOSED = ("关闭",)
+    OPEN = ("打开",)
+    HALF_OPEN = ("半开",)
+
+    def __init__(self, name_: str):
+        self.name_ = name_
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后打开，冷却时间过后进入半开状态，放行一个探测请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 60):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.__lock: Lock = Lock()
+        self.__state: CircuitState = CircuitState.CLOSED
+        self.__failures: int = 0
+        self.__open_time: float = 0
+        # 半开状态下是否已有探测请求在进行
+        self.__probing: bool = False
+
+    def get_state(self) -> CircuitState:
+        return self.__state
+
+    def allow(self) -> bool:
+        """
+        是否放行请求
+        """
+        with self.__lock:
+            if self.__state == CircuitState.CLOSED:
+                return True
+            if self.__state == CircuitState.OPEN:
+                if time.monotonic() - self.__open_time < self.cooldown:
+                    return False
+                self.__state = CircuitState.HALF_OPEN
+                self.__probing = False
+            # 半开状态只放行一个探测请求
+            if self.__probing:
+                return False
+            self.__probing = True
+            return True
+
+    def cancel(self):
+        """
+        放行后未实际发起请求（如被限流）时调用，释放半开状态的探测名额
+        """
+        with self.__lock:
+            self.__probing = False
+
+    def record(self, success: bool):
+        """
+        记录请求结果
+        """
+        with self.__lock:
+            if success:
+                self.__state = CircuitState.CLOSED
+                self.__failures = 0
+                self.__probing = False
+                return
+            self.__failures += 1
+            if self.__state == CircuitState.HALF_OPEN or self.__failures >= self.failure_threshold:
+                self.__state = CircuitState.OPEN
+                self.__open_time = time.monotonic()
+                self.__probing = False
+
+
+class ChannelGuard:
+    """
+    渠道流控：令牌桶限流 + 熔断器
+    """
+
+    def __init__(self, rate_per_minute: Optional[float], failure_threshold: int, cooldown: float):
+        self.bucket: Optional[TokenBucket] = TokenBucket(rate_per_minute=rate_per_minute) if rate_per_minute else None
+        self.breaker: CircuitBreaker = CircuitBreaker(failure_threshold=failure_threshold, cooldown=cooldown)
+
+    def acquire(self, timeout: float = 0) -> bool:
+        """
+        获取发送令牌，未限流时直接成功
+        """
+        return self.bucket.acquire(timeout=timeout) if self.bucket else True
@@ -0,0 +1,193 @@
+import hashlib
+import io
+import mimetypes
+import os
+from pathlib import Path
+from threading import Lock
+from typing import Optional, Dict, Tuple
+
+from cachetools import LRUCache
+
+from app.log import logger
+from app.plugins.mergemessagenotify.session import http_session_pool
+
+
+class CachedImage:
+    """
+    已缓存的图片
+    """
+
+    def __init__(self, path: Path, content_type: str, digest: str):
+        # 本地文件路径，文件名为内容的sha256
+        self.path = path
+        self.content_type = content_type
+        self.digest = digest
+
+    def read_bytes(self) -> bytes:
+        return self.path.read_bytes()
+
+
+class ImageCache:
+    """
+    图片缓存：按内容寻址保存在本地磁盘，超出容量时按最近使用时间淘汰；
+    同一url只下载一次，并发获取同一url时只有一个线程下载
+    """
+
+    # 单张图片最大下载字节数
+    max_download_bytes: int = 20 * 1024 * 1024
+
+    def __init__(self):
+        self.__lock = Lock()
+        # 缓存目录，为None时不启用缓存
+        self.__cache_dir: Optional[Path] = None
+        # 缓存目录最大字节数
+        self.__max_bytes: int = 100 * 1024 * 1024
+        # 图片最大边长，超出时等比缩小，为0时不缩小
+        self.__max_dimension: int = 0
+        # url -> 已缓存的图片
+        self.__index: LRUCache = LRUCache(maxsize=1024)
+        # 正在下载的url -> 锁
+        self.__fetch_locks: Dict[str, Lock] = {}
+
+    def configure(self, cache_dir: Optional[Path], max_bytes: int, max_dimension: int):
+        """
+        更新配置，缓存目录为None时停用缓存
+        """
+        with self.__lock:
+            if cache_dir != self.__cache_dir or max_dimension != self.__max_dimension:
+                self.__index.clear()
+            self.__cache_dir = cache_dir
+            self.__max_bytes = max_bytes
+            self.__max_dimension = max_dimension
+        if cache_dir:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self.__evict()
+
+    def is_enabled(self) -> bool:
+        return self.__cache_dir is not None
+
+    def get(self, url: str) -> Optional[CachedImage]:
+        """
+        获取url对应的缓存图片，未命中时下载；未启用、不是http(s)地址或下载失败时返回None
+        """
+        if not url or not self.__cache_dir or not url.lower().startswith(("http://", "https://")):
+            return None
+        image = self.__get_from_index(url=url)
+        if image:
+            return image
+        with self.__lock:
+            fetch_lock = self.__fetch_locks.setdefault(url, Lock())
+        with fetch_lock:
+            try:
+                # 等待其它线程下载完成后再次检查
+                image = self.__get_from_index(url=url)
+                if image:
+                    return image
+                image = self.__fetch(url=url)
+                if image:
+                    with self.__lock:
+                        self.__index[url] = image
+                    self.__evict()
+                return image
+            except Exception as e:
+                logger.warn(f"缓存图片失败: url = {url}, {str(e)}")
+                return None
+            finally:
+                with self.__lock:
+                    self.__fetch_locks.pop(url, None)
+
+    def __get_from_index(self, url: str) -> Optional[CachedImage]:
+        with self.__lock:
+            image: Optional[CachedImage] = self.__index.get(url)
+        if not image:
+            return None
+        try:
+            # 更新访问时间，用于按最近使用淘汰
+            os.utime(image.path)
+            return image
+        except OSError:
+            with self.__lock:
+                self.__index.pop(url, None)
+            return None
+
+    def __fetch(self, url: str) -> Optional[CachedImage]:
+        """
+        下载图片并保存到缓存目录
+        """
+        with http_session_pool.request(method="get", url=url, stream=True) as response:
+            response.raise_for_status()
+            content_type = (response.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+            if not content_type.startswith("image/"):
+                logger.warn(f"缓存图片失败: url = {url}, 不是图片, Content-Type = {content_type}")
+                return None
+            content = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                content.extend(chunk)
+                if len(content) > self.max_download_bytes:
+                    logger.warn(f"缓存图片失败: url = {url}, 图片过大")
+                    return None
+        content, content_type = self.__downscale(content=bytes(content), content_type=content_type)
+        digest = hashlib.sha256(content).hexdigest()
+        suffix = mimetypes.guess_extension(content_type) or ""
+        path = self.__cache_dir / f"{digest}{suffix}"
+        if not path.exists():
+            temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            temp_path.write_bytes(content)
+            temp_path.replace(path)
+        return CachedImage(path=path, content_type=content_type, digest=digest)
+
+    def __downscale(self, content: bytes, content_type: str) -> Tuple[bytes, str]:
+        """
+        按最大边长等比缩小图片，未安装Pillow或无需缩小时原样返回
+        """
+        if not self.__max_dimension:
+            return content, content_type
+        try:
+            from PIL import Image
+        except ImportError:
+            return content, content_type
+        try:
+            with Image.open(io.BytesIO(content)) as img:
+                if max(img.size) <= self.__max_dimension or getattr(img, "is_animated", False):
+                    return content, content_type
+                img.thumbnail((self.__max_dimension, self.__max_dimension))
+                output = io.BytesIO()
+                if img.mode in ("RGBA", "LA", "P"):
+                    img.save(output, format="PNG", optimize=True)
+                    return output.getvalue(), "image/png"
+                img.convert("RGB").save(output, format="JPEG", quality=85, optimize=True)
+                return output.getvalue(), "image/jpeg"
+        except Exception as e:
+            logger.warn(f"缩小图片失败: {str(e)}")
+            return content, content_type
+
+    def __evict(self):
+        """
+        缓存目录超出容量时删除最久未使用的文件
+        """
+        cache_dir = self.__cache_dir
+        if not cache_dir:
+            return
+        try:
+            files = [(path, path.stat()) for path in cache_dir.iterdir() if path.is_file() and not path.name.endswith(".tmp")]
+        except OSError:
+            return
+        total = sum(stat.st_size for _, stat in files)
+        if total <= self.__max_bytes:
+            return
+        for path, stat in sorted(files, key=lambda item: item[1].st_mtime):
+            if total <= self.__max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= stat.st_size
+            except OSError:
+                pass
+        # 清除指向已删除文件的索引
+        with self.__lock:
+            for url in [url for url, image in self.__index.items() if not image.path.exists()]:
+                self.__index.pop(url, None)
+
+
+# 全局图片缓存
+image_cache = ImageCache()
@@ -0,0 +1,328 @@
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from enum import Enum
+from threading import Lock, local
+from typing import Optional, Dict, List, Tuple, Deque, Iterator
+
+
+class TracePhase(Enum):
+    """
+    发送耗时阶段
+    """
+
+    CONFIG = ("读取配置",)
+    RENDER = ("渲染模板",)
+    SIGN = ("签名加密",)
+    NETWORK = ("网络请求",)
+
+    def __init__(self, name_: str):
+        self.name_ = name_
+
+
+class SendTrace:
+    """
+    一次渠道发送的耗时分解
+    同一渠道向多个目标并发发送时，各目标的阶段耗时累加，因此阶段耗时之和可能大于总耗时
+    """
+
+    def __init__(self, comp_key: str, comp_name: str):
+        self.comp_key = comp_key
+        self.comp_name = comp_name
+        self.start_time: float = time.time()
+        self.__start: float = time.monotonic()
+        self.__lock = Lock()
+        self.phases: Dict[TracePhase, float] = {phase: 0.0 for phase in TracePhase}
+        # 请求体字节数
+        self.payload_bytes: int = 0
+        # 最近一次HTTP响应状态码
+        self.http_status: Optional[int] = None
+        # 发送异常
+        self.error: Optional[Exception] = None
+        # 总耗时（秒），结束时赋值
+        self.duration: Optional[float] = None
+
+    def add_phase(self, phase: TracePhase, seconds: float):
+        with self.__lock:
+            self.phases[phase] += seconds
+
+    def add_payload_bytes(self, size: int):
+        with self.__lock:
+            self.payload_bytes += size
+
+    def finish(self) -> float:
+        """
+        结束计时
+        :return: 总耗时（秒）
+        """
+        self.duration = time.monotonic() - self.__start
+        return self.duration
+
+    def format_phases(self) -> str:
+        """
+        格式化耗时分解，用于日志
+        """
+        items = [f"{phase.name_} = {seconds * 1000:.1f}ms" for phase, seconds in self.phases.items()]
+        if self.duration is not None:
+            items.append(f"其他 = {max(self.duration - sum(self.phases.values()), 0) * 1000:.1f}ms")
+        return ", ".join(items)
+
+
+# 当前线程正在进行的发送跟踪
+_trace_local = local()
+
+
+def get_current_trace() -> Optional[SendTrace]:
+    """
+    获取当前线程正在进行的发送跟踪
+    """
+    return getattr(_trace_local, "trace", None)
+
+
+@contextmanager
+def bind_trace(trace: Optional[SendTrace]) -> Iterator[Optional[SendTrace]]:
+    """
+    在当前线程绑定发送跟踪，用于跟踪开始和把跟踪传递给多目标发送的工作线程
+    """
+    previous = get_current_trace()
+    _trace_local.trace = trace
+    try:
+        yield trace
+    finally:
+        _trace_local.trace = previous
+
+
+@contextmanager
+def trace_phase(phase: TracePhase) -> Iterator[None]:
+    """
+    统计代码块耗时到当前跟踪的指定阶段；没有跟踪时不计时，嵌套的阶段计入外层阶段
+    """
+    trace = get_current_trace()
+    if not trace or getattr(_trace_local, "phase", None):
+        yield
+        return
+    _trace_local.phase = phase
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        trace.add_phase(phase=phase, seconds=time.monotonic() - start)
+        _trace_local.phase = None
+
+
+def add_payload_bytes(payload) -> None:
+    """
+    累加请求体字节数到当前跟踪
+    :param payload: 请求体，支持bytes和str
+    """
+    trace = get_current_trace()
+    if not trace or not payload:
+        return
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    if isinstance(payload, (bytes, bytearray)):
+        trace.add_payload_bytes(len(payload))
+
+
+def set_http_status(status: int) -> None:
+    """
+    记录当前跟踪最近一次HTTP响应状态码
+    """
+    trace = get_current_trace()
+    if trace:
+        trace.http_status = status
+
+
+def set_trace_error(error: Exception) -> None:
+    """
+    记录当前跟踪的发送异常，用于渠道内部捕获了异常的情况
+    """
+    trace = get_current_trace()
+    if trace:
+        trace.error = error
+
+
+class Histogram:
+    """
+    直方图：按上界分桶计数
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # 最后一个桶对应+Inf
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.sum: float = 0
+        self.count: int = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class ChannelMetrics:
+    """
+    单个渠道的发送指标
+    """
+
+    # 耗时分桶（秒）
+    seconds_buckets: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    # 请求体大小分桶（字节）
+    bytes_buckets: Tuple[float, ...] = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+    def __init__(self, comp_name: str):
+        self.comp_name = comp_name
+        self.attempts: int = 0
+        self.successes: int = 0
+        # 失败原因 -> 次数
+        self.failures: Dict[str, int] = {}
+        self.send_seconds = Histogram(buckets=self.seconds_buckets)
+        self.render_seconds = Histogram(buckets=self.seconds_buckets)
+        self.network_seconds = Histogram(buckets=self.seconds_buckets)
+        self.payload_bytes = Histogram(buckets=self.bytes_buckets)
+
+
+class SendMetrics:
+    """
+    渠道发送指标：按渠道统计发送次数、成功次数、按原因分类的失败次数，以及总耗时、渲染耗时、网络耗时和请求体大小的直方图；
+    同时保留最近的慢发送跟踪
+    """
+
+    # 跳过发送的失败原因
+    reason_circuit_open: str = "circuit_open"
+    reason_rate_limited: str = "rate_limited"
+
+    def __init__(self, max_slow_traces: int = 20):
+        self.__lock = Lock()
+        self.__channels: Dict[str, ChannelMetrics] = {}
+        self.__slow_traces: Deque[SendTrace] = deque(maxlen=max_slow_traces)
+
+    def __get_channel(self, comp_key: str, comp_name: str) -> ChannelMetrics:
+        channel = self.__channels.get(comp_key)
+        if not channel:
+            channel = ChannelMetrics(comp_name=comp_name)
+            self.__channels[comp_key] = channel
+        return channel
+
+    @staticmethod
+    def classify_failure(trace: SendTrace) -> str:
+        """
+        判断失败原因
+        """
+        error = trace.error
+        if error:
+            error_name = type(error).__name__.lower()
+            if isinstance(error, TimeoutError) or "timeout" in error_name:
+                return "timeout"
+            if isinstance(error, ConnectionError) or "connection" in error_name or "disconnected" in error_name:
+                return "connection"
+            return "exception"
+        if trace.http_status and trace.http_status >= 500:
+            return "http_5xx"
+        if trace.http_status and trace.http_status >= 400:
+            return "http_4xx"
+        return "rejected"
+
+    def record_skip(self, comp_key: str, comp_name: str, reason: str):
+        """
+        记录被熔断或限流跳过的发送
+        """
+        with self.__lock:
+            channel = self.__get_channel(comp_key=comp_key, comp_name=comp_name)
+            channel.attempts += 1
+            channel.failures[reason] = channel.failures.get(reason, 0) + 1
+
+    def record(self, trace: SendTrace, success: bool, slow_threshold: float = 0) -> bool:
+        """
+        记录一次已结束的发送
+        :param slow_threshold: 慢发送阈值（秒），为0时不记录慢发送
+        :return: 是否为慢发送
+        """
+        duration = trace.duration if trace.duration is not None else trace.finish()
+        slow = 0 < slow_threshold <= duration
+        with self.__lock:
+            channel = self.__get_channel(comp_key=trace.comp_key, comp_name=trace.comp_name)
+            channel.attempts += 1
+            if success:
+                channel.successes += 1
+            else:
+                reason = self.classify_failure(trace=trace)
+                channel.failures[reason] = channel.failures.get(reason, 0) + 1
+            channel.send_seconds.observe(duration)
+            channel.render_seconds.observe(trace.phases[TracePhase.RENDER])
+            channel.network_seconds.observe(trace.phases[TracePhase.NETWORK])
+            channel.payload_bytes.observe(trace.payload_bytes)
+            if slow:
+                self.__slow_traces.append(trace)
+        return slow
+
+    def get_slow_traces(self) -> List[SendTrace]:
+        """
+        获取最近的慢发送跟踪，最新的在前
+        """
+        with self.__lock:
+            return list(reversed(self.__slow_traces))
+
+    def get_summary(self) -> List[Tuple[str, int, int, Dict[str, int], Optional[float]]]:
+        """
+        获取各渠道汇总
+        :return: [(渠道名称, 发送次数, 成功次数, 失败原因及次数, 平均网络耗时（秒）)]
+        """
+        with self.__lock:
+            return [(channel.comp_name, channel.attempts, channel.successes, dict(channel.failures),
+                     channel.network_seconds.sum / channel.network_seconds.count if channel.network_seconds.count else None)
+                    for channel in self.__channels.values()]
+
+    @staticmethod
+    def __escape_label(value: str) -> str:
+        return (value or "").replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    @staticmethod
+    def __format_number(value: float) -> str:
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def __render_histogram(self, lines: List[str], name: str, labels: str, histogram: Histogram):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{self.__format_number(bound)}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.__format_number(histogram.sum)}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+    def render_prometheus(self, prefix: str = "mergemessagenotify") -> str:
+        """
+        输出Prometheus文本格式的指标
+        """
+        with self.__lock:
+            channels = [(comp_key, channel, dict(channel.failures)) for comp_key, channel in self.__channels.items()]
+            lines: List[str] = []
+            counters = [
+                ("send_attempts_total", "渠道发送次数（含被熔断或限流跳过的）", lambda channel: channel.attempts),
+                ("send_successes_total", "渠道发送成功次数", lambda channel: channel.successes),
+            ]
+            for name, help_text, getter in counters:
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for comp_key, channel, _ in channels:
+                    lines.append(f'{prefix}_{name}{{channel="{self.__escape_label(comp_key)}"}} {getter(channel)}')
+            lines.append(f"# HELP {prefix}_send_failures_total 渠道发送失败次数，按原因分类")
+            lines.append(f"# TYPE {prefix}_send_failures_total counter")
+            for comp_key, _, failures in channels:
+                for reason, count in sorted(failures.items()):
+                    lines.append(f'{prefix}_send_failures_total{{channel="{self.__escape_label(comp_key)}",'
+                                 f'reason="{self.__escape_label(reason)}"}} {count}')
+            histograms = [
+                ("send_duration_seconds", "渠道发送总耗时（秒）", lambda channel: channel.send_seconds),
+                ("render_duration_seconds", "渠道发送中模板渲染耗时（秒）", lambda channel: channel.render_seconds),
+                ("network_duration_seconds", "渠道发送中网络请求耗时（秒）", lambda channel: channel.network_seconds),
+                ("payload_bytes", "渠道发送请求体大小（字节）", lambda channel: channel.payload_bytes),
+            ]
+            for name, help_text, getter in histograms:
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for comp_key, channel, _ in channels:
+                    self.__render_histogram(lines=lines, name=f"{prefix}_{name}",
+                                            labels=f'channel="{self.__escape_label(comp_key)}"', histogram=getter(channel))
+        return "\n".join(lines) + "\n"
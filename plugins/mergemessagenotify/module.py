@@ -1,4 +1,8 @@
 from enum import Enum
+from typing import List, Optional
+
+from app.plugins.mergemessagenotify.channel import Channel
+from app.schemas.types import NotificationType
 
 
 class ChannelStrategy(Enum):
@@ -12,3 +16,47 @@ class ChannelStrategy(Enum):
     def __init__(self, name_: str, desc: str):
         self.name_ = name_
         self.desc = desc
+
+
+class OrderMode(Enum):
+    """
+    顺序策略下的渠道排序方式枚举
+    """
+
+    FIXED = ("固定顺序", "按选择的渠道顺序依次尝试")
+    ADAPTIVE = ("自适应", "按各渠道近期的成功率和耗时排序，优先尝试最快的健康渠道")
+
+    def __init__(self, name_: str, desc: str):
+        self.name_ = name_
+        self.desc = desc
+
+
+class MessagePriority(Enum):
+    """
+    消息优先级枚举
+    """
+
+    HIGH = ("高", "独立通道优先处理，不会排在积压的消息之后", 0)
+    NORMAL = ("普通", "未配置优先级的消息", 1)
+    LOW = ("低", "积压时合并为汇总消息，汇总也积压时丢弃", 2)
+
+    def __init__(self, name_: str, desc: str, level: int):
+        self.name_ = name_
+        self.desc = desc
+        # 数值越小越优先
+        self.level = level
+
+
+class PendingMessage:
+    """
+    配置生效或插件停止前取出的待发送消息，已确定发送渠道，在后台线程发送
+    """
+
+    def __init__(self, comp_objs: List[Channel], in_order: bool, title: Optional[str], text: Optional[str],
+                 type: Optional[NotificationType], message_info: dict):
+        self.comp_objs = comp_objs
+        self.in_order = in_order
+        self.title = title
+        self.text = text
+        self.type = type
+        self.message_info = message_info
@@ -0,0 +1,181 @@
+import time
+from collections import deque
+from threading import Thread, Condition, Event as ThreadEvent
+from typing import Optional, Dict, List, Tuple, Deque, Callable
+
+from app.log import logger
+from app.plugins.mergemessagenotify.digest import DigestBuffer, DigestMessage
+from app.plugins.mergemessagenotify.module import MessagePriority
+from app.schemas.types import NotificationType
+
+
+class PriorityTask:
+    """
+    待分发的消息
+    """
+
+    def __init__(self, title: Optional[str], text: Optional[str], type: Optional[NotificationType], message_info: dict):
+        self.title = title
+        self.text = text
+        self.type = type
+        self.message_info = message_info
+        self.enqueue_time = time.monotonic()
+
+
+class PriorityLane:
+    """
+    一个优先级的分发通道：有界队列 + 工作线程
+    """
+
+    def __init__(self, priority: MessagePriority, queue_limit: int, worker_count: int):
+        self.priority = priority
+        # 队列长度上限，为0时不限制
+        self.queue_limit = queue_limit
+        self.worker_count = worker_count
+        self.condition = Condition()
+        self.tasks: Deque[PriorityTask] = deque()
+        # 队列满时合并的消息：消息类型名称 -> (消息类型, 消息列表)
+        self.overflow: Dict[Optional[str], Tuple[Optional[NotificationType], List[DigestMessage]]] = {}
+        self.overflow_count: int = 0
+        # 累计丢弃的消息数
+        self.shed_count: int = 0
+        self.workers: List[Thread] = []
+
+
+class PriorityDispatcher:
+    """
+    优先级分发：每个优先级一条独立的通道（有界队列 + 工作线程），高优先级的消息不会排在低优先级的积压消息之后
+    队列满时：低优先级的消息合并为汇总消息，队列处理完后发送，汇总也满时丢弃；其他优先级返回未接收，由调用线程直接分发
+    """
+
+    # 各优先级的工作线程数
+    lane_workers: Dict[MessagePriority, int] = {
+        MessagePriority.HIGH: 2,
+        MessagePriority.NORMAL: 2,
+        MessagePriority.LOW: 1,
+    }
+    # 高优先级消息排队超过该时间（秒）时告警
+    high_wait_warn_seconds: float = 1
+
+    def __init__(self, dispatch_func: Callable[[PriorityTask, MessagePriority], None], queue_limits: Dict[MessagePriority, int]):
+        """
+        :param dispatch_func: 分发消息的回调：消息, 优先级
+        :param queue_limits: 各优先级的队列长度上限，缺省或为0时不限制
+        """
+        self.__dispatch_func = dispatch_func
+        self.__stop_event = ThreadEvent()
+        self.__lanes: Dict[MessagePriority, PriorityLane] = {
+            priority: PriorityLane(priority=priority, queue_limit=queue_limits.get(priority) or 0,
+                                   worker_count=self.lane_workers.get(priority, 1))
+            for priority in MessagePriority
+        }
+
+    def start(self):
+        """
+        启动各通道的工作线程
+        """
+        for priority, lane in self.__lanes.items():
+            lane.workers = [Thread(target=self.__worker, args=(lane,),
+                                   name=f"MergeMessageNotify-priority-{priority.name.lower()}-{index}",
+                                   daemon=True) for index in range(lane.worker_count)]
+            for worker in lane.workers:
+                worker.start()
+
+    def stop(self) -> List[Tuple[PriorityTask, MessagePriority]]:
+        """
+        停止工作线程
+        :return: 尚未分发的消息（含合并的汇总消息），按优先级排列
+        """
+        self.__stop_event.set()
+        for lane in self.__lanes.values():
+            with lane.condition:
+                lane.condition.notify_all()
+        for lane in self.__lanes.values():
+            for worker in lane.workers:
+                worker.join(timeout=5)
+            lane.workers = []
+        remain_tasks = []
+        for priority, lane in sorted(self.__lanes.items(), key=lambda item: item[0].level):
+            with lane.condition:
+                remain_tasks.extend((task, priority) for task in lane.tasks)
+                lane.tasks.clear()
+                while lane.overflow:
+                    remain_tasks.append((self.__pop_overflow(lane=lane), priority))
+        return remain_tasks
+
+    def submit(self, priority: MessagePriority, task: PriorityTask) -> bool:
+        """
+        提交消息
+        :return: 是否已被通道接收（含合并为汇总消息和丢弃），为False时调用方应直接分发
+        """
+        if self.__stop_event.is_set():
+            return False
+        lane = self.__lanes[priority]
+        with lane.condition:
+            if not lane.queue_limit or len(lane.tasks) < lane.queue_limit:
+                lane.tasks.append(task)
+                lane.condition.notify()
+                return True
+            if priority != MessagePriority.LOW:
+                return False
+            if lane.overflow_count < lane.queue_limit:
+                key = task.type.name if task.type else None
+                lane.overflow.setdefault(key, (task.type, []))[1].append(
+                    DigestMessage(title=task.title, text=task.text, priority=priority))
+                lane.overflow_count += 1
+                return True
+            lane.shed_count += 1
+            shed_count = lane.shed_count
+        logger.warn(f"优先级通道积压，丢弃消息: 优先级 = {priority.name_}, 标题 = {task.title}, 累计丢弃 = {shed_count}")
+        return True
+
+    def get_backlog(self) -> Dict[MessagePriority, Tuple[int, int, int]]:
+        """
+        获取各通道积压情况
+        :return: 优先级 -> (排队数, 待汇总数, 累计丢弃数)
+        """
+        backlog = {}
+        for priority, lane in self.__lanes.items():
+            with lane.condition:
+                backlog[priority] = (len(lane.tasks), lane.overflow_count, lane.shed_count)
+        return backlog
+
+    @staticmethod
+    def __pop_overflow(lane: PriorityLane) -> PriorityTask:
+        """
+        取出一个消息类型的合并消息，构造为汇总消息
+        """
+        key = next(iter(lane.overflow))
+        type, messages = lane.overflow.pop(key)
+        lane.overflow_count -= len(messages)
+        title, text = DigestBuffer.build_digest(type=type, messages=messages)
+        return PriorityTask(title=title, text=text, type=type, message_info={})
+
+    def __take(self, lane: PriorityLane) -> Optional[PriorityTask]:
+        """
+        取出一条消息，队列为空时取出合并的汇总消息；停止时返回None
+        """
+        with lane.condition:
+            while not self.__stop_event.is_set():
+                if lane.tasks:
+                    return lane.tasks.popleft()
+                if lane.overflow:
+                    return self.__pop_overflow(lane=lane)
+                lane.condition.wait(timeout=5)
+        return None
+
+    def __worker(self, lane: PriorityLane):
+        """
+        通道工作线程
+        """
+        while True:
+            task = self.__take(lane=lane)
+            if not task:
+                return
+            wait_seconds = time.monotonic() - task.enqueue_time
+            if lane.priority == MessagePriority.HIGH and wait_seconds > self.high_wait_warn_seconds:
+                logger.warn(f"高优先级消息排队过久: 等待 = {round(wait_seconds, 2)}秒, 标题 = {task.title}")
+            try:
+                self.__dispatch_func(task, lane.priority)
+            except Exception as e:
+                logger.error(f"优先级通道分发异常: 优先级 = {lane.priority.name_}, {str(e)}", exc_info=True)
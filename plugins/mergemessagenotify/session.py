@@ -0,0 +1,92 @@
+import json
+from http.cookiejar import DefaultCookiePolicy
+from threading import Lock
+from typing import Dict, Tuple, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpSessionPool:
+    """
+    HTTP会话池：按 (scheme, host, proxy) 复用长连接会话，所有基于HTTP的渠道共享
+    """
+
+    def __init__(self, pool_maxsize: int = 10, timeout: float = 20):
+        self.__lock = Lock()
+        self.__sessions: Dict[Tuple[str, str, str], requests.Session] = {}
+        # 每个会话的连接池大小
+        self.__pool_maxsize: int = pool_maxsize
+        # 缺省超时（秒）
+        self.__timeout: float = timeout
+
+    def configure(self, pool_maxsize: int, timeout: float):
+        """
+        更新配置，连接池大小变化时关闭已有会话
+        """
+        with self.__lock:
+            self.__timeout = timeout
+            if pool_maxsize == self.__pool_maxsize:
+                return
+            self.__pool_maxsize = pool_maxsize
+            sessions = list(self.__sessions.values())
+            self.__sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def get_timeout(self) -> float:
+        return self.__timeout
+
+    @staticmethod
+    def __build_key(url: str, proxies: Optional[dict]) -> Tuple[str, str, str]:
+        parts = urlsplit(url)
+        proxy = json.dumps(proxies, sort_keys=True) if proxies else ""
+        return parts.scheme.lower(), parts.netloc.lower(), proxy
+
+    def __build_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.__pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        # 不同渠道可能共用同一host，不保存cookie避免相互影响
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def get_session(self, url: str, proxies: Optional[dict] = None) -> requests.Session:
+        """
+        获取url对应的会话
+        """
+        key = self.__build_key(url=url, proxies=proxies)
+        session = self.__sessions.get(key)
+        if session:
+            return session
+        with self.__lock:
+            session = self.__sessions.get(key)
+            if not session:
+                session = self.__build_session()
+                self.__sessions[key] = session
+            return session
+
+    def request(self, method: str, url: str, proxies: Optional[dict] = None,
+                timeout: Union[float, Tuple[float, float], None] = None, **kwargs) -> requests.Response:
+        """
+        发起请求，未指定超时时使用缺省超时
+        """
+        session = self.get_session(url=url, proxies=proxies)
+        return session.request(method=method, url=url, proxies=proxies,
+                               timeout=timeout if timeout is not None else self.__timeout, **kwargs)
+
+    def close(self):
+        """
+        关闭全部会话
+        """
+        with self.__lock:
+            sessions = list(self.__sessions.values())
+            self.__sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+# 全局会话池
+http_session_pool = HttpSessionPool()
@@ -0,0 +1,128 @@
+import hashlib
+import smtplib
+import time
+from threading import Lock
+from typing import Dict, Tuple, List, Callable, Optional
+
+
+class SmtpConnectionPool:
+    """
+    SMTP连接池：按 (主机, 端口, 加密类型, 账户, 密码) 复用已登录的连接，
+    空闲超时的连接被关闭，空闲一段时间后再次使用前通过NOOP检查连接是否可用
+    """
+
+    def __init__(self, idle_timeout: float = 60, check_after: float = 5, max_idle: int = 2):
+        """
+        :param idle_timeout: 空闲超时（秒），超过后关闭连接
+        :param check_after: 空闲超过该时间（秒）再次使用前先发送NOOP检查
+        :param max_idle: 每个key最多保留的空闲连接数
+        """
+        self.__lock = Lock()
+        self.__idle_timeout = idle_timeout
+        self.__check_after = check_after
+        self.__max_idle = max_idle
+        # key -> [(连接, 最后使用时间)]
+        self.__idle: Dict[Tuple, List[Tuple[smtplib.SMTP, float]]] = {}
+
+    @staticmethod
+    def build_key(host: str, port: int, encrypt_type: str, username: str, password: str) -> Tuple:
+        """
+        构造连接key，密码只参与摘要
+        """
+        password_digest = hashlib.sha256((password or "").encode("utf-8")).hexdigest()
+        return host, str(port), encrypt_type, username, password_digest
+
+    @staticmethod
+    def __close(smtp: smtplib.SMTP):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def __take_idle(self, key: Tuple) -> Tuple[Optional[smtplib.SMTP], bool]:
+        """
+        取出一个可用的空闲连接
+        :return: 连接（没有时为None）, 是否已通过检查
+        """
+        now = time.monotonic()
+        expired = []
+        smtp, checked = None, False
+        with self.__lock:
+            connections = self.__idle.get(key) or []
+            while connections:
+                conn, last_used = connections.pop()
+                if now - last_used > self.__idle_timeout:
+                    expired.append(conn)
+                    continue
+                smtp, checked = conn, now - last_used <= self.__check_after
+                break
+        for conn in expired:
+            self.__close(conn)
+        if smtp and not checked:
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp, True
+            except Exception:
+                pass
+            self.__close(smtp)
+            smtp = None
+        return smtp, checked
+
+    def __release(self, key: Tuple, smtp: smtplib.SMTP):
+        now = time.monotonic()
+        expired = []
+        with self.__lock:
+            connections = self.__idle.setdefault(key, [])
+            if len(connections) < self.__max_idle:
+                connections.append((smtp, now))
+                smtp = None
+            # 顺带清理其它key下空闲超时的连接
+            for connections in self.__idle.values():
+                expired += [conn for conn, last_used in connections if now - last_used > self.__idle_timeout]
+                connections[:] = [(conn, last_used) for conn, last_used in connections if now - last_used <= self.__idle_timeout]
+        if smtp:
+            expired.append(smtp)
+        for conn in expired:
+            self.__close(conn)
+
+    def sendmail(self, key: Tuple, connect_func: Callable[[], smtplib.SMTP], from_addr: str, to_addrs: List[str], msg: str):
+        """
+        发送邮件，所有收件人在一次sendmail中发送；成功后连接归还连接池，失败时关闭连接；
+        复用的连接已被服务端断开时用新连接重试一次
+        :param connect_func: 没有可用空闲连接时新建并登录连接
+        """
+        smtp, _ = self.__take_idle(key=key)
+        if smtp:
+            try:
+                smtp.sendmail(from_addr=from_addr, to_addrs=to_addrs, msg=msg)
+                self.__release(key=key, smtp=smtp)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.__close(smtp)
+            except Exception:
+                self.__close(smtp)
+                raise
+        smtp = connect_func()
+        try:
+            smtp.sendmail(from_addr=from_addr, to_addrs=to_addrs, msg=msg)
+        except Exception:
+            self.__close(smtp)
+            raise
+        self.__release(key=key, smtp=smtp)
+
+    def close(self):
+        """
+        关闭全部空闲连接
+        """
+        with self.__lock:
+            connections = [conn for items in self.__idle.values() for conn, _ in items]
+            self.__idle.clear()
+        for conn in connections:
+            self.__close(conn)
+
+
+# 全局SMTP连接池
+smtp_pool = SmtpConnectionPool()
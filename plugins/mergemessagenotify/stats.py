@@ -0,0 +1,66 @@
+import math
+from collections import deque
+from threading import Lock
+from typing import Optional, Deque
+
+
+class ChannelStats:
+    """
+    渠道发送统计：成功率和耗时的指数加权移动平均（EWMA），以及最近若干次成功发送的耗时样本
+    """
+
+    # 成功率低于该值视为不健康
+    healthy_success_rate: float = 0.5
+    # 计算分位数所需的最少样本数
+    min_samples: int = 5
+
+    def __init__(self, alpha: float = 0.2, max_samples: int = 50):
+        """
+        :param alpha: EWMA平滑系数，越大越偏重最近的结果
+        :param max_samples: 保留的耗时样本数
+        """
+        self.__alpha = alpha
+        self.__lock = Lock()
+        self.__success_rate: float = 1.0
+        self.__latency: Optional[float] = None
+        self.__samples: Deque[float] = deque(maxlen=max_samples)
+
+    def record(self, success: bool, latency: float):
+        """
+        记录一次发送结果
+        :param latency: 耗时（秒）
+        """
+        with self.__lock:
+            self.__success_rate += self.__alpha * ((1.0 if success else 0.0) - self.__success_rate)
+            if not success:
+                return
+            self.__latency = latency if self.__latency is None else self.__latency + self.__alpha * (latency - self.__latency)
+            self.__samples.append(latency)
+
+    def get_success_rate(self) -> float:
+        return self.__success_rate
+
+    def get_latency(self) -> Optional[float]:
+        """
+        获取平均耗时，尚无成功样本时为None
+        """
+        return self.__latency
+
+    def is_healthy(self) -> bool:
+        return self.__success_rate >= self.healthy_success_rate
+
+    def get_p95_latency(self) -> Optional[float]:
+        """
+        获取耗时的95分位数，样本不足时为None
+        """
+        with self.__lock:
+            if len(self.__samples) < self.min_samples:
+                return None
+            samples = sorted(self.__samples)
+        return samples[min(math.ceil(len(samples) * 0.95), len(samples)) - 1]
+
+    def sort_key(self) -> tuple:
+        """
+        自适应排序键：健康的渠道在前，同等健康状况下平均耗时短的在前；尚无样本的渠道视为耗时为0，优先试探
+        """
+        return 0 if self.is_healthy() else 1, self.__latency or 0
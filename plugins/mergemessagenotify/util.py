@@ -1,15 +1,83 @@
+from threading import Lock
+from typing import Optional, NamedTuple
+
+from cachetools import LRUCache
 from mako.template import Template
 
 from app.log import logger
 
 
+class CompiledTemplate(NamedTuple):
+    """
+    已编译的模板
+    """
+    # 模板文本
+    text: str
+    # 编译结果，编译失败时为None，渲染时返回模板文本
+    template: Optional[Template]
+
+
 class TemplateUtil():
     """
     模板工具
     """
 
-    @staticmethod
-    def render_text(text: str, variables: dict) -> str:
+    # 已编译模板缓存，key为模板文本
+    __template_cache: LRUCache = LRUCache(maxsize=256)
+    __template_cache_lock: Lock = Lock()
+
+    @classmethod
+    def get_template(cls, text: str) -> Optional[Template]:
+        """
+        获取已编译的模板，未命中缓存时编译并缓存
+        :param text: 模板文本
+        """
+        if not text:
+            return None
+        with cls.__template_cache_lock:
+            template = cls.__template_cache.get(text)
+        if template:
+            return template
+        # 编译放在锁外，极端情况下同一模板会被重复编译，不影响结果
+        template = Template(text=text)
+        with cls.__template_cache_lock:
+            cls.__template_cache[text] = template
+        return template
+
+    @classmethod
+    def compile_text(cls, text: str) -> Optional[CompiledTemplate]:
+        """
+        预编译模板文本
+        :param text: 模板文本
+        :return: 已编译的模板，模板文本为空时为None
+        """
+        if not text:
+            return None
+        try:
+            return CompiledTemplate(text=text, template=cls.get_template(text=text))
+        except Exception as e:
+            logger.error(f"编译模板异常: text = {text}, {str(e)}")
+            return CompiledTemplate(text=text, template=None)
+
+    @classmethod
+    def render_compiled(cls, compiled: Optional[CompiledTemplate], variables: dict) -> Optional[str]:
+        """
+        渲染已编译的模板
+        :param compiled: 已编译的模板
+        :param variables: 模板变量（词典）
+        """
+        if not compiled:
+            return None
+        if not compiled.template or not variables:
+            return compiled.text
+        try:
+            return compiled.template.render(**variables)
+        except Exception as e:
+            logger.error(f"渲染文本异常: text = {compiled.text}, variables = {str(variables)}, {str(e)}", exc_info=True)
+            return compiled.text
+
+    @classmethod
+    def render_text(cls, text: str, variables: dict) -> str:
         """
         渲染文本
         :param text: 模板文本
@@ -18,7 +86,7 @@ class TemplateUtil():
         if not text or not variables:
             return text
         try:
-            template = Template(text=text)
+            template = cls.get_template(text=text)
             return template.render(**variables)
         except Exception as e:
             logger.error(f"渲染文本异常: text = {text}, variables = {str(variables)}, {str(e)}", exc_info=True)
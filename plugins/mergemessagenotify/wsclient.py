@@ -0,0 +1,162 @@
+import itertools
+import json
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Dict, Any, Optional
+
+from app.log import logger
+from app.plugins.mergemessagenotify.metrics import add_payload_bytes
+
+
+class OneBotResponseError(Exception):
+    """
+    请求帧已发送但未取得响应（超时或连接断开），消息可能已送达，调用方不应再通过其他方式重发
+    """
+    pass
+
+
+class OneBotWebSocket:
+    """
+    OneBot-11 正向WebSocket连接：一个持久连接上并发调用API，按echo匹配响应
+    """
+
+    def __init__(self, url: str, timeout: float = 20):
+        self.url = url
+        self.__timeout = timeout
+        self.__lock = Lock()
+        self.__ws = None
+        self.__echo_counter = itertools.count(1)
+        # 连接 -> (echo -> 等待响应的future)，连接断开时只让该连接上的调用失败
+        self.__pending: Dict[Any, Dict[str, Future]] = {}
+
+    def __connect(self):
+        """
+        建立连接并启动读取线程，调用方需持有锁
+        """
+        import websocket
+        # 保留套接字超时，避免对端不再读取时发送线程永久阻塞；读取线程在空闲超时后继续等待
+        ws = websocket.create_connection(self.url, timeout=self.__timeout, enable_multithread=True)
+        self.__ws = ws
+        self.__pending[ws] = {}
+        Thread(target=self.__read_loop, args=(ws,), name="MergeMessageNotify-onebot-ws", daemon=True).start()
+        logger.info(f"OneBot-11 WebSocket连接成功: url = {self.url}")
+
+    def __read_loop(self, ws):
+        from websocket import WebSocketTimeoutException
+        try:
+            while True:
+                try:
+                    frame = ws.recv()
+                except WebSocketTimeoutException:
+                    # 空闲超时，连接已被替换或关闭时退出
+                    if self.__ws is not ws:
+                        break
+                    continue
+                if not frame:
+                    break
+                try:
+                    data = json.loads(frame)
+                except ValueError:
+                    continue
+                # 忽略事件推送等不带echo的帧
+                echo = str(data.get("echo")) if isinstance(data, dict) and data.get("echo") is not None else None
+                future = self.__pending.get(ws, {}).pop(echo, None) if echo else None
+                if future:
+                    future.set_result(data)
+        except Exception as e:
+            # 主动关闭时不记录
+            if self.__ws is ws:
+                logger.warn(f"OneBot-11 WebSocket连接断开: url = {self.url}, {str(e)}")
+        finally:
+            self.__abort(ws=ws)
+
+    def __abort(self, ws):
+        """
+        连接断开时让该连接上等待中的调用立即失败
+        """
+        with self.__lock:
+            if self.__ws is ws:
+                self.__ws = None
+            pending = list((self.__pending.pop(ws, None) or {}).values())
+        for future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError("WebSocket连接已断开"))
+        try:
+            ws.close()
+        except Exception:
+            pass
+
+    def call(self, action: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        调用API并等待响应
+        :return: 响应json
+        :raise OneBotResponseError: 请求帧已发送但未取得响应；连接或发送失败时抛出原异常，此时请求未送达
+        """
+        echo = str(next(self.__echo_counter))
+        future = Future()
+        with self.__lock:
+            if not self.__ws:
+                self.__connect()
+            ws = self.__ws
+            self.__pending[ws][echo] = future
+        try:
+            frame = json.dumps({"action": action, "params": params, "echo": echo}, ensure_ascii=False)
+            add_payload_bytes(frame)
+            ws.send(frame)
+        except Exception:
+            self.__pending.get(ws, {}).pop(echo, None)
+            # 发送超时或失败时帧可能不完整，断开连接，下次调用时重连
+            self.__abort(ws=ws)
+            raise
+        try:
+            return future.result(timeout=timeout or self.__timeout)
+        except Exception as e:
+            self.__pending.get(ws, {}).pop(echo, None)
+            raise OneBotResponseError(f"请求已发送但未取得响应: {str(e) or type(e).__name__}") from e
+
+    def close(self):
+        with self.__lock:
+            ws = self.__ws
+            self.__ws = None
+        if ws:
+            self.__abort(ws=ws)
+
+
+class OneBotWebSocketPool:
+    """
+    OneBot-11 正向WebSocket连接池，按url复用连接
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__clients: Dict[str, OneBotWebSocket] = {}
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        是否安装了websocket-client
+        """
+        try:
+            import websocket
+            return True
+        except ImportError:
+            return False
+
+    def get(self, url: str) -> OneBotWebSocket:
+        with self.__lock:
+            client = self.__clients.get(url)
+            if not client:
+                client = OneBotWebSocket(url=url)
+                self.__clients[url] = client
+            return client
+
+    def close(self):
+        with self.__lock:
+            clients = list(self.__clients.values())
+            self.__clients.clear()
+        for client in clients:
+            client.close()
+
+
+# 全局OneBot-11 WebSocket连接池
+onebot_ws_pool = OneBotWebSocketPool()